@@ -0,0 +1,196 @@
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Tuple
+
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "providers.json")
+
+MULTI_AGENT_TOOL = "send_message_to_agents_matching_all_tags"
+
+# Written by fleet_snapshot import, naming the agent it was recreated from
+SNAPSHOT_TAG_PREFIX = "snapshot:"
+
+
+def _freeze(value):
+    """Recursively turn dicts into read-only mappings and lists into tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    """Plain dicts and lists again, for sending to the Letta client"""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def validate_registry(registry):
+    """Raise ValueError if the provider registry is inconsistent"""
+    levels = registry.get("levels")
+    if not levels or not all(isinstance(level, int) for level in levels):
+        raise ValueError("Provider registry needs a non-empty list of integer levels")
+    windows = registry.get("context_windows")
+    if not windows or windows != sorted(windows):
+        raise ValueError("context_windows must be a non-empty ascending list")
+    if registry.get("default_context_window") not in windows:
+        raise ValueError("default_context_window must be one of context_windows")
+    unknown_levels = {int(level) for level in registry.get("level_tools", {})} - set(levels)
+    if unknown_levels:
+        raise ValueError(f"level_tools has unknown levels: {sorted(unknown_levels)}")
+
+    embeddings = registry.get("embeddings", {})
+    if registry.get("default_embedding") not in embeddings:
+        raise ValueError("default_embedding must name an entry in embeddings")
+    for name, embedding in embeddings.items():
+        missing = {"model", "endpoint_type", "endpoint", "dim"} - set(embedding)
+        if missing:
+            raise ValueError(f"Embedding {name} is missing: {', '.join(sorted(missing))}")
+
+    providers = registry.get("providers")
+    if not providers:
+        raise ValueError("Provider registry has no providers")
+    for name, provider in providers.items():
+        if not provider.get("endpoint"):
+            raise ValueError(f"Provider {name} has no endpoint")
+        if not provider.get("models"):
+            raise ValueError(f"Provider {name} has no models")
+        if provider.get("rate_limit", 0) < 0:
+            raise ValueError(f"Provider {name} has a negative rate_limit")
+        if provider.get("embedding", registry["default_embedding"]) not in embeddings:
+            raise ValueError(f"Provider {name} uses unknown embedding {provider.get('embedding')}")
+        unknown_models = set(provider.get("context_limits", {})) - set(provider["models"])
+        if unknown_models:
+            raise ValueError(f"Provider {name} has context limits for unknown models: {sorted(unknown_models)}")
+    return registry
+
+
+def load_provider_registry(path=None):
+    """Load, validate and freeze the provider/model registry"""
+    path = path or os.getenv("LETTA_PROVIDER_REGISTRY", DEFAULT_REGISTRY_PATH)
+    with open(path) as f:
+        return _freeze(validate_registry(json.load(f)))
+
+
+# Loaded once per process; every UI and bulk code path reads the same objects
+REGISTRY = load_provider_registry()
+
+PROVIDERS = tuple(REGISTRY["providers"])
+MODEL_OPTIONS = MappingProxyType({name: provider["models"] for name, provider in REGISTRY["providers"].items()})
+CONTEXT_WINDOWS = REGISTRY["context_windows"]
+DEFAULT_CONTEXT_WINDOW = REGISTRY["default_context_window"]
+LEVELS = REGISTRY["levels"]
+MODEL_ENDPOINTS = MappingProxyType({name: provider["endpoint"] for name, provider in REGISTRY["providers"].items()})
+EMBEDDING_PROVIDERS = REGISTRY["embeddings"]
+# Requests per second allowed against each provider by bulk tooling; 0 or missing means unlimited
+RATE_LIMITS = MappingProxyType({name: provider.get("rate_limit", 0) for name, provider in REGISTRY["providers"].items()})
+# Largest context each model accepts; models without an entry are assumed to take every window
+MODEL_CONTEXT_LIMITS = MappingProxyType({
+    (name, model): provider.get("context_limits", {}).get(model, CONTEXT_WINDOWS[-1])
+    for name, provider in REGISTRY["providers"].items() for model in provider["models"]
+})
+DEFAULT_SYSTEM_TOKENS = REGISTRY.get("default_system_tokens", 1500)
+DEFAULT_RESERVE_TOKENS = REGISTRY.get("default_reserve_tokens", 2048)
+# Tools whose attachment follows the agent's level; anything else is left as is
+MANAGED_TOOLS = frozenset(name for tools in REGISTRY["level_tools"].values() for name in tools)
+
+
+@dataclass(frozen=True)
+class AgentTemplate:
+    """Precompiled, read-only payload parts shared by every agent of one provider, model and level"""
+    provider: str
+    model: str
+    level: int
+    llm_config: Mapping
+    embedding_config: Mapping
+    level_tag: str
+    tools: Tuple[str, ...]
+    block_limits: Mapping
+
+    def render(self, agent_name, persona_value, job_directives, supervisor_name, temperature, context_window):
+        """Merge per-agent values into a fresh client.agents.create payload"""
+        return {
+            "name": agent_name,
+            "memory_blocks": [
+                {"label": "job_directives", "value": job_directives,
+                 "limit": self.block_limits["job_directives"]},
+                {"label": "persona", "value": persona_value, "limit": self.block_limits["persona"]},
+            ],
+            "llm_config": {**self.llm_config, "context_window": context_window, "temperature": temperature},
+            "embedding_config": dict(self.embedding_config),
+            "tags": [self.level_tag, f"{supervisor_name}_sub"],
+            "tools": list(self.tools),
+        }
+
+
+def _embedding_config(provider):
+    """Embedding config of a provider, defaulting to OpenAI unless the provider has its own"""
+    provider_entry = REGISTRY["providers"].get(provider, {})
+    embedding = REGISTRY["embeddings"][provider_entry.get("embedding", REGISTRY["default_embedding"])]
+    return MappingProxyType({
+        "embedding_model": embedding["model"],
+        "embedding_endpoint_type": embedding["endpoint_type"],
+        "embedding_endpoint": embedding["endpoint"],
+        "embedding_dim": embedding["dim"],
+    })
+
+
+# Every registered (provider, model, level) fits, so precompiled templates are never evicted
+@lru_cache(maxsize=len(MODEL_CONTEXT_LIMITS) * len(LEVELS))
+def get_template(provider, model, level):
+    """Compile (once) the template for a registered provider, model and level"""
+    if provider not in MODEL_OPTIONS:
+        raise ValueError(f"Unknown provider {provider!r}; expected one of {list(PROVIDERS)}")
+    if model not in MODEL_OPTIONS[provider]:
+        raise ValueError(f"Unknown model {model!r} for {provider}; expected one of {list(MODEL_OPTIONS[provider])}")
+    if level not in LEVELS:
+        raise ValueError(f"Unknown level {level!r}; expected one of {list(LEVELS)}")
+    return AgentTemplate(
+        provider=provider,
+        model=model,
+        level=level,
+        llm_config=MappingProxyType({
+            "model": model,
+            "model_endpoint_type": provider,
+            "model_endpoint": MODEL_ENDPOINTS[provider],
+        }),
+        embedding_config=_embedding_config(provider),
+        level_tag=f"level_{level}",
+        tools=tuple(_thaw(REGISTRY["level_tools"].get(str(level), ()))),
+        block_limits=REGISTRY["memory_block_limits"],
+    )
+
+
+def precompile_templates():
+    """Compile every registered (provider, model, level) up front"""
+    return [
+        get_template(provider, model, level)
+        for provider in PROVIDERS for model in MODEL_OPTIONS[provider] for level in LEVELS
+    ]
+
+
+def build_embedding_config(model_endpoint_type):
+    """Embedding config, defaulting to OpenAI unless the provider has its own"""
+    return dict(_embedding_config(model_endpoint_type))
+
+
+def build_agent_payload(agent_name, persona_value, job_directives, level, supervisor_name, temperature,
+                        model_endpoint_type, model, context_window):
+    """Keyword arguments for client.agents.create"""
+    return get_template(model_endpoint_type, model, level).render(
+        agent_name=agent_name,
+        persona_value=persona_value,
+        job_directives=job_directives,
+        supervisor_name=supervisor_name,
+        temperature=temperature,
+        context_window=context_window,
+    )
+
+
+precompile_templates()
@@ -0,0 +1,146 @@
+import asyncio
+import contextvars
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from agent_config import MANAGED_TOOLS, SNAPSHOT_TAG_PREFIX
+
+
+@dataclass
+class AgentUpdatePlan:
+    """Only the calls needed to move an agent to the desired state"""
+    modify: Dict = field(default_factory=dict)
+    blocks: Dict[str, str] = field(default_factory=dict)
+    attach_tools: List[str] = field(default_factory=list)
+    detach_tools: List[str] = field(default_factory=list)
+
+    @property
+    def call_count(self) -> int:
+        return (1 if self.modify else 0) + len(self.blocks) + len(self.attach_tools) + len(self.detach_tools)
+
+    def is_empty(self) -> bool:
+        return self.call_count == 0
+
+
+def _as_dict(config) -> Dict:
+    if config is None:
+        return {}
+    if isinstance(config, dict):
+        return config
+    if hasattr(config, "model_dump"):
+        return config.model_dump()
+    return vars(config)
+
+
+def _differs(current, desired) -> bool:
+    if isinstance(desired, float) and isinstance(current, (int, float)):
+        return not math.isclose(current, desired, abs_tol=1e-9)
+    return current != desired
+
+
+def _config_changed(current, desired: Dict) -> bool:
+    """Compare only the keys we manage; the server fills in the rest"""
+    current = _as_dict(current)
+    return any(_differs(current.get(key), value) for key, value in desired.items())
+
+
+def current_blocks(agent_config) -> Dict[str, str]:
+    """Map block label to value for a retrieved agent"""
+    memory = getattr(agent_config, "memory", None)
+    return {block.label: block.value for block in getattr(memory, "blocks", None) or []}
+
+
+def current_tools(agent_config) -> Dict[str, str]:
+    """Map tool name to id for a retrieved agent"""
+    return {tool.name: tool.id for tool in getattr(agent_config, "tools", None) or []}
+
+
+def missing_tools(agent_config, tool_names) -> List[str]:
+    """Desired tools the agent does not have yet, i.e. the only ids worth resolving"""
+    attached = current_tools(agent_config)
+    return [name for name in tool_names if name not in attached]
+
+
+def plan_agent_update(agent_config, payload: Dict, tool_ids: Optional[Dict[str, str]] = None) -> AgentUpdatePlan:
+    """Diff a retrieved agent against a build_agent_payload result
+
+    tool_ids maps each name from missing_tools() to its id on the server.
+    """
+    plan = AgentUpdatePlan()
+
+    if agent_config.name != payload["name"]:
+        plan.modify["name"] = payload["name"]
+    if _config_changed(agent_config.llm_config, payload["llm_config"]):
+        plan.modify["llm_config"] = payload["llm_config"]
+    if _config_changed(agent_config.embedding_config, payload["embedding_config"]):
+        plan.modify["embedding_config"] = payload["embedding_config"]
+    # Keep the snapshot tag an import wrote, so re-importing still recognises the agent
+    kept_tags = [tag for tag in agent_config.tags or [] if tag.startswith(SNAPSHOT_TAG_PREFIX)]
+    if set(agent_config.tags or []) != set(payload["tags"]) | set(kept_tags):
+        plan.modify["tags"] = payload["tags"] + kept_tags
+
+    existing = current_blocks(agent_config)
+    for block in payload["memory_blocks"]:
+        if existing.get(block["label"]) != block["value"]:
+            plan.blocks[block["label"]] = block["value"]
+
+    # Attach what the new level needs and detach managed tools it no longer gets,
+    # leaving tools attached by hand alone
+    attached = current_tools(agent_config)
+    desired = set(payload["tools"])
+    tool_ids = tool_ids or {}
+    for name in missing_tools(agent_config, payload["tools"]):
+        plan.attach_tools.append(tool_ids[name])
+    for name in sorted(MANAGED_TOOLS & attached.keys() - desired):
+        plan.detach_tools.append(attached[name])
+
+    return plan
+
+
+def apply_agent_update(client, agent_id: str, plan: AgentUpdatePlan, max_workers: int = 4):
+    """Send the planned calls, running the independent ones concurrently"""
+    if plan.is_empty():
+        return None
+
+    calls = []
+    if plan.modify:
+        calls.append(lambda: client.agents.modify(agent_id, **plan.modify))
+    for label, value in plan.blocks.items():
+        calls.append(lambda label=label, value=value: client.agents.core_memory.modify_block(
+            agent_id=agent_id, block_label=label, value=value))
+    for tool_id in plan.attach_tools:
+        calls.append(lambda tool_id=tool_id: client.agents.tools.attach(agent_id=agent_id, tool_id=tool_id))
+    for tool_id in plan.detach_tools:
+        calls.append(lambda tool_id=tool_id: client.agents.tools.detach(agent_id=agent_id, tool_id=tool_id))
+
+    if len(calls) == 1:
+        results = [calls[0]()]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(calls))) as pool:
+            # Copy the caller's context so calls stay attributed to its rerun
+            futures = [pool.submit(contextvars.copy_context().run, call) for call in calls]
+            # result() re-raises the first failure so the caller can report it
+            results = [future.result() for future in futures]
+
+    return results[0] if plan.modify else None
+
+
+async def apply_agent_update_async(client, agent_id: str, plan: AgentUpdatePlan):
+    """Async variant of apply_agent_update for an AsyncLetta client"""
+    if plan.is_empty():
+        return None
+
+    calls = []
+    if plan.modify:
+        calls.append(client.agents.modify(agent_id, **plan.modify))
+    for label, value in plan.blocks.items():
+        calls.append(client.agents.core_memory.modify_block(agent_id=agent_id, block_label=label, value=value))
+    for tool_id in plan.attach_tools:
+        calls.append(client.agents.tools.attach(agent_id=agent_id, tool_id=tool_id))
+    for tool_id in plan.detach_tools:
+        calls.append(client.agents.tools.detach(agent_id=agent_id, tool_id=tool_id))
+
+    results = await asyncio.gather(*calls)
+    return results[0] if plan.modify else None
@@ -0,0 +1,185 @@
+"""Agent operations run as background jobs.
+
+Pages submit a job and keep its id; the work runs on the job queue's
+workers, so slow providers do not block the script thread and the result is
+still there after a rerun or a page switch.
+"""
+import dataclasses
+import hashlib
+import json
+import os
+
+import streamlit as st
+
+import agent_service
+from agent_registry import get_agent_registry
+from job_queue import DEFAULT_QUEUE_PATH, FAILED, FINISHED, SUCCEEDED, JobQueue
+from letta_clients import get_async_client, get_client, run_async
+from meeting import create_and_test_agent, run_meeting
+from provider_health import route_new_agent
+
+
+def idempotency_key(kind, params):
+    """Same kind and parameters, same key: a double click does not run the job twice"""
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{kind}:{digest}"
+
+
+def _agent_summary(agent):
+    return {"id": agent.id, "name": agent.name}
+
+
+def save_agent_job(params, progress):
+    progress(0.1, f"{params['action'].capitalize()} {params['agent_name']}")
+    rerouted = None
+    if params["action"] == "create":
+        # With LETTA_AUTO_FAILOVER, a new agent skips a failing or much slower model
+        provider, model, reason = route_new_agent(params["model_endpoint_type"], params["model"],
+                                                  params["context_window"])
+        if reason:
+            rerouted = f"created on {provider}/{model} because {reason}"
+            params = {**params, "model_endpoint_type": provider, "model": model}
+            progress(0.2, rerouted)
+    return {**_agent_summary(agent_service.save_agent(**params)), "rerouted": rerouted}
+
+
+def delete_agent_job(params, progress):
+    agent_service.delete_agent(params["agent_id"])
+    return {"id": params["agent_id"]}
+
+
+def reassign_agents_job(params, progress):
+    moves = params["moves"]
+    moved, failed = [], {}
+    for number, (agent_id, provider, model) in enumerate(moves, 1):
+        try:
+            agent_service.reassign_agent(agent_id, provider, model)
+            moved.append(agent_id)
+        except Exception as e:
+            # One agent failing to move should not hold back the rest
+            failed[agent_id] = str(e)
+        progress(number / len(moves), f"Moved {len(moved)} of {len(moves)} agents")
+    if failed and not moved:
+        raise RuntimeError(f"No agent could be reassigned: {next(iter(failed.values()))}")
+    return {"moved": moved, "failed": failed}
+
+
+def create_and_test_agent_job(params, progress):
+    progress(0.1, "Creating test agent")
+    result = create_and_test_agent(get_client(), pause=params.get("pause", 0))
+    if result is None:
+        # create_and_test_agent prints its error; raise so the job shows as failed
+        raise RuntimeError("Test agent could not be created or did not reply")
+    agent, response = result
+    return {"agent": _agent_summary(agent), "response": str(response)}
+
+
+def meeting_job(params, progress):
+    registry = get_agent_registry(get_client())
+    registry.list_agents()
+    supervisor = registry.get(params["supervisor_id"])
+    if supervisor is None:
+        raise ValueError(f"Supervisor {params['supervisor_id']} no longer exists")
+    subordinates = registry.agents_by_ids(registry.hierarchy.reports_to(supervisor.id))
+    rounds = params["rounds"]
+    progress(0.0, f"Round 1 of {rounds}")
+
+    def on_round(number, meeting_round):
+        progress(number / rounds, f"Round {number} of {rounds} done in {meeting_round.elapsed:.1f}s")
+
+    meeting = run_async(run_meeting(
+        get_async_client(), supervisor, subordinates, params["agenda"],
+        rounds=rounds, deadline=params["deadline"], on_round=on_round,
+    ))
+    return {"supervisor": supervisor.name, "rounds": [dataclasses.asdict(meeting_round) for meeting_round in meeting]}
+
+
+HANDLERS = {
+    "save_agent": save_agent_job,
+    "delete_agent": delete_agent_job,
+    "create_and_test_agent": create_and_test_agent_job,
+    "meeting": meeting_job,
+    "reassign_agents": reassign_agents_job,
+}
+
+
+def describe(job):
+    """One-line label for a job in the pages' job lists"""
+    params = job["params"]
+    if job["kind"] == "save_agent":
+        return f"{params['action'].capitalize()} {params['agent_name']}"
+    if job["kind"] == "delete_agent":
+        return f"Delete {params['agent_id']}"
+    if job["kind"] == "meeting":
+        return f"Meeting: {params['agenda'][:40]}"
+    if job["kind"] == "reassign_agents":
+        return f"Reassign {len(params['moves'])} agents to {params['label']}"
+    return job["kind"].replace("_", " ").capitalize()
+
+
+@st.cache_resource
+def get_job_queue():
+    """Process-wide job queue with its worker pool already running"""
+    queue = JobQueue(
+        os.getenv("LETTA_JOB_QUEUE", DEFAULT_QUEUE_PATH),
+        workers=int(os.getenv("LETTA_JOB_WORKERS", "4")),
+    )
+    for kind, handler in HANDLERS.items():
+        queue.register(kind, handler)
+    return queue.start()
+
+
+# Jobs each session keeps following in its jobs panel
+TRACKED_JOBS = 10
+
+
+def creates_agent(kind, params):
+    """Whether a job creates an agent, so a retry after a timeout could create a duplicate"""
+    return kind == "create_and_test_agent" or (kind == "save_agent" and params.get("action") == "create")
+
+
+def submit(kind, params, max_attempts=3):
+    """Queue an agent operation; returns the job id, reusing it for repeated identical submits"""
+    if creates_agent(kind, params):
+        # The server may have created the agent before the error reached us
+        max_attempts = 1
+    return get_job_queue().submit(kind, params, idempotency_key=idempotency_key(kind, params),
+                                  max_attempts=max_attempts)
+
+
+def track(job_id):
+    """Follow a job in this session's jobs panel"""
+    tracked = st.session_state.setdefault("letta_jobs", [])
+    if job_id not in tracked:
+        tracked.append(job_id)
+        del tracked[:-TRACKED_JOBS]
+
+
+@st.fragment(run_every=2)
+def render_job_panel():
+    """Live status of this session's jobs; reruns the whole page when one finishes"""
+    tracked = st.session_state.get("letta_jobs")
+    if not tracked:
+        # No queue or worker threads until the session submits something
+        return
+    jobs = [job for job in map(get_job_queue().get, tracked) if job]
+    st.subheader("Background jobs")
+    for job in reversed(jobs):
+        label = describe(job)
+        if job["status"] == SUCCEEDED:
+            rerouted = (job["result"] or {}).get("rerouted")
+            st.success(f"{label}: {rerouted}" if rerouted else label)
+        elif job["status"] == FAILED:
+            st.error(f"{label}: {job['error'].splitlines()[0]}")
+        elif job["status"] in FINISHED:
+            st.info(f"{label}: {job['status']}")
+        else:
+            retry = f" (attempt {job['attempts']})" if job["attempts"] > 1 else ""
+            st.progress(job["progress"], text=f"{label}: {job['message'] or job['status']}{retry}")
+
+    seen = st.session_state.setdefault("letta_jobs_seen", set())
+    finished = {job["id"] for job in jobs if job["status"] in FINISHED} - seen
+    if finished:
+        seen.update(finished)
+        # Show the agents the finished jobs created, changed or removed
+        st.rerun()
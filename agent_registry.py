@@ -0,0 +1,164 @@
+import hashlib
+import threading
+import time
+
+import streamlit as st
+
+from agent_search import AgentSearchIndex, persona_of
+from hierarchy import HierarchyIndex
+
+
+class AgentRegistry:
+    """Process-wide cache of Letta agents with TTL and change detection"""
+
+    def __init__(self, client, ttl=30.0):
+        self.client = client
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._agents = None
+        self._listed_at = 0.0
+        self._etag = None
+        self._versions = {}
+        self._details = {}
+        self._by_id = {}
+        self.hierarchy = HierarchyIndex()
+        self.search = AgentSearchIndex()
+
+    @staticmethod
+    def _version(agent):
+        """Return the change marker the server exposes for an agent"""
+        updated_at = getattr(agent, "updated_at", None)
+        return str(updated_at) if updated_at else ""
+
+    def _compute_etag(self):
+        """Hash agent ids and versions so callers can detect listing changes"""
+        digest = hashlib.sha256()
+        for agent_id in sorted(self._versions):
+            digest.update(f"{agent_id}:{self._versions[agent_id]};".encode())
+        return digest.hexdigest()
+
+    @property
+    def etag(self):
+        """Fingerprint of the current listing, None before the first fetch"""
+        return self._etag
+
+    def is_fresh(self):
+        """Whether the cached listing is still inside its TTL"""
+        return self._agents is not None and time.monotonic() - self._listed_at < self.ttl
+
+    def _store_listing(self, agents):
+        versions = {agent.id: self._version(agent) for agent in agents}
+
+        # Drop cached details for agents that changed, vanished or carry no version
+        for agent_id in list(self._details):
+            new_version = versions.get(agent_id)
+            if not new_version or new_version != self._versions.get(agent_id):
+                self._details.pop(agent_id, None)
+
+        self._agents = list(agents)
+        self._by_id = {agent.id: agent for agent in agents}
+        self.hierarchy.sync(agents)
+        self.search.sync(agents)
+        self._versions = versions
+        self._listed_at = time.monotonic()
+        self._etag = self._compute_etag()
+
+    def store_listing(self, agents):
+        """Record a listing fetched elsewhere, e.g. by the async client"""
+        with self._lock:
+            self._store_listing(agents)
+
+    def cached_agents(self):
+        """The listing if still fresh, otherwise None"""
+        with self._lock:
+            return list(self._agents) if self.is_fresh() else None
+
+    def cached_details(self, agent_id):
+        """Full agent state if cached and the listing is still fresh"""
+        with self._lock:
+            return self._details.get(agent_id) if self.is_fresh() else None
+
+    def list_agents(self, force=False):
+        """Return all agents, hitting the server only when the TTL expired"""
+        with self._lock:
+            if not force and self.is_fresh():
+                return list(self._agents)
+            agents = self.client.agents.list()
+            self._store_listing(agents)
+            return list(self._agents)
+
+    def retrieve(self, agent_id, force=False):
+        """Return full agent state, reusing it while the listing says it is unchanged"""
+        with self._lock:
+            if not self.is_fresh():
+                # One listing call revalidates every cached detail at once
+                self.list_agents(force=True)
+            if not force and agent_id in self._details:
+                return self._details[agent_id]
+            agent = self.client.agents.retrieve(agent_id)
+            self._details[agent_id] = agent
+            return agent
+
+    def upsert(self, agent):
+        """Write a freshly created or retrieved agent through to the cache"""
+        with self._lock:
+            if self._agents is not None:
+                self._agents = [a for a in self._agents if a.id != agent.id] + [agent]
+            self._by_id[agent.id] = agent
+            self.hierarchy.add(agent.id, agent.name, agent.tags)
+            self.search.add(agent.id, agent.name, agent.tags, persona_of(agent))
+            self._versions[agent.id] = self._version(agent)
+            self._details[agent.id] = agent
+            self._etag = self._compute_etag()
+
+    def remove(self, agent_id):
+        """Drop a deleted agent without refetching the listing"""
+        with self._lock:
+            if self._agents is not None:
+                self._agents = [a for a in self._agents if a.id != agent_id]
+            self._by_id.pop(agent_id, None)
+            self.hierarchy.remove(agent_id)
+            self.search.remove(agent_id)
+            self._versions.pop(agent_id, None)
+            self._details.pop(agent_id, None)
+            self._etag = self._compute_etag()
+
+    def get(self, agent_id):
+        """Listed agent by id, without a server call"""
+        return self._by_id.get(agent_id)
+
+    def agents_by_ids(self, agent_ids):
+        """Listed agents for a set of ids, sorted by name"""
+        agents = [self._by_id[agent_id] for agent_id in agent_ids if agent_id in self._by_id]
+        return sorted(agents, key=lambda agent: agent.name)
+
+    def search_agents(self, query, k=20):
+        """Ids of the agents best matching a search query, see AgentSearchIndex.search"""
+        with self._lock:
+            return self.search.search(query, k=k)
+
+    def refresh(self, agent_id, agent=None):
+        """Write one changed agent through to the listing, retrieving it unless given
+
+        The rest of the listing stays fresh, so a modify costs one call at most
+        rather than a re-list of the whole fleet on the next rerun.
+        """
+        if agent is None:
+            agent = self.client.agents.retrieve(agent_id)
+        self.upsert(agent)
+        return agent
+
+    def invalidate(self, agent_id=None):
+        """Forget one agent's details, or everything and expire the listing"""
+        with self._lock:
+            if agent_id is None:
+                self._details.clear()
+                self._listed_at = 0.0
+            else:
+                self._details.pop(agent_id, None)
+
+
+@st.cache_resource
+def get_agent_registry(_client, ttl=30.0):
+    """Shared registry for every page and session in this process"""
+    return AgentRegistry(_client, ttl=ttl)
@@ -0,0 +1,135 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import streamlit as st
+
+from hierarchy import parse_hierarchy_tags
+
+# How much a query trigram found in each field counts towards an agent's score
+FIELD_WEIGHTS = {"name": 3.0, "supervisor": 2.0, "tags": 1.5, "persona": 1.0}
+
+# Only the start of a persona is indexed; it says who the agent is and keeps postings small
+PERSONA_CHARS = 300
+
+WORD = re.compile(r"\w+")
+
+
+def trigrams(text):
+    """Padded trigrams of each word, so one or two typed characters still match a word start"""
+    grams = set()
+    for word in WORD.findall((text or "").lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def persona_of(agent):
+    memory = getattr(agent, "memory", None)
+    for block in getattr(memory, "blocks", None) or []:
+        if block.label == "persona":
+            return block.value
+    return None
+
+
+class AgentSearchIndex:
+    """Trigram index over agent name, tags, supervisor and persona, maintained incrementally"""
+
+    def __init__(self):
+        self._entries = {}
+        self._grams = {}
+        self._postings = defaultdict(dict)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, agent_id, name, tags, persona=None):
+        """Index a new agent or re-index a changed one; persona None keeps the indexed persona"""
+        if persona is None and agent_id in self._entries:
+            persona = self._entries[agent_id][2]
+        persona = (persona or "")[:PERSONA_CHARS]
+        entry = (name, tuple(tags or ()), persona)
+        if self._entries.get(agent_id) == entry:
+            return
+        self.remove(agent_id)
+        _, supervisor = parse_hierarchy_tags(tags)
+        fields = {"name": name, "supervisor": supervisor, "tags": " ".join(tags or ()), "persona": persona}
+        grams = {}
+        for field, text in fields.items():
+            for gram in trigrams(text):
+                grams[gram] = max(grams.get(gram, 0.0), FIELD_WEIGHTS[field])
+        for gram, weight in grams.items():
+            self._postings[gram][agent_id] = weight
+        self._entries[agent_id] = entry
+        self._grams[agent_id] = grams
+
+    def remove(self, agent_id):
+        if self._entries.pop(agent_id, None) is None:
+            return
+        for gram in self._grams.pop(agent_id):
+            postings = self._postings[gram]
+            postings.pop(agent_id, None)
+            if not postings:
+                del self._postings[gram]
+
+    def sync(self, agents):
+        """Bring the index in line with a full listing, touching only what changed"""
+        seen = set()
+        for agent in agents:
+            seen.add(agent.id)
+            self.add(agent.id, agent.name, agent.tags, persona_of(agent) or "")
+        for agent_id in set(self._entries) - seen:
+            self.remove(agent_id)
+
+    def search(self, query, k=20) -> List[str]:
+        """Ids of the k best matching agents (all with k None); an empty query returns the first k by name"""
+        query = (query or "").strip().lower()
+        if not query:
+            return sorted(self._entries, key=lambda agent_id: self._entries[agent_id][0].lower())[:k]
+        query_grams = trigrams(query)
+        scores: Dict[str, float] = defaultdict(float)
+        for gram in query_grams:
+            for agent_id, weight in self._postings.get(gram, {}).items():
+                scores[agent_id] += weight
+        top_weight = max(FIELD_WEIGHTS.values())
+        for agent_id in scores:
+            scores[agent_id] /= len(query_grams) * top_weight
+            name = self._entries[agent_id][0].lower()
+            # Typing a name (or its start) should put that agent first
+            if name == query:
+                scores[agent_id] += 2.0
+            elif name.startswith(query):
+                scores[agent_id] += 1.0
+        ranked = sorted(scores, key=lambda agent_id: (-scores[agent_id], self._entries[agent_id][0].lower()))
+        return ranked[:k]
+
+
+def agent_picker(registry, label, key, k=20, format_agent=None, agent_ids=None) -> Optional[object]:
+    """Search box plus a selectbox of the top k matches; returns the chosen agent
+
+    Options are agent ids, so agents sharing a name stay distinct and only k
+    labels are sent to the browser however large the fleet is. agent_ids
+    limits the choice to those agents, e.g. supervisors.
+    """
+    format_agent = format_agent or (lambda agent: f"{agent.name} ({agent.id[-8:]})")
+    query = st.text_input(label, key=f"{key}_query", placeholder="Search name, tag, supervisor or persona")
+    if agent_ids is None:
+        ids = registry.search_agents(query, k=k)
+    else:
+        ids = [agent_id for agent_id in registry.search_agents(query, k=None) if agent_id in agent_ids][:k]
+    selected_id = st.session_state.get(key)
+    # Keep the current choice selectable while the results change around it
+    if selected_id and selected_id not in ids and registry.get(selected_id) is not None:
+        ids = [selected_id] + ids[:k - 1]
+    ids = [agent_id for agent_id in ids if registry.get(agent_id) is not None]
+    if not ids:
+        st.caption("No agents match")
+        return None
+    selected_id = st.selectbox(
+        "Matches:",
+        options=ids,
+        index=ids.index(selected_id) if selected_id in ids else 0,
+        format_func=lambda agent_id: format_agent(registry.get(agent_id)),
+        key=key,
+    )
+    return registry.get(selected_id)
@@ -0,0 +1,148 @@
+"""Agent management shared by every page.
+
+Importing this module builds no client and makes no requests; the pooled
+client and the registries are created on first use. Errors are raised for
+the calling page to report.
+
+The *_async variants run the same planning against the async client, for
+callers fanning out several operations at once with asyncio.gather.
+"""
+from agent_config import LEVELS, build_agent_payload, get_template
+from agent_diff import apply_agent_update, apply_agent_update_async, missing_tools, plan_agent_update
+from agent_registry import get_agent_registry
+from hierarchy import parse_hierarchy_tags
+from letta_clients import get_async_client, get_client, server_url
+from tool_registry import get_tool_registry
+
+
+def list_agents(force=False):
+    """List all available Letta agents"""
+    return get_agent_registry(get_client()).list_agents(force=force)
+
+
+def _agent_payload(action, persona_value, job_directives, level, supervisor_name, agent_name, temperature,
+                   model_endpoint_type, model, context_window, agent_id=None):
+    """Check the action and build the create payload (or modify target) from the form's values"""
+    if action == "create":
+        if level not in LEVELS:
+            raise ValueError(f"Level must be one of {', '.join(map(str, LEVELS))}")
+    elif action != "modify" or not agent_id:
+        raise ValueError("Invalid action or missing agent ID for modification")
+    return build_agent_payload(
+        agent_name=agent_name,
+        persona_value=persona_value,
+        job_directives=job_directives,
+        level=level,
+        supervisor_name=supervisor_name,
+        temperature=temperature,
+        model_endpoint_type=model_endpoint_type,
+        model=model,
+        context_window=context_window
+    )
+
+
+def _stale_response(plan):
+    """Whether to re-retrieve after a plan; the modify response predates its block and tool changes"""
+    return not plan.modify or bool(plan.blocks or plan.attach_tools or plan.detach_tools)
+
+
+def save_agent(action, persona_value, job_directives, level, supervisor_name, agent_name, temperature,
+               model_endpoint_type, model, context_window, agent_id=None):
+    """Create or update a Letta agent based on specified action"""
+    client = get_client()
+    registry = get_agent_registry(client)
+    payload = _agent_payload(action, persona_value, job_directives, level, supervisor_name, agent_name,
+                             temperature, model_endpoint_type, model, context_window, agent_id)
+
+    if action == "create":
+        agent = client.agents.create(**payload)
+        registry.upsert(agent)
+        return agent
+
+    # Only send the calls whose fields differ from the current agent
+    agent_config = registry.retrieve(agent_id)
+    tool_registry = get_tool_registry(server_url())
+    tool_ids = tool_registry.resolve(client, missing_tools(agent_config, payload["tools"]))
+    plan = plan_agent_update(agent_config, payload, tool_ids)
+    try:
+        updated_agent = apply_agent_update(client, agent_id, plan)
+    except Exception:
+        # A stale tool id fails the attach; relist the server's tools next time
+        if plan.attach_tools:
+            tool_registry.invalidate()
+        raise
+    if plan.is_empty():
+        return agent_config
+    return registry.refresh(agent_id, None if _stale_response(plan) else updated_agent)
+
+
+def delete_agent(agent_id):
+    """Delete a Letta agent by ID"""
+    client = get_client()
+    client.agents.delete(agent_id)
+    get_agent_registry(client).remove(agent_id)
+    return True
+
+
+async def list_agents_async(force=False):
+    """list_agents on the async client, sharing the registry's listing"""
+    registry = get_agent_registry(get_client())
+    cached = None if force else registry.cached_agents()
+    if cached is not None:
+        return cached
+    agents = await get_async_client().agents.list()
+    registry.store_listing(agents)
+    return list(agents)
+
+
+async def save_agent_async(action, persona_value, job_directives, level, supervisor_name, agent_name, temperature,
+                           model_endpoint_type, model, context_window, agent_id=None):
+    """save_agent on the async client, with the same payload, update plan and registry write-through"""
+    client = get_async_client()
+    registry = get_agent_registry(get_client())
+    payload = _agent_payload(action, persona_value, job_directives, level, supervisor_name, agent_name,
+                             temperature, model_endpoint_type, model, context_window, agent_id)
+
+    if action == "create":
+        agent = await client.agents.create(**payload)
+        registry.upsert(agent)
+        return agent
+
+    agent_config = registry.cached_details(agent_id)
+    if agent_config is None:
+        agent_config = await client.agents.retrieve(agent_id)
+    tool_registry = get_tool_registry(server_url())
+    tool_ids = await tool_registry.resolve_async(get_client(), missing_tools(agent_config, payload["tools"]))
+    plan = plan_agent_update(agent_config, payload, tool_ids)
+    try:
+        updated_agent = await apply_agent_update_async(client, agent_id, plan)
+    except Exception:
+        if plan.attach_tools:
+            tool_registry.invalidate()
+        raise
+    if plan.is_empty():
+        return agent_config
+    if _stale_response(plan):
+        updated_agent = await client.agents.retrieve(agent_id)
+    return registry.refresh(agent_id, updated_agent)
+
+
+async def delete_agent_async(agent_id):
+    """delete_agent on the async client"""
+    await get_async_client().agents.delete(agent_id)
+    get_agent_registry(get_client()).remove(agent_id)
+    return True
+
+
+def reassign_agent(agent_id, provider, model):
+    """Move an agent to another provider and model, keeping its context window and temperature"""
+    client = get_client()
+    registry = get_agent_registry(client)
+    agent_config = registry.retrieve(agent_id)
+    level, _ = parse_hierarchy_tags(agent_config.tags)
+    llm_config = {
+        **get_template(provider, model, level).llm_config,
+        "context_window": agent_config.llm_config.context_window,
+        "temperature": agent_config.llm_config.temperature,
+    }
+    return registry.refresh(agent_id, client.agents.modify(agent_id, llm_config=llm_config))
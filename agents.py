@@ -1,157 +1,72 @@
 import streamlit as st
-from letta_client import Letta
 import dotenv
+import agent_jobs
+import agent_service
+from agent_registry import get_agent_registry
+from agent_search import agent_picker
+from agent_config import CONTEXT_WINDOWS, DEFAULT_CONTEXT_WINDOW, LEVELS, MODEL_OPTIONS, PROVIDERS, build_agent_payload
+from context_planner import describe_plan, plan_context
+from letta_clients import get_client, server_url
+from hierarchy import parse_hierarchy_tags
+from instrumentation import begin_rerun, render_debug_sidebar
+from tool_registry import get_tool_registry
 
 # Load environment variables
 dotenv.load_dotenv()
 
 st.set_page_config(layout="wide")
 
-# Initialize Letta client
-client = Letta(base_url="http://localhost:8283")
+# Shared agent cache so reruns that change nothing skip the server
+registry = get_agent_registry(get_client())
 
 
-def save_agent(action, persona_value, job_directives, level, supervisor_name, agent_name, temperature, 
-              model_endpoint_type, model, context_window, agent_id=None):
-    """Create or update a Letta agent based on specified action"""
-    try:
-        # Common memory blocks structure
-        memory_blocks = [
-            {
-                "label": "job_directives",
-                "value": job_directives,
-                "limit": 2000
-            },
-            {
-                "label": "persona",
-                "value": persona_value,
-                "limit": 3000
-            }
-        ]
-        
-        # Set model endpoint based on provider
-        model_endpoints = {
-            "openai": "https://api.openai.com/v1",
-            "anthropic": "https://api.anthropic.com/v1",
-            "groq": "https://api.groq.com/v1",
-            "mistral": "https://api.mistral.ai/v1",
-            "cohere": "https://api.cohere.ai/v1"
-        }
-        
-        model_endpoint = model_endpoints.get(model_endpoint_type)
-        
-        # Common LLM config
-        llm_config = {
-            "model": model,
-            "model_endpoint_type": model_endpoint_type,
-            "model_endpoint": model_endpoint,
-            "context_window": context_window,
-            "temperature": temperature,
-        }
-        
-        # Update embedding config to support multiple providers
-        embedding_providers = {
-            "openai": {
-                "model": "text-embedding-3-small",
-                "endpoint_type": "openai",
-                "endpoint": "https://api.openai.com/v1",
-                "dim": 1536
-            },
-            "cohere": {
-                "model": "embed-english-v3.0",
-                "endpoint_type": "cohere",
-                "endpoint": "https://api.cohere.ai/v1",
-                "dim": 1024
-            }
-        }
-        
-        # Default to OpenAI embeddings, but use Cohere if selected
-        embedding_config = {
-            "embedding_model": embedding_providers[model_endpoint_type]["model"] if model_endpoint_type in embedding_providers else embedding_providers["openai"]["model"],
-            "embedding_endpoint_type": embedding_providers[model_endpoint_type]["endpoint_type"] if model_endpoint_type in embedding_providers else embedding_providers["openai"]["endpoint_type"],
-            "embedding_endpoint": embedding_providers[model_endpoint_type]["endpoint"] if model_endpoint_type in embedding_providers else embedding_providers["openai"]["endpoint"],
-            "embedding_dim": embedding_providers[model_endpoint_type]["dim"] if model_endpoint_type in embedding_providers else embedding_providers["openai"]["dim"]
-        }
-        
-        tags = [f"level_{level}", f"{supervisor_name}_sub"]
-        tools = []
-        if level > 1:
-            tools.append("send_message_to_agents_matching_all_tags")
+# The page reports errors inline; the shared logic lives in agent_service
 
-        if action == "create":
-            # Validation for create action
-            if level not in [1, 2, 3]:
-                st.error("Level must be 1, 2, or 3")
-                return None
-                
-            return client.agents.create(
-                name=agent_name,
-                memory_blocks=memory_blocks,
-                llm_config=llm_config,
-                embedding_config=embedding_config,
-                tags=tags,
-                tools=tools
-            )
-            
-        elif action == "modify" and agent_id:
-            updated_agent = client.agents.modify(
-                agent_id,
-                name=agent_name,
-                llm_config=llm_config,
-                embedding_config=embedding_config,
-                tags=tags,
-            )
-            client.agents.core_memory.modify_block(
-                agent_id=agent_id,
-                block_label="job_directives",
-                value=job_directives
-            )
-            client.agents.core_memory.modify_block(
-                agent_id=agent_id,
-                block_label="persona",
-                value=persona_value
-            )
-            #attaching send message to agents matching all tags tool if level > 1
-            if level > 1:
-                client.agents.tools.attach(
-                    agent_id=agent_id,
-                    tool_id="tool-87868ef9-46d1-43a7-aa95-7698a3968317"
-                )            
-        else:
-            st.error("Invalid action or missing agent ID for modification")
-            return None
-            
+def submit_job(kind, **params):
+    """Hand an agent operation to the background workers and follow it in the jobs panel"""
+    try:
+        job_id = agent_jobs.submit(kind, params)
     except Exception as e:
         st.error(f"Error: {str(e)}")
         return None
+    agent_jobs.track(job_id)
+    return job_id
+
+@st.cache_data(ttl=600, show_spinner=False)
+def tool_schemas(base_url, tool_names):
+    """Schemas of a level's tools, fetched once per server and tool set rather than on every rerun"""
+    return get_tool_registry(base_url).schemas(get_client(), tool_names)
 
-def delete_agent(agent_id):
-    """Delete a Letta agent by ID"""
+def show_context_budget(system_prompt=None, **form):
+    """Token budget of the form's current values, with a warning when it does not fit"""
+    payload = build_agent_payload(**form)
     try:
-        client.agents.delete(agent_id)
-        return True
+        schemas = tool_schemas(server_url(), tuple(payload["tools"]))
     except Exception as e:
-        st.error(f"Error: {str(e)}")
-        return False
+        st.warning(f"Tool schemas unavailable, so the budget counts tool names only: {str(e)}")
+        schemas = None
+    plan = plan_context(payload, tool_schemas=schemas, system_prompt=system_prompt)
+    st.caption(describe_plan(plan))
+    for warning in plan.warnings:
+        st.warning(warning)
+    if not plan.fits and plan.suggested_models:
+        provider, model, window = plan.suggested_models[0]
+        st.info(f"Smallest fit: {provider}/{model} with a {window} token window")
 
-def list_agents():
+def list_agents(force=False):
     """List all available Letta agents"""
     try:
-        def fetch_agents():
-            return client.agents.list()
-            
-        agents = fetch_agents()
-        return agents
+        return agent_service.list_agents(force=force)
     except Exception as e:
         st.error(f"Error: {str(e)}")
         return []
 
 # Streamlit UI
 st.title("Agent Factory")
+rerun_id = begin_rerun("agents")
 
-# Initialize session state for agents if not exists
-if 'agents' not in st.session_state:
-    st.session_state.agents = list_agents()
+# One cached listing per rerun, shared with the other pages
+st.session_state.agents = list_agents()
 
 # Create two columns for the layout
 col1, col2 = st.columns([1, 2])
@@ -159,16 +74,13 @@ col1, col2 = st.columns([1, 2])
 # Left column - List of agents
 with col1:
     st.header("Agent List")
-    agents = list_agents()
-    # Create a simple selectbox with just agent names
+    agents = st.session_state.agents
+    # Search-as-you-type over the registry's index; only the top matches reach the browser
     if agents:
-        agent_names = [agent.name for agent in st.session_state.agents]
-        selected_name = st.selectbox("Select an agent:", options=agent_names)
-        selected_agent = next(agent for agent in st.session_state.agents if agent.name == selected_name)
+        selected_agent = agent_picker(registry, "Find an agent:", key="factory_agent")
     else:
         st.info("No agents found")
         selected_agent = None
-    st.session_state.agents = agents
 
 # Right column - Agent details and actions
 with col2:
@@ -176,12 +88,15 @@ with col2:
         st.header("Agent Details")
         
         try:
-            agent_config = client.agents.retrieve(selected_agent.id)
+            agent_config = registry.retrieve(selected_agent.id)
             current_memory = agent_config.memory
             
-            # Extract current tags
-            current_level = next((int(tag.split('_')[1]) for tag in agent_config.tags if tag.startswith('level_')), 1)
-            current_supervisor = next((tag.replace('_sub', '') for tag in agent_config.tags if tag.endswith('_sub')), "")
+            # Hierarchy position comes from the registry's tag index
+            if selected_agent.id in registry.hierarchy:
+                current_level = registry.hierarchy.level_of(selected_agent.id)
+                current_supervisor = registry.hierarchy.supervisor_of(selected_agent.id)
+            else:
+                current_level, current_supervisor = parse_hierarchy_tags(agent_config.tags)
             
             # Extract memory blocks
             current_persona = ""
@@ -201,15 +116,17 @@ with col2:
             current_context_window = llm_config.context_window
             current_temperature = llm_config.temperature
             current_name = agent_config.name
+            current_system = agent_config.system
 
         except Exception as e:
             st.error(f"Error fetching agent configuration: {str(e)}")
             current_name = current_persona = current_job_directives = ""
+            current_system = None
             current_level = 1
             current_supervisor = ""
             current_model = "gpt-4o-mini"
             current_provider = "openai"
-            current_context_window = 16000
+            current_context_window = DEFAULT_CONTEXT_WINDOW
             current_temperature = 0.7
 
         # Editable fields
@@ -221,42 +138,51 @@ with col2:
         col_model1, col_model2 = st.columns(2)
         with col_model1:
             new_provider = st.selectbox("Model Provider:", 
-                options=["openai", "anthropic", "groq", "mistral", "cohere"],
-                index=["openai", "anthropic", "groq", "mistral", "cohere"].index(current_provider),
+                options=PROVIDERS,
+                index=PROVIDERS.index(current_provider) if current_provider in PROVIDERS else 0,
                 key=f"provider_{selected_agent.id}")
         with col_model2:
-            model_options = {
-                "openai": ["gpt-4o-mini", "gpt-4-turbo", "gpt-3.5-turbo"],
-                "anthropic": ["claude-3-haiku", "claude-3-sonnet", "claude-3-opus"],
-                "groq": ["llama3-70b-8192", "llama3-8b-8192", "mixtral-8x7b-32768"],
-                "mistral": ["mistral-large-latest", "mistral-medium-latest", "mistral-small-latest"],
-                "cohere": ["command-r-plus", "command-r", "command"]
-            }
             new_model = st.selectbox("Model:", 
-                options=model_options[new_provider],
-                index=model_options[new_provider].index(current_model) if current_model in model_options[new_provider] else 0,
+                options=MODEL_OPTIONS[new_provider],
+                index=MODEL_OPTIONS[new_provider].index(current_model) if current_model in MODEL_OPTIONS[new_provider] else 0,
                 key=f"model_{selected_agent.id}")
         
         new_context_window = st.selectbox("Context Window:", 
-            options=[4096, 8192, 16000, 32768, 128000, 200000],
-            index=[4096, 8192, 16000, 32768, 128000, 200000].index(current_context_window),
+            options=CONTEXT_WINDOWS,
+            index=CONTEXT_WINDOWS.index(current_context_window) if current_context_window in CONTEXT_WINDOWS
+            else CONTEXT_WINDOWS.index(DEFAULT_CONTEXT_WINDOW),
             key=f"context_{selected_agent.id}")
         
         col_supervisor, col_level = st.columns(2)
         with col_supervisor:
             new_supervisor = st.text_input("Supervisor Name:", value=current_supervisor, key=f"super_{selected_agent.id}")
         with col_level:
-            new_level = st.selectbox("Level:", [1, 2, 3], index=current_level-1, key=f"level_{selected_agent.id}")
+            new_level = st.selectbox("Level:", LEVELS,
+                                     index=LEVELS.index(current_level) if current_level in LEVELS else 0, key=f"level_{selected_agent.id}")
             
         new_temperature = st.slider("Temperature:", min_value=0.0, max_value=1.0, 
                                   value=current_temperature, step=0.1,
                                   key=f"temp_{selected_agent.id}")
+
+        show_context_budget(
+            system_prompt=current_system,
+            agent_name=new_name,
+            persona_value=new_persona,
+            job_directives=new_job_directives,
+            level=new_level,
+            supervisor_name=new_supervisor,
+            temperature=new_temperature,
+            model_endpoint_type=new_provider,
+            model=new_model,
+            context_window=new_context_window
+        )
         
         col_update, col_delete = st.columns(2)
         
         with col_update:
             if st.button("Update Agent", key=f"update_{selected_agent.id}"):
-                updated_agent = save_agent(
+                job_id = submit_job(
+                    "save_agent",
                     action="modify",
                     agent_id=selected_agent.id,
                     persona_value=new_persona,
@@ -269,17 +195,13 @@ with col2:
                     model=new_model,
                     context_window=new_context_window
                 )
-                if updated_agent:
-                    st.success(f"Updated agent {selected_agent.id}")
-                    st.session_state.agents = list_agents()
-                    st.rerun()
+                if job_id:
+                    st.info(f"Update of {new_name} queued")
                 
         with col_delete:
             if st.button("Delete Agent", type="primary", key=f"delete_{selected_agent.id}"):
-                if delete_agent(selected_agent.id):
-                    st.success(f"Deleted agent {selected_agent.id}")
-                    st.session_state.agents = list_agents()
-                    st.rerun()
+                if submit_job("delete_agent", agent_id=selected_agent.id):
+                    st.info(f"Deletion of {selected_agent.name} queued")
     
     # Create new agent section
     st.header("Create New Agent")
@@ -289,36 +211,42 @@ with col2:
             "I am a helpful AI assistant focused on providing clear and concise information.")
         job_directives_input = st.text_area("Enter job directives:", 
             "Your primary responsibility is to assist users with accurate information.")
-        level_input = st.selectbox("Select Level:", [1, 2, 3])
+        level_input = st.selectbox("Select Level:", LEVELS)
         supervisor_input = st.text_input("Enter Supervisor Name:")
         temperature_input = st.slider("Temperature:", min_value=0.0, max_value=1.0, 
                                     value=0.7, step=0.1)
         
         # Model configuration
         model_endpoint_type = st.selectbox("Model Provider:", 
-            options=["openai", "anthropic", "groq", "mistral", "cohere"])
+            options=PROVIDERS)
         
         # Model selection based on provider
-        model_options = {
-            "openai": ["gpt-4o-mini", "gpt-4-turbo", "gpt-3.5-turbo"],
-            "anthropic": ["claude-3-haiku", "claude-3-sonnet", "claude-3-opus"],
-            "groq": ["llama3-70b-8192", "llama3-8b-8192", "mixtral-8x7b-32768"],
-            "mistral": ["mistral-large-latest", "mistral-medium-latest", "mistral-small-latest"],
-            "cohere": ["command-r-plus", "command-r", "command"]
-        }
         model = st.selectbox("Model:", 
-            options=model_options[model_endpoint_type])
+            options=MODEL_OPTIONS[model_endpoint_type])
         
         # Context window selection
         context_window = st.selectbox("Context Window:", 
-            options=[4096, 8192, 16000, 32768, 128000, 200000],
-            index=2)  # Default to 16k
+            options=CONTEXT_WINDOWS,
+            index=CONTEXT_WINDOWS.index(DEFAULT_CONTEXT_WINDOW))
+
+        show_context_budget(
+            agent_name=agent_name_input,
+            persona_value=persona_input,
+            job_directives=job_directives_input,
+            level=level_input,
+            supervisor_name=supervisor_input,
+            temperature=temperature_input,
+            model_endpoint_type=model_endpoint_type,
+            model=model,
+            context_window=context_window
+        )
 
         if st.button("Create Agent"):
             if not supervisor_input:
                 st.error("Please enter a supervisor name")
             else:
-                agent = save_agent(
+                job_id = submit_job(
+                    "save_agent",
                     action="create",
                     persona_value=persona_input,
                     job_directives=job_directives_input,
@@ -330,7 +258,10 @@ with col2:
                     model=model,
                     context_window=context_window
                 )
-                if agent:
-                    st.success(f"Created agent with ID: {agent.id}")
-                    st.session_state.agents = list_agents()
-                    st.rerun()
+                if job_id:
+                    st.info(f"Creation of {agent_name_input} queued")
+
+# Progress of this session's jobs; the page refreshes as each one finishes
+agent_jobs.render_job_panel()
+
+render_debug_sidebar(rerun_id)
@@ -0,0 +1,345 @@
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+AGENT_PATH = r"^/v1/agents/(?P<agent_id>[^/]+)"
+
+ROUTES = [
+    ("GET", r"^/v1/agents/?$", "list_agents"),
+    ("POST", r"^/v1/agents/?$", "create_agent"),
+    ("GET", AGENT_PATH + r"/?$", "retrieve_agent"),
+    ("PATCH", AGENT_PATH + r"/?$", "modify_agent"),
+    ("DELETE", AGENT_PATH + r"/?$", "delete_agent"),
+    ("PATCH", AGENT_PATH + r"/core-memory/blocks/(?P<label>[^/]+)/?$", "modify_block"),
+    ("PATCH", AGENT_PATH + r"/tools/attach/(?P<tool_id>[^/]+)/?$", "attach_tool"),
+    ("PATCH", AGENT_PATH + r"/tools/detach/(?P<tool_id>[^/]+)/?$", "detach_tool"),
+    ("GET", AGENT_PATH + r"/messages/?$", "list_messages"),
+    ("POST", AGENT_PATH + r"/messages/?$", "create_message"),
+    ("POST", AGENT_PATH + r"/messages/stream/?$", "stream_message"),
+    ("GET", r"^/v1/tools/?$", "list_tools"),
+]
+COMPILED_ROUTES = [(method, re.compile(pattern), name) for method, pattern, name in ROUTES]
+
+TOOLS = [
+    {"id": "tool-87868ef9-46d1-43a7-aa95-7698a3968317", "name": "send_message_to_agents_matching_all_tags",
+     "tool_type": "letta_multi_agent_core"},
+    {"id": "tool-00000000-0000-0000-0000-000000000001", "name": "send_message", "tool_type": "letta_core"},
+]
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class MockLettaServer:
+    """In-memory stand-in for the Letta REST API with injectable latency and errors"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 chunk_interval=0.01, chunks=20, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.chunk_interval = chunk_interval
+        self.chunks = chunks
+        self.random = random.Random(seed)
+        self.agents = {}
+        self.messages = {}
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_counts(self):
+        with self._lock:
+            self.counts.clear()
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.counts.values())
+
+    # Store helpers
+
+    def make_agent(self, name, tags=None, llm_config=None, embedding_config=None, memory_blocks=None, tools=None):
+        agent_id = f"agent-{uuid.uuid4()}"
+        now = _now()
+        blocks = [
+            {"id": f"block-{uuid.uuid4()}", "label": block["label"], "value": block["value"],
+             "limit": block.get("limit", 2000)}
+            for block in memory_blocks or []
+        ]
+        tool_names = set(tools or [])
+        agent = {
+            "id": agent_id,
+            "name": name,
+            "system": "",
+            "agent_type": "memgpt_agent",
+            "llm_config": llm_config or {"model": "gpt-4o-mini", "model_endpoint_type": "openai",
+                                         "context_window": 16000, "temperature": 0.7},
+            "embedding_config": embedding_config or {"embedding_model": "text-embedding-3-small",
+                                                     "embedding_endpoint_type": "openai", "embedding_dim": 1536},
+            "memory": {"blocks": blocks, "prompt_template": ""},
+            "tools": [tool for tool in TOOLS if tool["name"] in tool_names],
+            "sources": [],
+            "tags": tags or [],
+            "message_ids": [],
+            "created_at": now,
+            "updated_at": now,
+        }
+        with self._lock:
+            self.agents[agent_id] = agent
+            self.messages[agent_id] = []
+        return agent
+
+    def seed_agents(self, count, levels=(1, 2, 3)):
+        """Populate the store directly, bypassing HTTP"""
+        for i in range(count):
+            level = levels[i % len(levels)]
+            self.make_agent(
+                name=f"agent_{i}",
+                tags=[f"level_{level}", f"agent_{i // 10}_sub"],
+                memory_blocks=[{"label": "job_directives", "value": f"Directives {i}"},
+                               {"label": "persona", "value": f"Persona {i}"}],
+            )
+
+    def _add_message(self, agent_id, message_type, **fields):
+        message = {"id": f"message-{uuid.uuid4()}", "date": _now(), "message_type": message_type, **fields}
+        self.messages[agent_id].append(message)
+        return message
+
+    # Request handling
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; avoid delayed-ACK stalls
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self, method):
+                parsed = urlparse(self.path)
+                for route_method, pattern, name in COMPILED_ROUTES:
+                    match = pattern.match(parsed.path)
+                    if route_method == method and match:
+                        break
+                else:
+                    return self._send(404, {"detail": f"No route for {method} {parsed.path}"})
+
+                with server._lock:
+                    server.counts[name] += 1
+
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+                parsed_query = parse_qs(parsed.query)
+                query = {key: values[-1] for key, values in parsed_query.items()}
+                # Repeated filters such as ?tags=a&tags=b keep every value
+                if "tags" in parsed_query:
+                    query["tags"] = parsed_query["tags"]
+
+                delay = server.latency + server.random.uniform(0, server.jitter)
+                if delay:
+                    time.sleep(delay)
+                if server.error_rate and server.random.random() < server.error_rate:
+                    return self._send(500, {"detail": "injected error"})
+
+                getattr(server, f"_handle_{name}")(self, body=body, query=query, **match.groupdict())
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PATCH(self):
+                self._dispatch("PATCH")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+        return Handler
+
+    def _agent_or_404(self, handler, agent_id):
+        agent = self.agents.get(agent_id)
+        if agent is None:
+            handler._send(404, {"detail": f"Agent {agent_id} not found"})
+        return agent
+
+    def _handle_list_agents(self, handler, body, query):
+        with self._lock:
+            agents = list(self.agents.values())
+        if "name" in query:
+            agents = [agent for agent in agents if agent["name"] == query["name"]]
+        if query.get("tags"):
+            match = all if query.get("match_all_tags") == "true" else any
+            agents = [agent for agent in agents if match(tag in agent["tags"] for tag in query["tags"])]
+        limit = int(query["limit"]) if "limit" in query else None
+        if "after" in query:
+            ids = [agent["id"] for agent in agents]
+            agents = agents[ids.index(query["after"]) + 1:] if query["after"] in ids else []
+        handler._send(200, agents[:limit] if limit else agents)
+
+    def _handle_create_agent(self, handler, body, query):
+        agent = self.make_agent(
+            name=body.get("name", "agent"),
+            tags=body.get("tags"),
+            llm_config=body.get("llm_config"),
+            embedding_config=body.get("embedding_config"),
+            memory_blocks=body.get("memory_blocks"),
+            tools=body.get("tools"),
+        )
+        handler._send(200, agent)
+
+    def _handle_retrieve_agent(self, handler, body, query, agent_id):
+        agent = self._agent_or_404(handler, agent_id)
+        if agent:
+            handler._send(200, agent)
+
+    def _handle_modify_agent(self, handler, body, query, agent_id):
+        agent = self._agent_or_404(handler, agent_id)
+        if agent:
+            with self._lock:
+                agent.update({key: value for key, value in body.items() if value is not None})
+                agent["updated_at"] = _now()
+            handler._send(200, agent)
+
+    def _handle_delete_agent(self, handler, body, query, agent_id):
+        with self._lock:
+            agent = self.agents.pop(agent_id, None)
+            self.messages.pop(agent_id, None)
+        if agent is None:
+            return handler._send(404, {"detail": f"Agent {agent_id} not found"})
+        handler._send(200, None)
+
+    def _handle_modify_block(self, handler, body, query, agent_id, label):
+        agent = self._agent_or_404(handler, agent_id)
+        if not agent:
+            return
+        with self._lock:
+            block = next((b for b in agent["memory"]["blocks"] if b["label"] == label), None)
+            if block is None:
+                return handler._send(404, {"detail": f"Block {label} not found"})
+            block.update({key: value for key, value in body.items() if value is not None})
+            agent["updated_at"] = _now()
+        handler._send(200, block)
+
+    def _handle_attach_tool(self, handler, body, query, agent_id, tool_id):
+        agent = self._agent_or_404(handler, agent_id)
+        if agent:
+            with self._lock:
+                tool = next((t for t in TOOLS if t["id"] == tool_id), None)
+                if tool and tool not in agent["tools"]:
+                    agent["tools"].append(tool)
+                agent["updated_at"] = _now()
+            handler._send(200, agent)
+
+    def _handle_detach_tool(self, handler, body, query, agent_id, tool_id):
+        agent = self._agent_or_404(handler, agent_id)
+        if agent:
+            with self._lock:
+                agent["tools"] = [t for t in agent["tools"] if t["id"] != tool_id]
+                agent["updated_at"] = _now()
+            handler._send(200, agent)
+
+    def _handle_list_tools(self, handler, body, query):
+        handler._send(200, TOOLS)
+
+    def _handle_list_messages(self, handler, body, query, agent_id):
+        if self._agent_or_404(handler, agent_id) is None:
+            return
+        with self._lock:
+            messages = list(self.messages.get(agent_id, []))
+        ids = [message["id"] for message in messages]
+        limit = int(query.get("limit", 100))
+        if query.get("after") in ids:
+            messages = messages[ids.index(query["after"]) + 1:][:limit]
+        else:
+            end = ids.index(query["before"]) if query.get("before") in ids else len(messages)
+            messages = messages[max(0, end - limit):end]
+        handler._send(200, messages)
+
+    def _reply_tokens(self):
+        return [f"token{i} " for i in range(self.chunks)]
+
+    def _handle_create_message(self, handler, body, query, agent_id):
+        if self._agent_or_404(handler, agent_id) is None:
+            return
+        prompt = body.get("messages", [{}])[0].get("content", "")
+        with self._lock:
+            user = self._add_message(agent_id, "user_message", content=prompt)
+            reasoning = self._add_message(agent_id, "reasoning_message", reasoning="Thinking about it.")
+            reply = self._add_message(agent_id, "assistant_message", content="".join(self._reply_tokens()))
+        # Non-streaming calls return the whole reply after the full generation time
+        time.sleep(self.chunk_interval * self.chunks)
+        handler._send(200, {
+            "messages": [user, reasoning, reply],
+            "usage": {"completion_tokens": self.chunks, "prompt_tokens": len(prompt.split()),
+                      "total_tokens": self.chunks + len(prompt.split()), "step_count": 1},
+        })
+
+    def _handle_stream_message(self, handler, body, query, agent_id):
+        if self._agent_or_404(handler, agent_id) is None:
+            return
+        prompt = body.get("messages", [{}])[0].get("content", "")
+        tokens = self._reply_tokens()
+        with self._lock:
+            self._add_message(agent_id, "user_message", content=prompt)
+            reasoning = self._add_message(agent_id, "reasoning_message", reasoning="Thinking about it.")
+            reply = self._add_message(agent_id, "assistant_message", content="".join(tokens))
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+
+        def event(payload):
+            handler.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+            handler.wfile.flush()
+
+        event(reasoning)
+        for token in tokens:
+            time.sleep(self.chunk_interval)
+            event({**reply, "content": token})
+        event({"message_type": "usage_statistics", "completion_tokens": len(tokens),
+               "prompt_tokens": len(prompt.split()), "total_tokens": len(tokens) + len(prompt.split()),
+               "step_count": 1})
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.close_connection = True
@@ -0,0 +1,329 @@
+"""Latency and load benchmarks against a local mock Letta server.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --agents 10 100 1000 --output bench.json
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import streamlit as st
+from streamlit import logger as streamlit_logger
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.mock_letta_server import MockLettaServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each page and the only title it may render on a cold load
+PAGES = {
+    "agents.py": "Agent Factory",
+    "pages/chat_agents.py": "Chat with Agents",
+    "pages/agents_meeting.py": "Agents Meeting",
+    "pages/broadcast_chat.py": "Broadcast Chat",
+    "pages/fleet_dashboard.py": "Fleet Dashboard",
+}
+
+
+class NullPlaceholder:
+    """Stands in for st.empty() outside a Streamlit session"""
+
+    def __init__(self):
+        self.writes = 0
+
+    def write(self, *args, **kwargs):
+        self.writes += 1
+
+
+def percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(pick(0.50) * 1000, 3),
+        "p95_ms": round(pick(0.95) * 1000, 3),
+        "p99_ms": round(pick(0.99) * 1000, 3),
+    }
+
+
+def measure(server, fn, repeats):
+    """Call fn repeatedly; returns latency stats, throughput, errors and server calls per op"""
+    samples, errors = [], 0
+    server.reset_counts()
+    start = time.perf_counter()
+    for i in range(repeats):
+        t0 = time.perf_counter()
+        try:
+            ok = fn(i)
+        except Exception:
+            ok = False
+        samples.append(time.perf_counter() - t0)
+        if ok is False or ok is None:
+            errors += 1
+    elapsed = time.perf_counter() - start
+    stats = percentiles(samples)
+    stats.update({
+        "errors": errors,
+        "ops_per_sec": round(repeats / elapsed, 2) if elapsed else 0.0,
+        "calls_per_op": round(server.total_calls() / repeats, 2) if repeats else 0.0,
+        "calls_by_endpoint": dict(server.counts),
+    })
+    return stats
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_startup(server, repeats):
+    """Cold-load every page in a fresh Streamlit session
+
+    A cold load fails the check if it calls any endpoint twice or renders
+    another page's title (i.e. imported a page script).
+    """
+    results = {}
+    for path, title in PAGES.items():
+        samples, counts, titles = [], None, []
+        for _ in range(repeats):
+            # Fresh process-wide caches and no page module left over from earlier runs
+            st.cache_resource.clear()
+            st.cache_data.clear()
+            sys.modules.pop("agents", None)
+            server.reset_counts()
+            app = AppTest.from_file(os.path.join(ROOT, path), default_timeout=60)
+            t0 = time.perf_counter()
+            app.run()
+            samples.append(time.perf_counter() - t0)
+            # AppTest resets Streamlit's logging; keep bare-mode warnings quiet
+            streamlit_logger.set_log_level("error")
+            counts = dict(server.counts)
+            titles = [element.value for element in app.title]
+        stats = percentiles(samples)
+        stats.update({
+            "calls_by_endpoint": counts,
+            "duplicate_calls": sorted(endpoint for endpoint, count in counts.items() if count > 1),
+            "foreign_titles": [rendered for rendered in titles if rendered != title],
+        })
+        stats["ok"] = not stats["duplicate_calls"] and not stats["foreign_titles"]
+        results[path] = stats
+    return results
+
+
+def bench_fleet_size(server, size, repeats, ops):
+    # Imported lazily so LETTA_BASE_URL already points at the mock server
+    import agent_service
+    from agent_registry import get_agent_registry
+    from chat_transcript import TokenCoalescer, stream_reply
+    from letta_clients import get_client, run_async
+    from meeting import create_and_test_agent
+
+    server.agents.clear()
+    server.messages.clear()
+    server.seed_agents(size)
+    results = {"startup": bench_startup(server, max(1, repeats // 5))}
+    # Imported after the startup runs, which drop it from sys.modules
+    import agents
+    client = get_client()
+    registry = get_agent_registry(client)
+
+    # list_agents as the pages call it, bypassing the registry TTL
+    results["list_agents"] = measure(server, lambda i: agent_service.list_agents(force=True), repeats)
+    results["list_agents_async"] = measure(
+        server, lambda i: run_async(agent_service.list_agents_async(force=True)), repeats
+    )
+
+    # Whole Agent Factory page renders: cold (registry expired) then warm
+    def render(cold):
+        def run(i):
+            if cold:
+                registry.invalidate()
+            importlib.reload(agents)
+            return True
+        return run
+
+    results["page_render_cold"] = measure(server, render(cold=True), repeats)
+    results["page_render_warm"] = measure(server, render(cold=False), repeats)
+
+    created = []
+
+    def create(i):
+        agent = agent_service.save_agent(
+            action="create",
+            persona_value=f"Persona {i}",
+            job_directives=f"Directives {i}",
+            level=1 + i % 3,
+            supervisor_name="bench",
+            agent_name=f"bench_{i}",
+            temperature=0.7,
+            model_endpoint_type="openai",
+            model="gpt-4o-mini",
+            context_window=16000
+        )
+        if agent:
+            created.append(agent.id)
+        return agent
+
+    results["save_agent_create"] = measure(server, create, ops)
+
+    def modify(i):
+        agent_id = created[i % len(created)]
+        return agent_service.save_agent(
+            action="modify",
+            agent_id=agent_id,
+            persona_value=f"Persona {i}",
+            job_directives=f"Directives {i}",
+            level=1,
+            supervisor_name="bench",
+            agent_name=f"bench_{i}",
+            temperature=round(0.1 * (i % 10), 1),
+            model_endpoint_type="openai",
+            model="gpt-4o-mini",
+            context_window=16000
+        )
+
+    # Every created agent modified at once through the async client
+    def modify_all_async(i):
+        async def fan_out():
+            return await asyncio.gather(*(
+                agent_service.save_agent_async(
+                    action="modify",
+                    agent_id=agent_id,
+                    persona_value=f"Async persona {i}",
+                    job_directives=f"Async directives {i}",
+                    level=2,
+                    supervisor_name="bench",
+                    agent_name=f"bench_async_{n}",
+                    temperature=0.5,
+                    model_endpoint_type="openai",
+                    model="gpt-4o-mini",
+                    context_window=16000
+                )
+                for n, agent_id in enumerate(created)
+            ))
+        return all(run_async(fan_out()))
+
+    if created:
+        results["save_agent_modify"] = measure(server, modify, ops)
+        results["save_agent_modify_async_fan_out"] = measure(server, modify_all_async, max(1, ops // 5))
+        half = len(created) // 2
+        results["delete_agent"] = measure(server, lambda i: agent_service.delete_agent(created[i]), half)
+        results["delete_agent_async"] = measure(
+            server, lambda i: run_async(agent_service.delete_agent_async(created[half + i])), len(created) - half
+        )
+
+    target = next(iter(server.agents))
+    stream_stats = {"ttft": [], "flushes": []}
+
+    def stream(i):
+        placeholder = NullPlaceholder()
+        coalescer = TokenCoalescer(placeholder)
+        first_token = []
+        add = coalescer.add
+
+        def timed_add(token):
+            if not first_token:
+                first_token.append(time.perf_counter())
+            add(token)
+
+        coalescer.add = timed_add
+        t0 = time.perf_counter()
+        text = stream_reply(client, target, "benchmark prompt", coalescer)
+        if first_token:
+            stream_stats["ttft"].append(first_token[0] - t0)
+        stream_stats["flushes"].append(placeholder.writes)
+        return bool(text)
+
+    results["chat_stream"] = measure(server, stream, repeats)
+    results["chat_stream"]["time_to_first_token"] = percentiles(stream_stats["ttft"])
+    results["chat_stream"]["mean_placeholder_writes"] = (
+        round(statistics.fmean(stream_stats["flushes"]), 2) if stream_stats["flushes"] else 0
+    )
+
+    results["create_and_test_agent"] = measure(
+        server, lambda i: create_and_test_agent(client, pause=0), max(1, ops // 5)
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark agent tooling against a mock Letta server")
+    parser.add_argument("--agents", type=int, nargs="+", default=[10, 100, 1000], help="Fleet sizes to test")
+    parser.add_argument("--repeats", type=int, default=20, help="Samples for read paths and renders")
+    parser.add_argument("--ops", type=int, default=20, help="Creates/modifies/deletes per fleet size")
+    parser.add_argument("--latency", type=float, default=0.005, help="Base server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.005, help="Extra random latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--chunk-interval", type=float, default=0.005, help="Seconds between streamed tokens")
+    parser.add_argument("--chunks", type=int, default=40, help="Tokens per streamed reply")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_output.json")
+    args = parser.parse_args()
+
+    server = MockLettaServer(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        chunk_interval=args.chunk_interval, chunks=args.chunks, seed=args.seed
+    ).start()
+    # The pages run in Streamlit's bare mode here; silence its per-call warnings
+    streamlit_logger.set_log_level("error")
+    os.environ["LETTA_BASE_URL"] = server.base_url
+    os.environ["LETTA_MESSAGE_CACHE"] = os.path.join(tempfile.mkdtemp(), "messages.sqlite")
+    os.environ["LETTA_JOB_QUEUE"] = os.path.join(tempfile.mkdtemp(), "jobs.sqlite")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "params": vars(args),
+        },
+        "results": {},
+    }
+    startup_ok = True
+    try:
+        for size in args.agents:
+            print(f"Benchmarking with {size} agents...")
+            results = report["results"][str(size)] = bench_fleet_size(server, size, args.repeats, args.ops)
+            for page, stats in results["startup"].items():
+                startup_ok = startup_ok and stats["ok"]
+                problems = ", ".join(
+                    [f"duplicate {endpoint}" for endpoint in stats["duplicate_calls"]]
+                    + [f"rendered '{title}'" for title in stats["foreign_titles"]]
+                )
+                print(f"- startup {page}: p50 {stats['p50_ms']}ms, "
+                      f"{sum(stats['calls_by_endpoint'].values())} calls, {problems or 'ok'}")
+            for name, stats in results.items():
+                if name == "startup":
+                    continue
+                print(f"- {name}: p50 {stats.get('p50_ms')}ms, p95 {stats.get('p95_ms')}ms, "
+                      f"p99 {stats.get('p99_ms')}ms, {stats['calls_per_op']} calls/op")
+    finally:
+        server.stop()
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if not startup_ok:
+        print("Startup check failed: a page fetched something twice or rendered another page")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import dotenv
+import httpx
+from letta_client import Letta
+from letta_client.core.api_error import ApiError
+
+from agent_config import DEFAULT_CONTEXT_WINDOW, LEVELS, PROVIDERS, RATE_LIMITS, build_agent_payload, get_template
+
+DEFAULT_AGENT = {
+    "provider": "openai",
+    "model": "gpt-4o-mini",
+    "context_window": DEFAULT_CONTEXT_WINDOW,
+    "temperature": 0.7,
+}
+
+# Requests per second allowed against each provider while provisioning, from providers.json
+DEFAULT_RATE_LIMITS = dict(RATE_LIMITS)
+
+
+class RateLimiter:
+    """Token bucket shared by every worker that talks to one provider"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until one request may be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+@dataclass
+class ProvisionResult:
+    name: str
+    agent_id: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    duration: float = 0.0
+
+
+@dataclass
+class ProvisionReport:
+    results: List[ProvisionResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def created(self) -> List[ProvisionResult]:
+        return [r for r in self.results if r.agent_id]
+
+    @property
+    def failed(self) -> List[ProvisionResult]:
+        return [r for r in self.results if not r.agent_id]
+
+    @property
+    def agents_per_sec(self) -> float:
+        return len(self.created) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> Dict:
+        return {
+            "created": len(self.created),
+            "failed": len(self.failed),
+            "elapsed_sec": round(self.elapsed, 3),
+            "agents_per_sec": round(self.agents_per_sec, 2),
+            "errors": {r.name: r.error for r in self.failed},
+        }
+
+
+def load_org_spec(path: str) -> List[Dict]:
+    """Load an org spec from YAML or JSON and fill in defaults"""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                print("Error: PyYAML is required to read YAML specs (pip install pyyaml)")
+                sys.exit(1)
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+
+    # Either a bare list of agents or {"defaults": {...}, "agents": [...]}
+    if isinstance(spec, list):
+        defaults, agents = {}, spec
+    else:
+        defaults, agents = spec.get("defaults", {}), spec.get("agents", [])
+
+    entries = []
+    for agent in agents:
+        entry = {**DEFAULT_AGENT, **defaults, **agent}
+        missing = [key for key in ("name", "persona", "job_directives", "level", "supervisor") if key not in entry]
+        if missing:
+            raise ValueError(f"Agent spec {agent} is missing: {', '.join(missing)}")
+        if entry["level"] not in LEVELS:
+            raise ValueError(f"Agent {entry['name']}: level must be one of {', '.join(map(str, LEVELS))}")
+        try:
+            get_template(entry["provider"], entry["model"], entry["level"])
+        except ValueError as e:
+            raise ValueError(f"Agent {entry['name']}: {e}")
+        entries.append(entry)
+    return entries
+
+
+def spec_to_payload(entry: Dict) -> Dict:
+    """Build the same create payload save_agent sends for one spec entry"""
+    return build_agent_payload(
+        agent_name=entry["name"],
+        persona_value=entry["persona"],
+        job_directives=entry["job_directives"],
+        level=entry["level"],
+        supervisor_name=entry["supervisor"],
+        temperature=entry["temperature"],
+        model_endpoint_type=entry["provider"],
+        model=entry["model"],
+        context_window=entry["context_window"]
+    )
+
+
+def rejected_before_create(error: Exception) -> bool:
+    """Whether a create failed without the server creating anything, so resending it is safe
+
+    Connection failures never reached the server and 429 is refused up front;
+    a read timeout or a 5xx may come after the agent was created.
+    """
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    return isinstance(error, ApiError) and error.status_code == 429
+
+
+def find_created(client, payload: Dict):
+    """The agent a create with this payload may have made: same name and same supervisor tag"""
+    supervisor_tags = [tag for tag in payload["tags"] if tag.endswith("_sub")]
+    matches = client.agents.list(name=payload["name"], tags=supervisor_tags, match_all_tags=True)
+    return matches[0] if matches else None
+
+
+def create_with_retry(client, payload: Dict, limiter: Optional[RateLimiter], max_retries: int = 3,
+                      backoff: float = 0.5, find_existing=find_created) -> ProvisionResult:
+    """Create one agent, backing off exponentially with jitter on failure
+
+    Creates are not idempotent: after a failure the server may have acted on,
+    find_existing(client, payload) is asked first and a found agent counts as
+    created. With find_existing None only rejected_before_create errors retry.
+    """
+    result = ProvisionResult(name=payload["name"])
+    start = time.perf_counter()
+    for attempt in range(1, max_retries + 2):
+        result.attempts = attempt
+        if limiter:
+            limiter.acquire()
+        try:
+            agent = client.agents.create(**payload)
+            result.agent_id = agent.id
+            result.error = None
+            break
+        except Exception as e:
+            result.error = str(e)
+            safe = rejected_before_create(e)
+            if attempt > max_retries or (not safe and find_existing is None):
+                break
+            time.sleep(backoff * 2 ** (attempt - 1) * (1 + random.random()))
+            if safe:
+                continue
+            # The server may have created the agent before failing; look before resending
+            try:
+                agent = find_existing(client, payload)
+            except Exception:
+                break
+            if agent is not None:
+                result.agent_id = agent.id
+                result.error = None
+                break
+    result.duration = time.perf_counter() - start
+    return result
+
+
+def provision_agents(client, entries: List[Dict], max_workers: int = 8,
+                     rate_limits: Optional[Dict[str, float]] = None, max_retries: int = 3,
+                     backoff: float = 0.5, on_result=None) -> ProvisionReport:
+    """Create every agent in the spec concurrently over a bounded thread pool"""
+    rate_limits = DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits
+    limiters = {provider: RateLimiter(rate) for provider, rate in rate_limits.items() if rate > 0}
+
+    report = ProvisionReport()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(create_with_retry, client, spec_to_payload(entry),
+                        limiters.get(entry["provider"]), max_retries, backoff)
+            for entry in entries
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            report.results.append(result)
+            if on_result:
+                on_result(result)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def parse_rate_limits(values: List[str]) -> Dict[str, float]:
+    """Parse provider=rate overrides from the command line"""
+    limits = dict(DEFAULT_RATE_LIMITS)
+    for value in values:
+        provider, _, rate = value.partition("=")
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown provider {provider!r} in rate limit; expected one of {list(PROVIDERS)}")
+        limits[provider] = float(rate)
+    return limits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provision a Letta agent org chart in bulk")
+    parser.add_argument("spec", help="YAML or JSON org spec")
+    parser.add_argument("--base-url", default="http://localhost:8283")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--rate-limit", action="append", default=[], metavar="PROVIDER=RPS",
+                        help="Requests per second per provider, 0 disables the limit")
+    parser.add_argument("--report", help="Write the JSON summary to this file")
+    args = parser.parse_args()
+
+    dotenv.load_dotenv()
+
+    entries = load_org_spec(args.spec)
+    print(f"Provisioning {len(entries)} agents with {args.workers} workers...")
+
+    def on_result(result):
+        if result.agent_id:
+            print(f"- {result.name}: {result.agent_id} ({result.duration:.2f}s, {result.attempts} attempts)")
+        else:
+            print(f"- {result.name}: FAILED after {result.attempts} attempts: {result.error}")
+
+    client = Letta(base_url=args.base_url)
+    report = provision_agents(
+        client,
+        entries,
+        max_workers=args.workers,
+        rate_limits=parse_rate_limits(args.rate_limit),
+        max_retries=args.retries,
+        on_result=on_result
+    )
+
+    summary = report.summary()
+    print(f"\nCreated {summary['created']} agents, {summary['failed']} failed "
+          f"in {summary['elapsed_sec']}s ({summary['agents_per_sec']} agents/sec)")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if report.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
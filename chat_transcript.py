@@ -0,0 +1,162 @@
+import time
+from collections import deque
+
+from stream_pipeline import ASSISTANT, REASONING, StreamPipeline
+
+# Letta message types that belong in the chat transcript
+CHAT_MESSAGE_ROLES = {
+    "user_message": "user",
+    "assistant_message": "assistant",
+}
+
+
+def _content_text(content):
+    """Flatten Letta message content, which may be a list of content parts"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(getattr(part, "text", "") or "" for part in content)
+    return str(content or "")
+
+
+def to_chat_entry(message):
+    """Convert a Letta message into a transcript entry, or None if not shown"""
+    role = CHAT_MESSAGE_ROLES.get(getattr(message, "message_type", None))
+    if role is None:
+        return None
+    date = getattr(message, "date", None)
+    return {
+        "id": message.id,
+        "date": date.isoformat() if hasattr(date, "isoformat") else str(date or ""),
+        "role": role,
+        "content": _content_text(message.content),
+    }
+
+
+class ChatTranscript:
+    """Bounded, windowed chat history that pages older messages in from the server"""
+
+    def __init__(self, agent_id, max_messages=500, page_size=50, cache=None):
+        self.agent_id = agent_id
+        self.page_size = page_size
+        self.cache = cache
+        self.messages = deque(maxlen=max_messages)
+        self.oldest_id = None
+        self.has_older = True
+
+    def __len__(self):
+        return len(self.messages)
+
+    def append(self, role, content, message_id=None):
+        evicting = len(self.messages) == self.messages.maxlen
+        self.messages.append({"id": message_id, "role": role, "content": content})
+        if evicting:
+            # The dropped message can be paged back in from the server
+            self.oldest_id = next((m["id"] for m in self.messages if m["id"]), self.oldest_id)
+            self.has_older = True
+
+    def window(self, size):
+        """The last `size` messages, oldest first"""
+        start = max(0, len(self.messages) - size)
+        return [self.messages[i] for i in range(start, len(self.messages))]
+
+    def sync(self, client):
+        """Show the latest history: one delta request, then a local read when cached"""
+        if self.cache is None:
+            return self.load_older(client)
+        self.cache.sync_newer(client, self.agent_id)
+        entries = self.cache.latest(self.agent_id, self.page_size)
+        self.messages.clear()
+        self.messages.extend(entries)
+        self.has_older = len(entries) == self.page_size or not self.cache.is_complete(self.agent_id)
+        return len(entries)
+
+    def load_older(self, client, limit=None):
+        """Prepend one page of messages older than anything held; returns how many were added"""
+        room = self.messages.maxlen - len(self.messages)
+        if not self.has_older or room <= 0:
+            return 0
+        limit = min(limit or self.page_size, room)
+        if self.cache is not None:
+            return self._load_older_cached(client, limit)
+        # Pages come back oldest first
+        page = client.agents.messages.list(agent_id=self.agent_id, before=self.oldest_id, limit=limit)
+        if len(page) < limit:
+            self.has_older = False
+        if not page:
+            return 0
+
+        self.oldest_id = page[0].id
+        entries = [entry for entry in map(to_chat_entry, page) if entry]
+        self.messages.extendleft(reversed(entries))
+        return len(entries)
+
+    def _load_older_cached(self, client, limit):
+        """Read older entries from the cache, backfilling it from the server when it runs dry"""
+        oldest = next((m for m in self.messages if m["id"]), None)
+        entries = self.cache.before(self.agent_id, oldest, limit)
+        while len(entries) < limit and self.cache.backfill_older(client, self.agent_id):
+            entries = self.cache.before(self.agent_id, oldest, limit)
+        self.has_older = len(entries) == limit
+        self.messages.extendleft(reversed(entries))
+        return len(entries)
+
+
+class TokenCoalescer:
+    """Collects streamed tokens and flushes them to a placeholder in batches"""
+
+    def __init__(self, placeholder, interval=0.1, max_chars=200):
+        self.placeholder = placeholder
+        self.interval = interval
+        self.max_chars = max_chars
+        self._text = ""
+        self._pending = []
+        self._pending_chars = 0
+        self._last_flush = time.monotonic()
+        self.flushes = 0
+
+    @property
+    def text(self):
+        return self._text + "".join(self._pending)
+
+    def add(self, token):
+        if not token:
+            return
+        self._pending.append(token)
+        self._pending_chars += len(token)
+        if self._pending_chars >= self.max_chars or time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        self._text += "".join(self._pending)
+        self._pending = []
+        self._pending_chars = 0
+        self.placeholder.write(self._text)
+        self._last_flush = time.monotonic()
+        self.flushes += 1
+
+
+def stream_reply(client, agent_id, prompt, coalescer, on_reasoning=None, on_tool_call=None, recorder=None):
+    """Stream an agent's reply into a coalescer and return the assistant text
+
+    on_reasoning gets the reasoning so far and on_tool_call the merged calls,
+    once per batch rather than once per chunk.
+    """
+    pipeline = StreamPipeline.for_message(client, agent_id, prompt)
+    try:
+        for update in pipeline.updates(interval=coalescer.interval):
+            if ASSISTANT in update.text:
+                coalescer.add(update.text[ASSISTANT])
+            if on_reasoning and REASONING in update.text:
+                on_reasoning(pipeline.text[REASONING])
+            if on_tool_call and update.tool_calls:
+                on_tool_call(pipeline.tool_calls)
+    finally:
+        # Also runs when Streamlit interrupts the script for a rerun
+        pipeline.cancel()
+        coalescer.flush()
+        if recorder is not None:
+            pipeline.record(recorder, agent_id)
+    return coalescer.text
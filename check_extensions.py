@@ -1,9 +1,21 @@
+import argparse
+import json
 import os
 import psycopg2
+from psycopg2 import sql
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from typing import List, Dict
+from typing import Any, Dict, List, Optional, Set
 import sys
 
+# Extensions we want on every Letta Postgres backend
+DESIRED_EXTENSIONS = [
+    'vector',
+    'pgrouting',  # Graph functionality
+    'postgis',     # Geospatial support
+    'postgres_fdw' # Foreign data wrapper
+]
+
 def load_db_config() -> Dict[str, str]:
     """Load database configuration from .env file."""
     load_dotenv()
@@ -63,11 +75,30 @@ def get_installed_extensions(conn) -> List[str]:
         print(f"Error fetching installed extensions: {e}")
         return []
 
+def get_extension_catalog(conn) -> List[Dict]:
+    """Available extensions and their installed version in one round-trip."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT a.name, a.default_version, a.installed_version, a.comment
+            FROM pg_available_extensions a
+            UNION ALL
+            SELECT e.extname, NULL, e.extversion, NULL
+            FROM pg_extension e
+            WHERE NOT EXISTS (SELECT 1 FROM pg_available_extensions a WHERE a.name = e.extname)
+            ORDER BY 1;
+        """)
+        columns = [desc[0] for desc in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+def create_extension_statement(extension_name: str) -> sql.Composed:
+    """CREATE EXTENSION with the name quoted, so names like uuid-ossp work and cannot inject SQL."""
+    return sql.SQL("CREATE EXTENSION IF NOT EXISTS {};").format(sql.Identifier(extension_name))
+
 def install_extension(conn, extension_name: str) -> bool:
     """Install a specific extension."""
     try:
         with conn.cursor() as cur:
-            cur.execute(f"CREATE EXTENSION IF NOT EXISTS {extension_name};")
+            cur.execute(create_extension_statement(extension_name))
             conn.commit()
             print(f"Successfully installed extension: {extension_name}")
             return True
@@ -76,7 +107,7 @@ def install_extension(conn, extension_name: str) -> bool:
         conn.rollback()
         return False
 
-def main():
+def main(desired: List[str] = DESIRED_EXTENSIONS, dry_run: bool = False):
     # Load configuration
     config = load_db_config()
     
@@ -98,32 +129,140 @@ def main():
     installed = get_installed_extensions(conn)
     print("\nCurrently installed extensions:", ", ".join(installed))
 
-    # Define extensions we want to install
-    desired_extensions = [
-        'vector',
-        'pgrouting',  # Graph functionality
-        'postgis',     # Geospatial support
-        'postgres_fdw' # Foreign data wrapper
-    ]
-    
     # Install desired extensions if not already installed
-    print("\nChecking and installing required extensions...")
-    for ext_name in desired_extensions:
-        if ext_name in [ext['name'] for ext in available_extensions]:
-            if ext_name not in installed:
+    print("\nChecking required extensions..." if dry_run else "\nChecking and installing required extensions...")
+    available_names = {ext['name'] for ext in available_extensions}
+    installed = set(installed)
+    for ext_name in desired:
+        if ext_name in available_names:
+            if ext_name in installed:
+                print(f"\n{ext_name} is already installed.")
+            elif dry_run:
+                print(f"\n{ext_name} is missing (dry run, not installing).")
+            else:
                 print(f"\nInstalling {ext_name}...")
                 install_extension(conn, ext_name)
-            else:
-                print(f"\n{ext_name} is already installed.")
         else:
             print(f"\n{ext_name} is not available in your region/setup.")
 
-    # Install compatible graph extension
-    install_extension(conn, 'pgRouting')  # Available as 'pgrouting' in your list
-
     # Close connection
     conn.close()
     print("\nDatabase connection closed.")
 
+def load_inventory(path: str) -> List[Dict[str, Any]]:
+    """Load fleet targets from a JSON or YAML inventory file."""
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml
+            inventory = yaml.safe_load(f)
+        else:
+            inventory = json.load(f)
+
+    # Either a bare list of targets or {"defaults": {...}, "targets": [...]}
+    if isinstance(inventory, list):
+        defaults, targets = {}, inventory
+    else:
+        defaults, targets = inventory.get('defaults', {}), inventory.get('targets', [])
+
+    resolved = []
+    for n, target in enumerate(targets):
+        target = {**defaults, **target}
+        # Keep secrets out of the inventory by naming an env var instead
+        if 'password_env' in target:
+            target['password'] = os.getenv(target.pop('password_env'))
+        target.setdefault('name', target.get('host', f'target-{n}'))
+        resolved.append(target)
+    return resolved
+
+def audit_target(target: Dict[str, Any], desired: List[str], install: bool = True,
+                 connect_timeout: int = 10, driver=psycopg2) -> Dict[str, Any]:
+    """Audit one target with a single catalog query and optionally install what is missing."""
+    report: Dict[str, Any] = {'target': target['name'], 'host': target.get('host'), 'error': None}
+    conn_args = {key: target[key] for key in ('user', 'password', 'host', 'port', 'database') if key in target}
+    driver_error = getattr(driver, 'Error', Exception)
+    try:
+        conn = driver.connect(connect_timeout=connect_timeout, **conn_args)
+    except driver_error as e:
+        report['error'] = f"connect: {e}"
+        return report
+
+    try:
+        catalog = get_extension_catalog(conn)
+        available: Set[str] = {ext['name'] for ext in catalog if ext['default_version'] is not None}
+        installed: Set[str] = {ext['name'] for ext in catalog if ext['installed_version'] is not None}
+        wanted = set(desired)
+
+        report['available_count'] = len(available)
+        report['installed'] = sorted(installed)
+        report['already_installed'] = sorted(wanted & installed)
+        report['unavailable'] = sorted(wanted - available - installed)
+        missing = sorted((wanted & available) - installed)
+        report['missing'] = missing
+        report['newly_installed'] = []
+        report['failed'] = []
+
+        if install:
+            for ext_name in missing:
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(create_extension_statement(ext_name))
+                    conn.commit()
+                    report['newly_installed'].append(ext_name)
+                except driver_error as e:
+                    conn.rollback()
+                    report['failed'].append({'extension': ext_name, 'error': str(e)})
+    except driver_error as e:
+        report['error'] = f"query: {e}"
+    finally:
+        conn.close()
+    return report
+
+def audit_fleet(targets: List[Dict[str, Any]], desired: List[str], install: bool = True,
+                max_workers: int = 8, connect_timeout: int = 10, driver=psycopg2) -> List[Dict[str, Any]]:
+    """Audit every target concurrently; results come back in inventory order."""
+    if not targets:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(targets))) as pool:
+        return list(pool.map(
+            lambda target: audit_target(target, desired, install, connect_timeout, driver), targets
+        ))
+
+def fleet_main(args) -> int:
+    targets = load_inventory(args.inventory)
+    desired = args.extension or DESIRED_EXTENSIONS
+    print(f"Auditing {len(targets)} targets for: {', '.join(desired)}")
+
+    reports = audit_fleet(targets, desired, install=not args.dry_run,
+                          max_workers=args.workers, connect_timeout=args.connect_timeout)
+    for report in reports:
+        if report['error']:
+            print(f"- {report['target']}: ERROR {report['error']}")
+        else:
+            print(f"- {report['target']}: installed {', '.join(report['newly_installed']) or 'nothing'}; "
+                  f"missing {', '.join(report['missing']) or 'none'}; "
+                  f"unavailable {', '.join(report['unavailable']) or 'none'}")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'desired': desired, 'dry_run': args.dry_run, 'targets': reports}, f, indent=2)
+        print(f"\nReport written to {args.report}")
+
+    failed = [r for r in reports if r['error'] or r.get('failed')]
+    return 1 if failed else 0
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Check and install Postgres extensions")
+    parser.add_argument('--inventory', help="JSON/YAML file of targets; without it the RDS_* env vars are used")
+    parser.add_argument('--extension', action='append', help="Extension to require (repeatable)")
+    parser.add_argument('--dry-run', action='store_true', help="Audit only, do not install")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--connect-timeout', type=int, default=10)
+    parser.add_argument('--report', help="Write a JSON report to this file")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    args = parse_args()
+    if args.inventory:
+        load_dotenv()
+        sys.exit(fleet_main(args))
+    main(args.extension or DESIRED_EXTENSIONS, args.dry_run) 
\ No newline at end of file
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from agent_config import (
+    CONTEXT_WINDOWS,
+    DEFAULT_RESERVE_TOKENS,
+    DEFAULT_SYSTEM_TOKENS,
+    MODEL_CONTEXT_LIMITS,
+    MODEL_OPTIONS,
+    PROVIDERS,
+)
+
+# Used for models tiktoken does not know, i.e. every non-OpenAI provider
+FALLBACK_ENCODING = "cl100k_base"
+
+# Letta wraps each core memory block in a tagged header in the system message
+BLOCK_OVERHEAD_TOKENS = 20
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model):
+    """tiktoken encoding for a model, or None if tiktoken cannot load one (e.g. offline)"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception:
+        return None
+    try:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception:
+        # The BPE files are downloaded on first use
+        return None
+
+
+class TokenCounter:
+    """Token counts cached by content hash, so unchanged blocks are never re-encoded"""
+
+    def __init__(self, max_entries=10_000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._counts = OrderedDict()
+
+    def count(self, text, model):
+        """Token count and whether it is exact (tiktoken) or a chars/4 estimate"""
+        encoding = get_encoding(model)
+        name = encoding.name if encoding else "estimate"
+        key = (name, hashlib.sha256(text.encode("utf-8")).hexdigest())
+        with self._lock:
+            if key in self._counts:
+                self._counts.move_to_end(key)
+                self.hits += 1
+                return self._counts[key], encoding is not None
+        tokens = len(encoding.encode(text)) if encoding else (len(text) + 3) // 4
+        with self._lock:
+            self.misses += 1
+            self._counts[key] = tokens
+            if len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return tokens, encoding is not None
+
+
+_counter = TokenCounter()
+
+
+@dataclass
+class ContextPlan:
+    """Where an agent's context window goes before the conversation starts"""
+    provider: str
+    model: str
+    context_window: int
+    system_tokens: int
+    block_tokens: Dict[str, int] = field(default_factory=dict)
+    tool_tokens: Dict[str, int] = field(default_factory=dict)
+    reserve_tokens: int = DEFAULT_RESERVE_TOKENS
+    exact: bool = True
+    warnings: List[str] = field(default_factory=list)
+    suggested_window: Optional[int] = None
+    suggested_models: List[Tuple[str, str, int]] = field(default_factory=list)
+
+    @property
+    def required_tokens(self):
+        return self.system_tokens + sum(self.block_tokens.values()) + sum(self.tool_tokens.values()) \
+            + self.reserve_tokens
+
+    @property
+    def fits(self):
+        return self.required_tokens <= self.context_window
+
+    @property
+    def utilization(self):
+        return self.required_tokens / self.context_window if self.context_window else 0.0
+
+
+def smallest_window(tokens, model_limit=None):
+    """Smallest configured window holding tokens, capped by what the model accepts"""
+    for window in CONTEXT_WINDOWS:
+        if window >= tokens and (model_limit is None or window <= model_limit):
+            return window
+    return None
+
+
+def models_that_fit(tokens):
+    """Registered (provider, model, window) whose limit holds tokens, smallest window first"""
+    fitting = []
+    for provider in PROVIDERS:
+        for model in MODEL_OPTIONS[provider]:
+            window = smallest_window(tokens, MODEL_CONTEXT_LIMITS[(provider, model)])
+            if window is not None:
+                fitting.append((provider, model, window))
+    return sorted(fitting, key=lambda entry: entry[2])
+
+
+def plan_context(payload, tool_schemas=None, system_prompt=None, reserve_tokens=DEFAULT_RESERVE_TOKENS,
+                 counter=None):
+    """Token budget for a build_agent_payload result
+
+    tool_schemas maps tool name to the JSON schema the model sees; without a
+    system_prompt (new agents) Letta's default prompt size is assumed.
+    """
+    counter = counter or _counter
+    llm_config = payload["llm_config"]
+    provider, model = llm_config["model_endpoint_type"], llm_config["model"]
+    exact = True
+
+    if system_prompt is None:
+        system_tokens = DEFAULT_SYSTEM_TOKENS
+    else:
+        system_tokens, exact = counter.count(system_prompt, model)
+
+    plan = ContextPlan(provider=provider, model=model, context_window=llm_config["context_window"],
+                       system_tokens=system_tokens, reserve_tokens=reserve_tokens)
+
+    for block in payload["memory_blocks"]:
+        tokens, block_exact = counter.count(block["value"], model)
+        plan.block_tokens[block["label"]] = tokens + BLOCK_OVERHEAD_TOKENS
+        exact = exact and block_exact
+        if len(block["value"]) > block["limit"]:
+            plan.warnings.append(
+                f"Block {block['label']} is {len(block['value'])} characters, over its {block['limit']} limit")
+
+    for name in payload["tools"]:
+        schema = (tool_schemas or {}).get(name) or {"name": name}
+        tokens, tool_exact = counter.count(json.dumps(schema, sort_keys=True), model)
+        plan.tool_tokens[name] = tokens
+        exact = exact and tool_exact
+    plan.exact = exact
+
+    required = plan.required_tokens
+    model_limit = MODEL_CONTEXT_LIMITS.get((provider, model))
+    if model_limit is not None and plan.context_window > model_limit:
+        plan.warnings.append(f"{model} accepts at most {model_limit} tokens, not {plan.context_window}")
+    if not plan.fits:
+        plan.warnings.append(f"Needs about {required} tokens, more than the {plan.context_window} window")
+    plan.suggested_window = smallest_window(required, model_limit)
+    if plan.suggested_window is None:
+        plan.warnings.append(f"{model} has no configured window large enough for {required} tokens")
+    plan.suggested_models = models_that_fit(required)
+    return plan
+
+
+def describe_plan(plan):
+    """One-line budget summary for the pages"""
+    approx = "" if plan.exact else "~"
+    parts = [f"system {approx}{plan.system_tokens}"]
+    parts += [f"{label} {approx}{tokens}" for label, tokens in plan.block_tokens.items()]
+    if plan.tool_tokens:
+        parts.append(f"tools {approx}{sum(plan.tool_tokens.values())}")
+    parts.append(f"reserve {plan.reserve_tokens}")
+    summary = f"Context: {approx}{plan.required_tokens} of {plan.context_window} tokens ({', '.join(parts)})"
+    if plan.suggested_window and plan.suggested_window < plan.context_window:
+        summary += f". A {plan.suggested_window} window would fit."
+    return summary
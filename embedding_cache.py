@@ -0,0 +1,207 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "letta-agents", "embeddings")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    model TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, dim, digest)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS entries_by_slot ON entries (dim, slot);
+CREATE INDEX IF NOT EXISTS entries_by_age ON entries (dim, last_used);
+"""
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Content-addressed vectors in one memory-mapped file per dimension, indexed in SQLite, LRU-evicted"""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, capacity: int = 100_000):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._stores: Dict[int, np.memmap] = {}
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def _store(self, dim: int) -> np.memmap:
+        """Vector slots for one dimension; the file is sparse until slots are written"""
+        if dim not in self._stores:
+            path = os.path.join(self.directory, f"vectors_{dim}.f32")
+            mode = "r+" if os.path.exists(path) else "w+"
+            self._stores[dim] = np.memmap(path, dtype=np.float32, mode=mode, shape=(self.capacity, dim))
+        return self._stores[dim]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": round(self.hit_rate, 4)}
+
+    def get_many(self, model: str, dim: int, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors in input order, None where the text has not been embedded yet"""
+        digests = [text_digest(text) for text in texts]
+        with self._lock:
+            slots = {}
+            unique = list(set(digests))
+            # SQLite caps bound parameters, so look digests up in chunks
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT digest, slot FROM entries WHERE model = ? AND dim = ? "
+                    f"AND digest IN ({','.join('?' * len(chunk))})",
+                    [model, dim, *chunk],
+                ).fetchall()
+                slots.update(rows)
+            now = time.time()
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE entries SET last_used = ? WHERE model = ? AND dim = ? AND digest = ?",
+                    [(now, model, dim, digest) for digest in slots],
+                )
+            store = self._store(dim) if slots else None
+            results = [np.array(store[slots[d]]) if d in slots else None for d in digests]
+        found = sum(vector is not None for vector in results)
+        self.hits += found
+        self.misses += len(results) - found
+        return results
+
+    def _free_slots(self, dim: int, count: int) -> List[int]:
+        # Slots fill densely from 0 and are only freed by eviction, which reuses them at once
+        used = self._conn.execute("SELECT COUNT(*) FROM entries WHERE dim = ?", (dim,)).fetchone()[0]
+        slots = list(range(used, used + min(count, self.capacity - used)))
+        if len(slots) < count:
+            # Evict the least recently used entries of this dimension
+            victims = self._conn.execute(
+                "SELECT model, digest, slot FROM entries WHERE dim = ? ORDER BY last_used LIMIT ?",
+                (dim, count - len(slots)),
+            ).fetchall()
+            self._conn.executemany(
+                "DELETE FROM entries WHERE model = ? AND dim = ? AND digest = ?",
+                [(model, dim, digest) for model, digest, _ in victims],
+            )
+            self.evictions += len(victims)
+            slots += [slot for _, _, slot in victims]
+        return slots
+
+    def put_many(self, model: str, dim: int, texts: Sequence[str], vectors) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != dim:
+            raise ValueError(f"Expected vectors of shape (n, {dim}), got {vectors.shape}")
+        # Last write wins for duplicate texts within one batch
+        pending = {text_digest(text): vector for text, vector in zip(texts, vectors)}
+        with self._lock:
+            existing = set()
+            for digest in pending:
+                row = self._conn.execute(
+                    "SELECT slot FROM entries WHERE model = ? AND dim = ? AND digest = ?", (model, dim, digest)
+                ).fetchone()
+                if row:
+                    existing.add(digest)
+            new = [digest for digest in pending if digest not in existing][:self.capacity]
+            store = self._store(dim)
+            now = time.time()
+            with self._conn:
+                slots = self._free_slots(dim, len(new))
+                for digest, slot in zip(new, slots):
+                    store[slot] = pending[digest]
+                self._conn.executemany(
+                    "INSERT INTO entries (model, dim, digest, slot, last_used) VALUES (?, ?, ?, ?, ?)",
+                    [(model, dim, digest, slot, now) for digest, slot in zip(new, slots)],
+                )
+            store.flush()
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+            self.hits = self.misses = self.evictions = 0
+
+
+class StubEmbedder:
+    """Deterministic offline embedder: unit vectors seeded from the text hash"""
+
+    def __init__(self, model: str = "stub-embedder", dim: int = 1536):
+        self.model = model
+        self.dim = dim
+        self.calls = 0
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        self.calls += 1
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+            vectors[row] = np.random.default_rng(seed).standard_normal(self.dim)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class OpenAIEmbedder:
+    """Embeds through an OpenAI-compatible endpoint, as configured by build_embedding_config"""
+
+    def __init__(self, model: str, dim: int, endpoint: Optional[str] = None):
+        from openai import OpenAI
+        self.model = model
+        self.dim = dim
+        self._client = OpenAI(base_url=endpoint) if endpoint else OpenAI()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        response = self._client.embeddings.create(model=self.model, input=list(texts))
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+
+class CachedEmbedder:
+    """Puts an EmbeddingCache in front of any embedder with model, dim and embed(texts)"""
+
+    def __init__(self, embedder, cache: EmbeddingCache):
+        self.embedder = embedder
+        self.cache = cache
+        self.model = embedder.model
+        self.dim = embedder.dim
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        cached = self.cache.get_many(self.model, self.dim, texts)
+        # Embed each missing text once, even if it repeats in the batch
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if missing:
+            fresh = np.asarray(self.embedder.embed(missing), dtype=np.float32)
+            self.cache.put_many(self.model, self.dim, missing, fresh)
+            computed = dict(zip(missing, fresh))
+            cached = [vector if vector is not None else computed[text] for text, vector in zip(texts, cached)]
+        return np.stack(cached) if cached else np.empty((0, self.dim), dtype=np.float32)
+
+
+def embedder_for_config(embedding_config: Dict, cache: Optional[EmbeddingCache] = None, offline: bool = False):
+    """Cached embedder matching an agent's embedding_config; offline swaps in the stub"""
+    model = embedding_config["embedding_model"]
+    dim = embedding_config["embedding_dim"]
+    if offline:
+        embedder = StubEmbedder(model=model, dim=dim)
+    elif embedding_config["embedding_endpoint_type"] == "openai":
+        embedder = OpenAIEmbedder(model, dim, embedding_config.get("embedding_endpoint"))
+    else:
+        raise ValueError(f"No embedder for endpoint type {embedding_config['embedding_endpoint_type']}")
+    return CachedEmbedder(embedder, cache or EmbeddingCache())
@@ -0,0 +1,358 @@
+"""Export the whole agent fleet to a Parquet or Arrow snapshot and import it back.
+
+    python fleet_snapshot.py export fleet.parquet [--stream]
+    python fleet_snapshot.py import fleet.parquet --base-url http://other:8283 [--stream]
+
+A .arrow or .feather path writes the Arrow IPC format instead of Parquet.
+With --stream each page of agents is written (or read) as its own row group
+or record batch, so memory stays bounded by the page size whatever the size
+of the fleet.
+"""
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import dotenv
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from letta_client import Letta
+
+from agent_config import SNAPSHOT_TAG_PREFIX
+from bulk_provision import ProvisionReport, RateLimiter, create_with_retry, parse_rate_limits
+
+PAGE_SIZE = 100
+COMPRESSION = "zstd"
+
+SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("name", pa.string()),
+    ("agent_type", pa.string()),
+    ("system", pa.string()),
+    ("tags", pa.list_(pa.string())),
+    ("tools", pa.list_(pa.string())),
+    ("memory_blocks", pa.list_(pa.struct([("label", pa.string()), ("value", pa.string()), ("limit", pa.int64())]))),
+    # Configs differ by provider, so they are kept as JSON rather than as columns
+    ("llm_config", pa.string()),
+    ("embedding_config", pa.string()),
+])
+
+
+def is_arrow_path(path):
+    return path.endswith((".arrow", ".feather"))
+
+
+def _config_json(config):
+    return json.dumps(config.model_dump(mode="json", exclude_none=True), sort_keys=True)
+
+
+def agent_to_row(agent) -> Dict:
+    """Flatten one AgentState into a snapshot row"""
+    return {
+        "id": agent.id,
+        "name": agent.name,
+        "agent_type": str(agent.agent_type) if agent.agent_type else None,
+        "system": agent.system,
+        "tags": list(agent.tags or []),
+        "tools": [tool.name for tool in agent.tools or []],
+        "memory_blocks": [
+            {"label": block.label, "value": block.value, "limit": block.limit}
+            for block in agent.memory.blocks
+        ],
+        "llm_config": _config_json(agent.llm_config),
+        "embedding_config": _config_json(agent.embedding_config),
+    }
+
+
+def row_to_payload(row: Dict) -> Dict:
+    """client.agents.create keyword arguments recreating a snapshot row"""
+    payload = {
+        "name": row["name"],
+        "memory_blocks": [
+            {key: value for key, value in block.items() if value is not None}
+            for block in row["memory_blocks"]
+        ],
+        "llm_config": json.loads(row["llm_config"]),
+        "embedding_config": json.loads(row["embedding_config"]),
+        # A snapshot of an imported fleet names the agent it came from, not the original
+        "tags": [tag for tag in row["tags"] if not tag.startswith(SNAPSHOT_TAG_PREFIX)]
+        + [f"{SNAPSHOT_TAG_PREFIX}{row['id']}"],
+        "tools": list(row["tools"]),
+    }
+    if row.get("system"):
+        payload["system"] = row["system"]
+    return payload
+
+
+def iter_agent_pages(client, page_size=PAGE_SIZE, prefetch=2):
+    """Pages of agents from the server, fetching the next pages while the caller writes
+
+    The cursor makes listing itself sequential; a background thread keeps up
+    to prefetch pages in flight so requests overlap with encoding and disk I/O.
+    """
+    pages = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def fetch():
+        after = None
+        try:
+            while not stop.is_set():
+                page = client.agents.list(after=after, limit=page_size)
+                if page:
+                    pages.put(page)
+                if len(page) < page_size:
+                    break
+                after = page[-1].id
+        except Exception as e:
+            pages.put(e)
+        pages.put(None)
+
+    thread = threading.Thread(target=fetch, name="fleet-export", daemon=True)
+    thread.start()
+    try:
+        while True:
+            page = pages.get()
+            if page is None:
+                return
+            if isinstance(page, Exception):
+                raise page
+            yield page
+    finally:
+        stop.set()
+        # Unblock the fetcher if the caller stopped early
+        while thread.is_alive():
+            try:
+                pages.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+@dataclass
+class ExportReport:
+    agents: int = 0
+    pages: int = 0
+    bytes_written: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def agents_per_sec(self) -> float:
+        return self.agents / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> Dict:
+        return {
+            "agents": self.agents,
+            "pages": self.pages,
+            "bytes": self.bytes_written,
+            "elapsed_sec": round(self.elapsed, 3),
+            "agents_per_sec": round(self.agents_per_sec, 2),
+        }
+
+
+def _page_table(page):
+    return pa.Table.from_pandas(pd.DataFrame([agent_to_row(agent) for agent in page], columns=SCHEMA.names),
+                                schema=SCHEMA, preserve_index=False)
+
+
+def export_fleet(client, path, stream=False, page_size=PAGE_SIZE, on_page=None) -> ExportReport:
+    """Write every agent on the server to a snapshot file
+
+    Without stream the fleet is gathered into one DataFrame and written in a
+    single pass (best compression); with stream each page is appended as it
+    arrives.
+    """
+    report = ExportReport()
+    start = time.perf_counter()
+    pages = iter_agent_pages(client, page_size)
+
+    if stream:
+        if is_arrow_path(path):
+            writer = ipc.new_file(path, SCHEMA, options=ipc.IpcWriteOptions(compression=COMPRESSION))
+        else:
+            writer = pq.ParquetWriter(path, SCHEMA, compression=COMPRESSION)
+        try:
+            for page in pages:
+                writer.write_table(_page_table(page))
+                report.agents += len(page)
+                report.pages += 1
+                if on_page:
+                    on_page(report)
+        finally:
+            writer.close()
+    else:
+        rows = []
+        for page in pages:
+            rows.extend(agent_to_row(agent) for agent in page)
+            report.agents += len(page)
+            report.pages += 1
+            if on_page:
+                on_page(report)
+        frame = pd.DataFrame(rows, columns=SCHEMA.names)
+        table = pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False)
+        if is_arrow_path(path):
+            with ipc.new_file(path, SCHEMA, options=ipc.IpcWriteOptions(compression=COMPRESSION)) as writer:
+                writer.write_table(table)
+        else:
+            pq.write_table(table, path, compression=COMPRESSION)
+
+    report.elapsed = time.perf_counter() - start
+    with open(path, "rb") as f:
+        report.bytes_written = f.seek(0, 2)
+    return report
+
+
+def iter_snapshot_rows(path, stream=False, batch_size=PAGE_SIZE):
+    """Rows of a snapshot file, one row group or record batch in memory at a time with stream"""
+    if not stream:
+        frame = pd.read_feather(path) if is_arrow_path(path) else pd.read_parquet(path)
+        yield from pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False).to_pylist()
+        return
+    if is_arrow_path(path):
+        with pa.memory_map(path) as source:
+            reader = ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                yield from reader.get_batch(index).to_pylist()
+    else:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+
+
+def imported_source_ids(client, page_size=PAGE_SIZE):
+    """Snapshot agent ids the target server already has, from its own ids and snapshot tags
+
+    Import skips these so a rerun creates nothing twice, while agents that only
+    share a name are still recreated.
+    """
+    ids = set()
+    for page in iter_agent_pages(client, page_size):
+        for agent in page:
+            ids.add(agent.id)
+            ids.update(tag[len(SNAPSHOT_TAG_PREFIX):] for tag in agent.tags or []
+                       if tag.startswith(SNAPSHOT_TAG_PREFIX))
+    return ids
+
+
+def find_imported(client, payload):
+    """The agent an interrupted create of this payload may have made, found by its snapshot tag"""
+    snapshot_tags = [tag for tag in payload["tags"] if tag.startswith(SNAPSHOT_TAG_PREFIX)]
+    matches = client.agents.list(tags=snapshot_tags, match_all_tags=True)
+    return matches[0] if matches else None
+
+
+@dataclass
+class SkippedRow:
+    source_id: str
+    name: str
+    reason: str
+
+
+@dataclass
+class ImportReport(ProvisionReport):
+    skipped: List[SkippedRow] = field(default_factory=list)
+
+    def summary(self) -> Dict:
+        return {
+            **super().summary(),
+            "skipped": len(self.skipped),
+            "skipped_rows": [{"id": row.source_id, "name": row.name, "reason": row.reason} for row in self.skipped],
+        }
+
+
+def import_fleet(client, path, stream=False, max_workers=8, rate_limits=None, max_retries=3, backoff=0.5,
+                 on_result=None) -> ImportReport:
+    """Recreate the agents of a snapshot, skipping those the server already has
+
+    At most max_workers * 4 creates are in flight, so a streamed import holds
+    a bounded number of rows however large the snapshot is.
+    """
+    rate_limits = parse_rate_limits([]) if rate_limits is None else rate_limits
+    limiters = {provider: RateLimiter(rate) for provider, rate in rate_limits.items() if rate > 0}
+
+    report = ImportReport()
+    start = time.perf_counter()
+    seen = imported_source_ids(client)
+    in_flight = set()
+
+    def collect(futures):
+        for future in futures:
+            result = future.result()
+            report.results.append(result)
+            if on_result:
+                on_result(result)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for row in iter_snapshot_rows(path, stream=stream):
+            if row["id"] in seen:
+                report.skipped.append(SkippedRow(row["id"], row["name"], "already imported"))
+                continue
+            seen.add(row["id"])
+            payload = row_to_payload(row)
+            limiter = limiters.get(payload["llm_config"].get("model_endpoint_type"))
+            # A retry after a timeout first checks the snapshot tag, so a slow create is not repeated
+            in_flight.add(pool.submit(create_with_retry, client, payload, limiter, max_retries, backoff,
+                                      find_imported))
+            if len(in_flight) >= max_workers * 4:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(wait(in_flight).done)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a snapshot of every Letta agent")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="Snapshot file (.parquet, or .arrow/.feather for Arrow IPC)")
+    parser.add_argument("--base-url", default="http://localhost:8283")
+    parser.add_argument("--stream", action="store_true",
+                        help="Write or read one page at a time instead of holding the fleet in memory")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--rate-limit", action="append", default=[], metavar="PROVIDER=RPS",
+                        help="Requests per second per provider, 0 disables the limit")
+    parser.add_argument("--report", help="Write the JSON summary to this file")
+    args = parser.parse_args()
+
+    dotenv.load_dotenv()
+    client = Letta(base_url=args.base_url)
+
+    if args.command == "export":
+        def on_page(report):
+            print(f"- {report.agents} agents ({report.pages} pages)")
+
+        report = export_fleet(client, args.path, stream=args.stream, page_size=args.page_size, on_page=on_page)
+        summary = report.summary()
+        print(f"\nExported {summary['agents']} agents to {args.path} ({summary['bytes']} bytes) "
+              f"in {summary['elapsed_sec']}s ({summary['agents_per_sec']} agents/sec)")
+    else:
+        def on_result(result):
+            if not result.agent_id:
+                print(f"- {result.name}: FAILED after {result.attempts} attempts: {result.error}")
+
+        print(f"Importing {args.path} with {args.workers} workers...")
+        report = import_fleet(client, args.path, stream=args.stream, max_workers=args.workers,
+                              rate_limits=parse_rate_limits(args.rate_limit), max_retries=args.retries,
+                              on_result=on_result)
+        for row in report.skipped:
+            print(f"- {row.name} ({row.source_id}): skipped, {row.reason}")
+        summary = report.summary()
+        print(f"\nCreated {summary['created']} agents, {summary['skipped']} already imported, "
+              f"{summary['failed']} failed in {summary['elapsed_sec']}s ({summary['agents_per_sec']} agents/sec)")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if args.command == "import" and report.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import threading
+from typing import Dict, Optional
+
+import pandas as pd
+import streamlit as st
+
+from hierarchy import parse_hierarchy_tags
+
+COLUMNS = ["id", "name", "provider", "model", "context_window", "temperature", "level", "supervisor",
+           "blocks", "block_chars", "block_limit", "max_block_fill", "tools"]
+
+# Blocks this full are about to truncate what the agent remembers
+NEARLY_FULL = 0.9
+
+
+def agent_row(agent) -> Dict:
+    """Flatten one listed AgentState into a dashboard row"""
+    llm_config = agent.llm_config
+    blocks = agent.memory.blocks if agent.memory else []
+    level, supervisor = parse_hierarchy_tags(agent.tags)
+    fills = [len(block.value or "") / block.limit for block in blocks if block.limit]
+    return {
+        "id": agent.id,
+        "name": agent.name,
+        "provider": llm_config.model_endpoint_type if llm_config else None,
+        "model": llm_config.model if llm_config else None,
+        "context_window": llm_config.context_window if llm_config else None,
+        "temperature": llm_config.temperature if llm_config else None,
+        "level": level,
+        "supervisor": supervisor,
+        "blocks": len(blocks),
+        "block_chars": sum(len(block.value or "") for block in blocks),
+        "block_limit": sum(block.limit or 0 for block in blocks),
+        "max_block_fill": max(fills, default=0.0),
+        "tools": len(agent.tools or []),
+    }
+
+
+class FleetFrame:
+    """One row per agent, re-flattening only agents whose version changed since the last sync"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._versions = {}
+        self._etag = None
+        self._frame = pd.DataFrame(columns=COLUMNS)
+        self._aggregates = None
+        self.flattened = 0
+
+    def sync(self, agents, etag: Optional[str] = None) -> pd.DataFrame:
+        """Bring the frame in line with a listing; an unchanged etag skips the work entirely"""
+        with self._lock:
+            if etag is not None and etag == self._etag:
+                return self._frame
+            seen = set()
+            changed = False
+            for agent in agents:
+                seen.add(agent.id)
+                version = str(agent.updated_at or "")
+                if not version or self._versions.get(agent.id) != version:
+                    self._rows[agent.id] = agent_row(agent)
+                    self._versions[agent.id] = version
+                    self.flattened += 1
+                    changed = True
+            for agent_id in set(self._rows) - seen:
+                del self._rows[agent_id]
+                del self._versions[agent_id]
+                changed = True
+            if changed or self._etag is None:
+                self._frame = pd.DataFrame(list(self._rows.values()), columns=COLUMNS)
+                self._aggregates = None
+            self._etag = etag
+            return self._frame
+
+    def aggregates(self) -> Dict:
+        """fleet_aggregates of the current frame, computed once per change"""
+        with self._lock:
+            if self._aggregates is None:
+                self._aggregates = fleet_aggregates(self._frame)
+            return self._aggregates
+
+
+def fleet_aggregates(frame: pd.DataFrame) -> Dict:
+    """Fleet-wide counts and distributions, all computed column-wise"""
+    fill_ratio = frame["block_chars"] / frame["block_limit"].where(frame["block_limit"] > 0)
+    names = set(frame["name"])
+    orphaned = frame[frame["supervisor"].ne("") & ~frame["supervisor"].isin(names)]
+
+    by_model = (
+        frame.groupby(["provider", "model"], dropna=False)
+        .agg(agents=("id", "size"), context_window=("context_window", "median"),
+             temperature=("temperature", "mean"))
+        .reset_index()
+        .sort_values("agents", ascending=False)
+    )
+    temperature = frame.groupby("provider", dropna=False)["temperature"].agg(["min", "mean", "max", "std"])
+
+    return {
+        "agents": len(frame),
+        "providers": frame["provider"].nunique(),
+        "by_model": by_model,
+        "by_level": frame["level"].value_counts().sort_index().rename("agents"),
+        "context_windows": frame["context_window"].value_counts().sort_index().rename("agents"),
+        "temperature": temperature.reset_index(),
+        "fill_ratio": fill_ratio.describe(percentiles=[0.5, 0.9]),
+        "nearly_full": frame.loc[frame["max_block_fill"] >= NEARLY_FULL, ["name", "max_block_fill"]]
+        .sort_values("max_block_fill", ascending=False),
+        "orphaned": orphaned.groupby("supervisor")
+        .agg(agents=("id", "size"), level=("level", "min"), names=("name", lambda names: ", ".join(sorted(names))))
+        .reset_index()
+        .sort_values("agents", ascending=False),
+    }
+
+
+@st.cache_resource
+def get_fleet_frame(base_url):
+    """One fleet frame per Letta server, shared across sessions"""
+    return FleetFrame()
@@ -0,0 +1,116 @@
+from collections import defaultdict
+
+
+def parse_hierarchy_tags(tags):
+    """Read (level, supervisor name) from level_N and {supervisor}_sub tags"""
+    level, supervisor = 1, ""
+    for tag in tags or []:
+        if tag.startswith("level_"):
+            try:
+                level = int(tag.split("_")[1])
+            except (IndexError, ValueError):
+                pass
+        elif tag.endswith("_sub"):
+            supervisor = tag[:-len("_sub")]
+    return level, supervisor
+
+
+class HierarchyIndex:
+    """Org chart lookups over agent ids, maintained incrementally from tags"""
+
+    def __init__(self):
+        self._entries = {}
+        self._by_level = defaultdict(set)
+        self._by_supervisor = defaultdict(set)
+        self._by_name = defaultdict(set)
+        self._chains = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, agent_id):
+        return agent_id in self._entries
+
+    def add(self, agent_id, name, tags):
+        """Index a new agent or re-index one whose name or tags changed"""
+        level, supervisor = parse_hierarchy_tags(tags)
+        entry = (name, level, supervisor)
+        if self._entries.get(agent_id) == entry:
+            return
+        self.remove(agent_id)
+        self._entries[agent_id] = entry
+        self._by_level[level].add(agent_id)
+        self._by_supervisor[supervisor].add(agent_id)
+        self._by_name[name].add(agent_id)
+        self._chains.clear()
+
+    def remove(self, agent_id):
+        entry = self._entries.pop(agent_id, None)
+        if entry is None:
+            return
+        name, level, supervisor = entry
+        self._by_level[level].discard(agent_id)
+        self._by_supervisor[supervisor].discard(agent_id)
+        self._by_name[name].discard(agent_id)
+        self._chains.clear()
+
+    def sync(self, agents):
+        """Bring the index in line with a full listing, touching only what changed"""
+        seen = set()
+        for agent in agents:
+            seen.add(agent.id)
+            self.add(agent.id, agent.name, agent.tags)
+        for agent_id in set(self._entries) - seen:
+            self.remove(agent_id)
+
+    def level_of(self, agent_id):
+        return self._entries[agent_id][1]
+
+    def supervisor_of(self, agent_id):
+        return self._entries[agent_id][2]
+
+    def ids_named(self, name):
+        return set(self._by_name.get(name, ()))
+
+    def at_level(self, level):
+        return set(self._by_level.get(level, ()))
+
+    def subordinates_of(self, supervisor_name):
+        return set(self._by_supervisor.get(supervisor_name, ()))
+
+    def reports_to(self, agent_id):
+        """Ids of the agents tagged with this agent's name as their supervisor"""
+        name = self._entries[agent_id][0] if agent_id in self._entries else None
+        return self.subordinates_of(name) - {agent_id} if name else set()
+
+    def supervisors(self):
+        """Ids of agents that at least one other agent reports to"""
+        return {
+            agent_id
+            for name, subordinates in self._by_supervisor.items() if subordinates and name
+            for agent_id in self._by_name.get(name, ())
+        }
+
+    def roots(self):
+        """Ids of agents whose supervisor is not itself an agent"""
+        return {
+            agent_id for agent_id, (_, _, supervisor) in self._entries.items()
+            if not self._by_name.get(supervisor)
+        }
+
+    def ancestry(self, agent_id):
+        """Supervisor chain from the direct supervisor upwards, as agent ids"""
+        if agent_id in self._chains:
+            return self._chains[agent_id]
+        chain, seen, current = [], {agent_id}, agent_id
+        while True:
+            supervisor = self._entries[current][2]
+            # Names are not unique; follow the first agent carrying the supervisor's name
+            candidates = sorted(self._by_name.get(supervisor, ()))
+            if not candidates or candidates[0] in seen:
+                break
+            current = candidates[0]
+            seen.add(current)
+            chain.append(current)
+        self._chains[agent_id] = chain
+        return chain
@@ -0,0 +1,414 @@
+import contextvars
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+import streamlit as st
+
+DEFAULT_TELEMETRY_DIR = "telemetry"
+
+# Collapse ids so calls aggregate per endpoint rather than per agent
+ID_PATTERN = re.compile(r"(agent|message|block|tool|source|job)-[0-9a-fA-F-]{8,}")
+AGENT_ID_PATTERN = re.compile(r"/agents/(agent-[0-9a-fA-F-]{8,})")
+
+_current_rerun = contextvars.ContextVar("letta_rerun", default=None)
+
+
+@dataclass
+class CallRecord:
+    method: str
+    endpoint: str
+    status: int
+    start: float
+    duration: float
+    request_bytes: int
+    response_bytes: int
+    rerun: Optional[str]
+    agent_id: Optional[str] = None
+    # Answered from the response cache rather than by the server
+    replayed: bool = False
+
+
+@dataclass
+class StreamRecord:
+    agent_id: str
+    start: float
+    time_to_first_token: Optional[float]
+    duration: float
+    tokens: int
+    rerun: Optional[str]
+    # "tokens" from the server's usage report, or "chunks" when the stream had none
+    unit: str = "tokens"
+
+    @property
+    def rate(self):
+        """Tokens, or chunks when unit says so, per second"""
+        return self.tokens / self.duration if self.duration else 0.0
+
+
+def endpoint_template(path):
+    return ID_PATTERN.sub(lambda match: "{" + match.group(1) + "_id}", path)
+
+
+def current_rerun():
+    return _current_rerun.get()
+
+
+def set_current_rerun(rerun_id):
+    return _current_rerun.set(rerun_id)
+
+
+def begin_rerun(page):
+    """Tag every Letta call made during this script run with a rerun id"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except ImportError:
+        ctx = None
+    session = ctx.session_id[:8] if ctx else "bare"
+    seq = st.session_state.get("_letta_rerun_seq", 0) + 1
+    st.session_state["_letta_rerun_seq"] = seq
+    rerun_id = f"{session}:{page}:{seq}"
+    _current_rerun.set(rerun_id)
+    return rerun_id
+
+
+class CallRecorder:
+    """Bounded in-memory log of Letta HTTP calls and chat streams"""
+
+    def __init__(self, max_records=5000):
+        self.calls = deque(maxlen=max_records)
+        self.streams = deque(maxlen=max_records)
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener):
+        """Call listener(record) for every call recorded from now on"""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def record_call(self, record):
+        with self._lock:
+            self.calls.append(record)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(record)
+
+    def record_stream(self, agent_id, start, first_token_at, end, tokens, unit="tokens"):
+        """Log one streamed reply; unit says whether tokens counts tokens or message chunks"""
+        record = StreamRecord(
+            agent_id=agent_id,
+            start=start,
+            time_to_first_token=first_token_at - start if first_token_at else None,
+            duration=end - start,
+            tokens=tokens,
+            rerun=current_rerun(),
+            unit=unit,
+        )
+        with self._lock:
+            self.streams.append(record)
+        return record
+
+    def calls_for_rerun(self, rerun_id):
+        with self._lock:
+            return [call for call in self.calls if call.rerun == rerun_id]
+
+    def streams_for_rerun(self, rerun_id):
+        with self._lock:
+            return [stream for stream in self.streams if stream.rerun == rerun_id]
+
+    def summary_by_endpoint(self, calls=None):
+        """Count, total time and bytes per (method, endpoint)"""
+        if calls is None:
+            with self._lock:
+                calls = list(self.calls)
+        summary = defaultdict(lambda: {"calls": 0, "errors": 0, "total_s": 0.0, "bytes": 0})
+        for call in calls:
+            entry = summary[(call.method, call.endpoint)]
+            entry["calls"] += 1
+            entry["errors"] += call.status >= 400
+            entry["total_s"] += call.duration
+            entry["bytes"] += call.response_bytes
+        return dict(summary)
+
+    def clear(self):
+        with self._lock:
+            self.calls.clear()
+            self.streams.clear()
+
+    def export_otlp(self, path):
+        """Write calls and streams as OTLP/JSON spans, one trace per rerun"""
+        with self._lock:
+            calls, streams = list(self.calls), list(self.streams)
+
+        def ids(seed, length):
+            return hashlib.sha256(seed.encode()).hexdigest()[:length]
+
+        def attributes(values):
+            out = []
+            for key, value in values.items():
+                if value is None:
+                    continue
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    out.append({"key": key, "value": {"stringValue": str(value)}})
+                elif isinstance(value, int):
+                    out.append({"key": key, "value": {"intValue": str(value)}})
+                else:
+                    out.append({"key": key, "value": {"doubleValue": value}})
+            return out
+
+        spans = []
+        for n, call in enumerate(calls):
+            spans.append({
+                "traceId": ids(call.rerun or "no-rerun", 32),
+                "spanId": ids(f"call:{n}:{call.start}", 16),
+                "name": f"{call.method} {call.endpoint}",
+                "kind": 3,
+                "startTimeUnixNano": str(int(call.start * 1e9)),
+                "endTimeUnixNano": str(int((call.start + call.duration) * 1e9)),
+                "attributes": attributes({
+                    "http.request.method": call.method,
+                    "url.path": call.endpoint,
+                    "http.response.status_code": call.status,
+                    "http.request.body.size": call.request_bytes,
+                    "http.response.body.size": call.response_bytes,
+                    "streamlit.rerun": call.rerun,
+                }),
+                "status": {"code": 2 if call.status >= 400 else 1},
+            })
+        for n, stream in enumerate(streams):
+            spans.append({
+                "traceId": ids(stream.rerun or "no-rerun", 32),
+                "spanId": ids(f"stream:{n}:{stream.start}", 16),
+                "name": "letta.create_stream",
+                "kind": 3,
+                "startTimeUnixNano": str(int(stream.start * 1e9)),
+                "endTimeUnixNano": str(int((stream.start + stream.duration) * 1e9)),
+                "attributes": attributes({
+                    "letta.agent_id": stream.agent_id,
+                    "letta.time_to_first_token_s": stream.time_to_first_token,
+                    f"letta.{stream.unit}": stream.tokens,
+                    f"letta.{stream.unit}_per_sec": stream.rate,
+                    "streamlit.rerun": stream.rerun,
+                }),
+            })
+
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": attributes({"service.name": "letta-agents"})},
+            "scopeSpans": [{"scope": {"name": "letta-agents.instrumentation"}, "spans": spans}],
+        }]}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(payload, f)
+        return len(spans)
+
+    def export_prometheus(self, path):
+        """Write cumulative metrics in the Prometheus text exposition format"""
+        with self._lock:
+            calls, streams = list(self.calls), list(self.streams)
+
+        requests = Counter()
+        duration = defaultdict(float)
+        response_bytes = defaultdict(int)
+        for call in calls:
+            key = (call.method, call.endpoint, call.status)
+            requests[key] += 1
+            duration[key] += call.duration
+            response_bytes[key] += call.response_bytes
+
+        def labels(method, endpoint, status):
+            return f'{{method="{method}",endpoint="{endpoint}",status="{status}"}}'
+
+        lines = [
+            "# HELP letta_client_requests_total Letta API calls.",
+            "# TYPE letta_client_requests_total counter",
+        ]
+        lines += [f"letta_client_requests_total{labels(*key)} {count}" for key, count in sorted(requests.items())]
+        lines += [
+            "# HELP letta_client_request_duration_seconds_total Time spent in Letta API calls.",
+            "# TYPE letta_client_request_duration_seconds_total counter",
+        ]
+        lines += [f"letta_client_request_duration_seconds_total{labels(*key)} {value:.6f}"
+                  for key, value in sorted(duration.items())]
+        lines += [
+            "# HELP letta_client_response_bytes_total Response bytes received from Letta.",
+            "# TYPE letta_client_response_bytes_total counter",
+        ]
+        lines += [f"letta_client_response_bytes_total{labels(*key)} {value}"
+                  for key, value in sorted(response_bytes.items())]
+
+        ttfts = [s.time_to_first_token for s in streams if s.time_to_first_token is not None]
+        lines += [
+            "# HELP letta_stream_time_to_first_token_seconds Time to first assistant token.",
+            "# TYPE letta_stream_time_to_first_token_seconds summary",
+            f"letta_stream_time_to_first_token_seconds_sum {sum(ttfts):.6f}",
+            f"letta_stream_time_to_first_token_seconds_count {len(ttfts)}",
+            "# HELP letta_stream_tokens_total Assistant tokens streamed.",
+            "# TYPE letta_stream_tokens_total counter",
+            f"letta_stream_tokens_total {sum(s.tokens for s in streams if s.unit == 'tokens')}",
+            "# HELP letta_stream_chunks_total Assistant message chunks of streams that reported no usage.",
+            "# TYPE letta_stream_chunks_total counter",
+            f"letta_stream_chunks_total {sum(s.tokens for s in streams if s.unit == 'chunks')}",
+            "# HELP letta_stream_duration_seconds_total Time spent streaming replies.",
+            "# TYPE letta_stream_duration_seconds_total counter",
+            f"letta_stream_duration_seconds_total {sum(s.duration for s in streams):.6f}",
+        ]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return len(calls)
+
+
+@st.cache_resource
+def get_recorder():
+    """Shared call log for every session in this process"""
+    return CallRecorder()
+
+
+def _record(recorder, request, status, start, response_bytes, rerun, replayed=False):
+    agent_match = AGENT_ID_PATTERN.search(request.url.path)
+    recorder.record_call(CallRecord(
+        method=request.method,
+        endpoint=endpoint_template(request.url.path),
+        status=status,
+        start=start,
+        duration=time.time() - start,
+        request_bytes=int(request.headers.get("content-length") or 0),
+        response_bytes=response_bytes,
+        rerun=rerun,
+        agent_id=agent_match.group(1) if agent_match else None,
+        replayed=replayed,
+    ))
+
+
+class _CountingStream(httpx.SyncByteStream):
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+        self._bytes = 0
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._bytes += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._on_close(self._bytes)
+
+
+class _AsyncCountingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+        self._bytes = 0
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._bytes += len(chunk)
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._on_close(self._bytes)
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """Records every request once its response body has been consumed"""
+
+    def __init__(self, transport, recorder):
+        self._transport = transport
+        self._recorder = recorder
+
+    def handle_request(self, request):
+        start, rerun = time.time(), current_rerun()
+        try:
+            response = self._transport.handle_request(request)
+        except Exception:
+            _record(self._recorder, request, 599, start, 0, rerun)
+            raise
+        replayed = response.extensions.get("letta_replayed", False)
+        stream = _CountingStream(response.stream, lambda size: _record(
+            self._recorder, request, response.status_code, start, size, rerun, replayed))
+        return httpx.Response(response.status_code, headers=response.headers, stream=stream,
+                              extensions=response.extensions)
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncInstrumentedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of InstrumentedTransport"""
+
+    def __init__(self, transport, recorder):
+        self._transport = transport
+        self._recorder = recorder
+
+    async def handle_async_request(self, request):
+        start, rerun = time.time(), current_rerun()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            _record(self._recorder, request, 599, start, 0, rerun)
+            raise
+        replayed = response.extensions.get("letta_replayed", False)
+        stream = _AsyncCountingStream(response.stream, lambda size: _record(
+            self._recorder, request, response.status_code, start, size, rerun, replayed))
+        return httpx.Response(response.status_code, headers=response.headers, stream=stream,
+                              extensions=response.extensions)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def render_debug_sidebar(rerun_id):
+    """Optional sidebar with this rerun's Letta calls and export buttons"""
+    if not st.sidebar.checkbox("Show Letta API calls", key="letta_debug_sidebar"):
+        return
+    recorder = get_recorder()
+    calls = recorder.calls_for_rerun(rerun_id)
+    st.sidebar.subheader("This rerun")
+    st.sidebar.metric("Letta calls", len(calls))
+    st.sidebar.metric("Time in Letta calls", f"{sum(call.duration for call in calls) * 1000:.0f} ms")
+    if calls:
+        st.sidebar.dataframe([
+            {"endpoint": f"{call.method} {call.endpoint}", "status": call.status,
+             "ms": round(call.duration * 1000, 1), "bytes": call.response_bytes}
+            for call in calls
+        ], use_container_width=True)
+
+    streams = recorder.streams_for_rerun(rerun_id)
+    for stream in streams:
+        ttft = f"{stream.time_to_first_token * 1000:.0f} ms" if stream.time_to_first_token is not None else "n/a"
+        st.sidebar.caption(f"Stream: first token {ttft}, {stream.rate:.1f} {stream.unit}/sec")
+
+    st.sidebar.subheader("All reruns")
+    summary = recorder.summary_by_endpoint()
+    st.sidebar.dataframe([
+        {"endpoint": f"{method} {endpoint}", "calls": entry["calls"], "errors": entry["errors"],
+         "avg ms": round(entry["total_s"] / entry["calls"] * 1000, 1)}
+        for (method, endpoint), entry in sorted(summary.items())
+    ], use_container_width=True)
+
+    telemetry_dir = os.getenv("LETTA_TELEMETRY_DIR", DEFAULT_TELEMETRY_DIR)
+    col_otlp, col_prom = st.sidebar.columns(2)
+    with col_otlp:
+        if st.button("Export spans", key="letta_export_otlp"):
+            count = recorder.export_otlp(os.path.join(telemetry_dir, "letta_spans.json"))
+            st.sidebar.success(f"Wrote {count} spans")
+    with col_prom:
+        if st.button("Export metrics", key="letta_export_prom"):
+            recorder.export_prometheus(os.path.join(telemetry_dir, "letta_metrics.prom"))
+            st.sidebar.success("Wrote metrics")
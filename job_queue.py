@@ -0,0 +1,298 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "letta-agents", "jobs.sqlite")
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    idempotency_key TEXT UNIQUE,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    run_after REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, run_after, created_at);
+"""
+
+# Columns added after the first release, for queue files created before them
+MIGRATIONS = {"owner": "ALTER TABLE jobs ADD COLUMN owner TEXT",
+              "lease_until": "ALTER TABLE jobs ADD COLUMN lease_until REAL"}
+
+COLUMNS = ("id", "kind", "params", "idempotency_key", "status", "attempts", "max_attempts", "progress",
+           "message", "result", "error", "created_at", "run_after", "started_at", "finished_at")
+
+
+def _row_to_job(row):
+    job = dict(zip(COLUMNS, row))
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    return job
+
+
+class JobQueue:
+    """SQLite-backed queue of agent operations run by a pool of worker threads
+
+    Jobs outlive Streamlit reruns and sessions: pages submit, keep the id and
+    poll. A handler is called as handler(params, progress) and returns a
+    JSON-serializable result; progress(fraction, message) reports along the way.
+
+    Several processes may share one queue file. A running job is leased to the
+    queue that claimed it and the lease is renewed while it runs; only jobs
+    whose lease ran out, i.e. whose process died, are recovered by others.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, workers=4, backoff=1.0, poll_interval=1.0, lease=30.0):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.workers = workers
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers = {}
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        with self._lock, self._conn:
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in existing:
+                    self._conn.execute(statement)
+        self._recover()
+
+    def register(self, kind, handler):
+        self._handlers[kind] = handler
+
+    def submit(self, kind, params, idempotency_key=None, max_attempts=3):
+        """Queue a job and return its id
+
+        A job with the same idempotency key that is still queued or running is
+        returned instead of a new one; once it has finished, the same request
+        is a new job (e.g. changing an agent back to an earlier state).
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind {kind}")
+        job_id = f"job-{uuid.uuid4()}"
+        now = time.time()
+        with self._lock, self._conn:
+            if idempotency_key is not None:
+                existing = self._conn.execute(
+                    "SELECT id, finished_at FROM jobs WHERE idempotency_key = ?", (idempotency_key,)
+                ).fetchone()
+                if existing and existing[1] is None:
+                    return existing[0]
+                if existing:
+                    # Finished, so this is a new request; free the key for it
+                    self._conn.execute("UPDATE jobs SET idempotency_key = NULL WHERE id = ?", (existing[0],))
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, params, idempotency_key, status, max_attempts, "
+                "created_at, run_after) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params), idempotency_key, QUEUED, max_attempts, now, now),
+            )
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        """Status, progress and stored result of one job, or None"""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def recent(self, kind=None, limit=20):
+        """Newest jobs first, optionally of one kind"""
+        query = f"SELECT {', '.join(COLUMNS)} FROM jobs"
+        params = []
+        if kind is not None:
+            query += " WHERE kind = ?"
+            params.append(kind)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, [*params, limit]).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+    def cancel(self, job_id):
+        """Cancel a job that has not started; returns whether it was cancelled"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED),
+            )
+        return cursor.rowcount == 1
+
+    def purge(self, older_than):
+        """Delete finished jobs older than the given number of seconds"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINISHED))}) AND finished_at < ?",
+                (*FINISHED, time.time() - older_than),
+            )
+        return cursor.rowcount
+
+    def _recover(self):
+        """Settle running jobs whose owner stopped renewing their lease
+
+        Jobs with attempts left go back in the queue; the rest fail, so a job
+        pinned to one attempt (e.g. one that creates agents) never runs twice.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, owner = NULL, lease_until = NULL "
+                "WHERE status = ? AND (lease_until IS NULL OR lease_until < ?) AND attempts >= max_attempts",
+                (FAILED, "Interrupted: the process running this job stopped", now, RUNNING, now),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, owner = NULL, lease_until = NULL "
+                "WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)",
+                (QUEUED, RUNNING, now),
+            )
+
+    def _renew(self):
+        """Extend the lease of every job this queue is running"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE jobs SET lease_until = ? WHERE status = ? AND owner = ?",
+                               (time.time() + self.lease, RUNNING, self.owner))
+
+    def _claim(self):
+        now = time.time()
+        with self._lock:
+            while True:
+                with self._conn:
+                    row = self._conn.execute(
+                        f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE status = ? AND run_after <= ? "
+                        "AND attempts < max_attempts ORDER BY created_at LIMIT 1",
+                        (QUEUED, now),
+                    ).fetchone()
+                    if row is None:
+                        return None
+                    # Compare-and-set, so two processes sharing the file cannot both claim it
+                    cursor = self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, error = NULL, "
+                        "owner = ?, lease_until = ? WHERE id = ? AND status = ?",
+                        (RUNNING, now, self.owner, now + self.lease, row[0], QUEUED),
+                    )
+                if cursor.rowcount == 1:
+                    break
+        job = _row_to_job(row)
+        job["attempts"] += 1
+        return job
+
+    def _idle_wait(self):
+        """Sleep until the next retry is due, but no longer than poll_interval"""
+        with self._lock:
+            next_due = self._conn.execute("SELECT MIN(run_after) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+        if next_due is None:
+            return self.poll_interval
+        return max(0.01, min(self.poll_interval, next_due - time.time()))
+
+    def _progress(self, job_id):
+        def report(fraction, message=None):
+            with self._lock, self._conn:
+                self._conn.execute("UPDATE jobs SET progress = ?, message = ? WHERE id = ?",
+                                   (max(0.0, min(1.0, fraction)), message, job_id))
+        return report
+
+    def _run(self, job):
+        handler = self._handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for job kind {job['kind']}")
+            result = json.dumps(handler(job["params"], self._progress(job["id"])), default=str)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            with self._lock, self._conn:
+                # Bad input (ValueError) will not get better on a retry
+                if job["attempts"] < job["max_attempts"] and not isinstance(e, ValueError):
+                    # Exponential backoff before the next attempt
+                    retry_at = time.time() + self.backoff * 2 ** (job["attempts"] - 1)
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, run_after = ?, error = ?, owner = NULL, lease_until = NULL "
+                        "WHERE id = ? AND owner = ?",
+                        (QUEUED, retry_at, error, job["id"], self.owner),
+                    )
+                else:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_until = NULL "
+                        "WHERE id = ? AND owner = ?",
+                        (FAILED, error + "\n" + traceback.format_exc(limit=5), time.time(), job["id"], self.owner),
+                    )
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, progress = 1, finished_at = ?, lease_until = NULL "
+                "WHERE id = ? AND owner = ?",
+                (SUCCEEDED, result, time.time(), job["id"], self.owner),
+            )
+
+    def _heartbeat(self):
+        # Renew well before the lease runs out, and pick up jobs of processes that died
+        while not self._stopping.wait(self.lease / 3):
+            self._renew()
+            self._recover()
+
+    def _work(self):
+        while not self._stopping.is_set():
+            job = self._claim()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self._idle_wait())
+                continue
+            self._run(job)
+
+    def start(self):
+        """Start the worker threads; safe to call more than once"""
+        if self._threads:
+            return self
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"letta-job-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="letta-job-lease", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wait(self, job_id, timeout=None, interval=0.05):
+        """Block until a job finishes (for scripts and benchmarks, not pages)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in FINISHED:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(interval)
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import threading
+
+import httpx
+import streamlit as st
+from letta_client import AsyncLetta, Letta
+
+from agent_registry import get_agent_registry
+from instrumentation import (
+    AsyncInstrumentedTransport,
+    InstrumentedTransport,
+    current_rerun,
+    get_recorder,
+    set_current_rerun,
+)
+from provider_health import get_provider_health
+from response_cache import wrap_async_transport, wrap_transport
+
+DEFAULT_BASE_URL = "http://localhost:8283"
+
+
+def _settings():
+    """Connection settings, overridable through the environment"""
+    return {
+        "base_url": os.getenv("LETTA_BASE_URL", DEFAULT_BASE_URL),
+        "pool_size": int(os.getenv("LETTA_POOL_SIZE", "20")),
+        "keepalive_expiry": float(os.getenv("LETTA_KEEPALIVE_EXPIRY", "30")),
+        "timeout": float(os.getenv("LETTA_TIMEOUT", "60")),
+        "connect_timeout": float(os.getenv("LETTA_CONNECT_TIMEOUT", "5")),
+    }
+
+
+def server_url():
+    """Base URL of the Letta server this process talks to"""
+    return _settings()["base_url"]
+
+
+def _http2_available():
+    """httpx only speaks HTTP/2 when the h2 package is installed"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _transport_options(settings):
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings["pool_size"],
+            max_keepalive_connections=settings["pool_size"],
+            keepalive_expiry=settings["keepalive_expiry"],
+        ),
+        "http2": _http2_available(),
+    }
+
+
+def _timeout(settings):
+    return httpx.Timeout(settings["timeout"], connect=settings["connect_timeout"])
+
+
+@st.cache_resource
+def get_client():
+    """Process-wide sync Letta client over one keep-alive connection pool"""
+    settings = _settings()
+    client = Letta(
+        base_url=settings["base_url"],
+        timeout=settings["timeout"],
+        httpx_client=httpx.Client(
+            timeout=_timeout(settings),
+            # Every call is recorded for the debug sidebar and telemetry exports
+            # Replayed replies (LETTA_RESPONSE_CACHE) are recorded too, just faster
+            transport=InstrumentedTransport(
+                wrap_transport(httpx.HTTPTransport(**_transport_options(settings))), get_recorder()
+            ),
+        ),
+    )
+    # Message latencies of every call, sync or async, feed provider health and routing
+    get_provider_health().attach(get_recorder(), lambda agent_id: get_agent_registry(client).get(agent_id))
+    return client
+
+
+class AsyncRunner:
+    """Event loop on a daemon thread so Streamlit scripts can await coroutines"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="letta-async", daemon=True)
+        self._thread.start()
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the shared loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+
+@st.cache_resource
+def get_async_runner():
+    return AsyncRunner()
+
+
+@st.cache_resource
+def get_async_client():
+    """Process-wide async Letta client; only use it on the shared runner loop"""
+    settings = _settings()
+    return AsyncLetta(
+        base_url=settings["base_url"],
+        timeout=settings["timeout"],
+        httpx_client=httpx.AsyncClient(
+            timeout=_timeout(settings),
+            transport=AsyncInstrumentedTransport(
+                wrap_async_transport(httpx.AsyncHTTPTransport(**_transport_options(settings))), get_recorder()
+            ),
+        ),
+    )
+
+
+def run_async(coro, timeout=None):
+    """Run a coroutine against the async client from synchronous page code"""
+    rerun = current_rerun()
+
+    async def tagged():
+        # The runner loop has its own context; carry the caller's rerun id over
+        set_current_rerun(rerun)
+        return await coro
+
+    return get_async_runner().run(tagged(), timeout)
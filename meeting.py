@@ -0,0 +1,186 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from chat_transcript import to_chat_entry
+
+
+@dataclass
+class AgentReply:
+    agent_id: str
+    name: str
+    content: str = ""
+    latency: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    error: Optional[str] = None
+
+    def as_row(self):
+        return {
+            "agent": self.name,
+            "latency_s": round(self.latency, 2),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "status": self.error or "ok",
+        }
+
+
+@dataclass
+class MeetingRound:
+    prompt: str
+    replies: List[AgentReply] = field(default_factory=list)
+    summary: str = ""
+    supervisor_reply: Optional[AgentReply] = None
+    elapsed: float = 0.0
+
+
+def _reply_text(response):
+    entries = [to_chat_entry(message) for message in response.messages]
+    return "\n".join(entry["content"] for entry in entries if entry and entry["role"] == "assistant")
+
+
+async def ask_agent(client, agent, prompt):
+    """Send one prompt to one agent and record latency and token usage"""
+    reply = AgentReply(agent_id=agent.id, name=agent.name)
+    start = time.perf_counter()
+    try:
+        response = await client.agents.messages.create(
+            agent_id=agent.id,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        reply.content = _reply_text(response)
+        usage = getattr(response, "usage", None)
+        if usage:
+            reply.prompt_tokens = usage.prompt_tokens or 0
+            reply.completion_tokens = usage.completion_tokens or 0
+    except Exception as e:
+        reply.error = str(e)
+    reply.latency = time.perf_counter() - start
+    return reply
+
+
+def summarize_replies(prompt, replies):
+    """Combined report passed up to the supervisor"""
+    lines = [f"Your team was asked: {prompt}", "", "Their replies:"]
+    for reply in replies:
+        if reply.error:
+            lines.append(f"- {reply.name}: (no reply: {reply.error})")
+        else:
+            lines.append(f"- {reply.name}: {reply.content}")
+    return "\n".join(lines)
+
+
+async def run_round(client, supervisor, subordinates, prompt, deadline):
+    """Fan the prompt out to every subordinate at once, then brief the supervisor"""
+    meeting_round = MeetingRound(prompt=prompt)
+    start = time.perf_counter()
+
+    tasks = {asyncio.ensure_future(ask_agent(client, agent, prompt)): agent for agent in subordinates}
+    done, pending = await asyncio.wait(tasks, timeout=deadline) if tasks else (set(), set())
+    for task in pending:
+        task.cancel()
+
+    # Keep replies in subordinate order so rounds are comparable
+    for task, agent in tasks.items():
+        if task in done:
+            meeting_round.replies.append(task.result())
+        else:
+            meeting_round.replies.append(AgentReply(
+                agent_id=agent.id, name=agent.name, latency=deadline, error=f"missed {deadline}s deadline"))
+
+    meeting_round.summary = summarize_replies(prompt, meeting_round.replies)
+    meeting_round.supervisor_reply = await ask_agent(client, supervisor, meeting_round.summary)
+    meeting_round.elapsed = time.perf_counter() - start
+    return meeting_round
+
+
+async def run_meeting(client, supervisor, subordinates, agenda, rounds=1, deadline=30.0, on_round=None):
+    """Run several rounds; each round after the first uses the supervisor's last reply as its prompt
+
+    on_round(number, meeting_round) is called as each round finishes.
+    """
+    meeting = []
+    prompt = agenda
+    for number in range(1, rounds + 1):
+        meeting_round = await run_round(client, supervisor, subordinates, prompt, deadline)
+        meeting.append(meeting_round)
+        if on_round:
+            on_round(number, meeting_round)
+        reply = meeting_round.supervisor_reply
+        if reply.error or not reply.content:
+            break
+        prompt = reply.content
+    return meeting
+
+
+def create_and_test_agent(client, pause=2):
+    """Create a test agent, ask it for its tools and return the response"""
+    try:
+        # Create a new agent with the built-in multi-agent tool
+        print("Creating agent...")
+        agent = client.agents.create(
+            name="Test Agent",
+            memory_blocks=[
+                {
+                    "label": "job_directives",
+                    "value": "You are a helpful assistant",
+                    "limit": 2000
+                },
+                {
+                    "label": "persona",
+                    "value": "I am a friendly AI",
+                    "limit": 3000
+                }
+            ],
+            model="openai/gpt-4o-mini",
+            llm_config={
+                "model": "gpt-4o-mini",
+                "model_endpoint_type": "openai",
+                "model_endpoint": "https://api.openai.com/v1/",
+                "context_window": 8192,
+                "temperature": 0.7,
+                "put_inner_thoughts_in_kwargs": True
+            },
+            embedding_config={
+                "embedding_model": "text-embedding-3-small",
+                "embedding_endpoint_type": "openai",
+                "embedding_endpoint": "https://api.openai.com/v1/",
+                "embedding_dim": 1536
+            },
+            tags=["level_1", "test_supervisor_sub"],
+            tools=["send_message_to_agents_matching_all_tags"]
+        )
+        
+        print(f"Agent created with ID: {agent.id}")
+        
+        # Send a message to the agent
+        print("Sending message to agent...")
+        response = client.agents.messages.create(
+            agent_id=agent.id,
+            messages=[
+                {
+                    "role": "user",
+                    "content": "Hello, how are you? can you tist all the tools you have acess to?"
+                }
+            ],
+        )
+        
+        print("Agent response:")
+        print(response)
+        
+        # Wait a moment before deletion
+        time.sleep(pause)
+        
+        #print("Retrieving agent info...")
+        #retrieving agent info
+        #agent_info = client.agents.retrieve(
+        #    agent_id=agent.id
+        #)
+        #print(agent_info)
+
+        return agent, response
+        
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        return None
@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import threading
+
+import streamlit as st
+
+from chat_transcript import to_chat_entry
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "letta-agents", "messages.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    agent_id TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (agent_id, message_id)
+);
+CREATE INDEX IF NOT EXISTS messages_by_date ON messages (agent_id, date, message_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    agent_id TEXT PRIMARY KEY,
+    newest_id TEXT,
+    oldest_id TEXT,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class MessageCache:
+    """On-disk copy of each agent's chat history, synced from the server by cursor"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, page_size=100):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def _state(self, agent_id):
+        row = self._conn.execute(
+            "SELECT newest_id, oldest_id, complete FROM sync_state WHERE agent_id = ?", (agent_id,)
+        ).fetchone()
+        return row or (None, None, 0)
+
+    def _store(self, agent_id, page, newest_id=None, oldest_id=None, complete=None):
+        """Insert one server page and move the sync cursors"""
+        rows = []
+        for message in page:
+            entry = to_chat_entry(message)
+            if entry:
+                rows.append((agent_id, entry["id"], entry["date"], entry["role"], entry["content"]))
+        current_newest, current_oldest, current_complete = self._state(agent_id)
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)",
+                (agent_id, newest_id or current_newest, oldest_id or current_oldest,
+                 int(current_complete if complete is None else complete)),
+            )
+
+    def sync_newer(self, client, agent_id):
+        """Fetch only messages newer than the last cached one; returns how many pages were requested"""
+        with self._lock:
+            newest_id, _, _ = self._state(agent_id)
+            if newest_id is None:
+                # First open: take the latest page, older history is backfilled on demand
+                page = client.agents.messages.list(agent_id=agent_id, limit=self.page_size)
+                self._store(agent_id, page, newest_id=page[-1].id if page else None,
+                            oldest_id=page[0].id if page else None, complete=len(page) < self.page_size)
+                return 1
+
+            requests = 0
+            while True:
+                page = client.agents.messages.list(agent_id=agent_id, after=newest_id, limit=self.page_size)
+                requests += 1
+                if page:
+                    newest_id = page[-1].id
+                    self._store(agent_id, page, newest_id=newest_id)
+                if len(page) < self.page_size:
+                    return requests
+
+    def backfill_older(self, client, agent_id):
+        """Fetch one page older than anything cached; returns False once history is complete"""
+        with self._lock:
+            _, oldest_id, complete = self._state(agent_id)
+            if complete:
+                return False
+            page = client.agents.messages.list(agent_id=agent_id, before=oldest_id, limit=self.page_size)
+            self._store(agent_id, page, oldest_id=page[0].id if page else None,
+                        complete=len(page) < self.page_size)
+            return bool(page)
+
+    def is_complete(self, agent_id):
+        with self._lock:
+            return bool(self._state(agent_id)[2])
+
+    def latest(self, agent_id, limit):
+        """The newest `limit` cached entries, oldest first"""
+        return self.before(agent_id, None, limit)
+
+    def before(self, agent_id, entry, limit):
+        """Up to `limit` cached entries older than `entry`, oldest first"""
+        query = "SELECT message_id, date, role, content FROM messages WHERE agent_id = ?"
+        params = [agent_id]
+        if entry is not None:
+            query += " AND (date < ? OR (date = ? AND message_id < ?))"
+            params += [entry["date"], entry["date"], entry["id"]]
+        query += " ORDER BY date DESC, message_id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            {"id": message_id, "date": date, "role": role, "content": content}
+            for message_id, date, role, content in reversed(rows)
+        ]
+
+    def clear(self, agent_id=None):
+        with self._lock, self._conn:
+            if agent_id is None:
+                self._conn.execute("DELETE FROM messages")
+                self._conn.execute("DELETE FROM sync_state")
+            else:
+                self._conn.execute("DELETE FROM messages WHERE agent_id = ?", (agent_id,))
+                self._conn.execute("DELETE FROM sync_state WHERE agent_id = ?", (agent_id,))
+
+
+@st.cache_resource
+def get_message_cache():
+    """Shared message cache for every session in this process"""
+    return MessageCache(os.getenv("LETTA_MESSAGE_CACHE", DEFAULT_CACHE_PATH))
@@ -1,81 +1,94 @@
+import streamlit as st
 import dotenv
-from letta_client import Letta
-import time
+import agent_jobs
+from letta_clients import get_client
+from agent_registry import get_agent_registry
+from agent_search import agent_picker
+from job_queue import FAILED, SUCCEEDED
+from meeting import AgentReply
+from instrumentation import begin_rerun, render_debug_sidebar
 
 # Load environment variables
 dotenv.load_dotenv()
 
-# Initialize Letta client
-client = Letta(base_url="http://localhost:8283")
+# Shared pooled Letta client
+client = get_client()
 
-def create_and_test_agent():
-    try:
-        # Create a new agent with the built-in multi-agent tool
-        print("Creating agent...")
-        agent = client.agents.create(
-            name="Test Agent",
-            memory_blocks=[
-                {
-                    "label": "job_directives",
-                    "value": "You are a helpful assistant",
-                    "limit": 2000
-                },
-                {
-                    "label": "persona",
-                    "value": "I am a friendly AI",
-                    "limit": 3000
-                }
-            ],
-            model="openai/gpt-4o-mini",
-            llm_config={
-                "model": "gpt-4o-mini",
-                "model_endpoint_type": "openai",
-                "model_endpoint": "https://api.openai.com/v1/",
-                "context_window": 8192,
-                "temperature": 0.7,
-                "put_inner_thoughts_in_kwargs": True
-            },
-            embedding_config={
-                "embedding_model": "text-embedding-3-small",
-                "embedding_endpoint_type": "openai",
-                "embedding_endpoint": "https://api.openai.com/v1/",
-                "embedding_dim": 1536
-            },
-            tags=["level_1", "test_supervisor_sub"],
-            tools=["send_message_to_agents_matching_all_tags"]
-        )
-        
-        print(f"Agent created with ID: {agent.id}")
-        
-        # Send a message to the agent
-        print("Sending message to agent...")
-        response = client.agents.messages.create(
-            agent_id=agent.id,
-            messages=[
-                {
-                    "role": "user",
-                    "content": "Hello, how are you? can you tist all the tools you have acess to?"
-                }
-            ],
-        )
-        
-        print("Agent response:")
-        print(response)
-        
-        # Wait a moment before deletion
-        time.sleep(2)
-        
-        #print("Retrieving agent info...")
-        #retrieving agent info
-        #agent_info = client.agents.retrieve(
-        #    agent_id=agent.id
-        #)
-        #print(agent_info)
-        
+# Streamlit UI
+st.title("Agents Meeting")
+rerun_id = begin_rerun("agents_meeting")
+
+registry = get_agent_registry(client)
+try:
+    registry.list_agents()
+except Exception as e:
+    st.error(f"Error: {str(e)}")
+    st.stop()
+# Supervisors and their teams come straight from the hierarchy index
+supervisor_ids = registry.hierarchy.supervisors()
+
+if not supervisor_ids:
+    st.info("No supervisors found. Tag agents with '<supervisor>_sub' to build a hierarchy.")
+    st.stop()
 
-        
+supervisor = agent_picker(registry, "Find a supervisor:", key="meeting_supervisor", agent_ids=supervisor_ids)
+if supervisor is None:
+    st.stop()
+subordinates = registry.agents_by_ids(registry.hierarchy.reports_to(supervisor.id))
+st.write(f"{len(subordinates)} subordinates: " + ", ".join(agent.name for agent in subordinates))
+
+agenda = st.text_area("Meeting agenda:", "Report your current status and any blockers.")
+col_rounds, col_deadline = st.columns(2)
+with col_rounds:
+    rounds = st.number_input("Rounds:", min_value=1, max_value=5, value=1)
+with col_deadline:
+    deadline = st.slider("Per-round deadline (seconds):", min_value=5, max_value=120, value=30)
+
+if st.button("Start Meeting"):
+    # Runs on the background workers; the page can rerun or be left while it does.
+    # Not retried: a second attempt would message every agent again.
+    try:
+        st.session_state.meeting_job_id = agent_jobs.submit("meeting", {
+            "supervisor_id": supervisor.id,
+            "agenda": agenda,
+            "rounds": int(rounds),
+            "deadline": float(deadline),
+        }, max_attempts=1)
     except Exception as e:
-        print(f"An error occurred: {str(e)}")
+        st.error(f"Error starting meeting: {str(e)}")
+
+
+@st.fragment(run_every=2)
+def show_meeting(job_id):
+    """Progress of the meeting job, then its stored transcript"""
+    job = agent_jobs.get_job_queue().get(job_id)
+    if job is None:
+        return
+    if job["status"] == FAILED:
+        st.error(f"Error running meeting: {job['error'].splitlines()[0]}")
+        return
+    if job["status"] != SUCCEEDED:
+        st.progress(job["progress"], text=job["message"] or "Meeting queued...")
+        return
+
+    meeting = job["result"]
+    for number, meeting_round in enumerate(meeting["rounds"], start=1):
+        replies = [AgentReply(**reply) for reply in meeting_round["replies"]]
+        supervisor_reply = AgentReply(**meeting_round["supervisor_reply"])
+        st.subheader(f"Round {number} ({meeting_round['elapsed']:.1f}s)")
+        st.caption(meeting_round["prompt"])
+        rows = [reply.as_row() for reply in replies]
+        rows.append(supervisor_reply.as_row())
+        st.dataframe(rows, use_container_width=True)
+        for reply in replies:
+            if reply.content:
+                with st.expander(reply.name):
+                    st.write(reply.content)
+        with st.chat_message("assistant"):
+            st.write(f"**{meeting['supervisor']}:** {supervisor_reply.content or supervisor_reply.error}")
+
+
+if st.session_state.get("meeting_job_id"):
+    show_meeting(st.session_state.meeting_job_id)
 
-if __name__ == "__main__":
-    pass
\ No newline at end of file
+render_debug_sidebar(rerun_id)
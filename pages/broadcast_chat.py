@@ -0,0 +1,96 @@
+import streamlit as st
+import dotenv
+from letta_clients import get_client
+from agent_registry import get_agent_registry
+from stream_pipeline import ASSISTANT, broadcast, merged_updates
+from instrumentation import begin_rerun, get_recorder, render_debug_sidebar
+
+# Load environment variables
+dotenv.load_dotenv()
+
+# Shared pooled Letta client
+client = get_client()
+registry = get_agent_registry(client)
+
+# Columns per row before the grid wraps
+COLUMNS_PER_ROW = 3
+
+st.set_page_config(layout="wide")
+st.title("Broadcast Chat")
+st.caption("Send one prompt to several agents and compare their replies side by side.")
+rerun_id = begin_rerun("broadcast_chat")
+
+try:
+    agents = registry.list_agents()
+except Exception as e:
+    st.error(f"Error: {str(e)}")
+    st.stop()
+if not agents:
+    st.info("No agents available")
+    st.stop()
+
+
+def agent_label(agent):
+    # The id suffix tells apart agents sharing a name and model
+    llm_config = agent.llm_config
+    if llm_config is None:
+        return f"{agent.name} ({agent.id[-8:]})"
+    return f"{agent.name} ({llm_config.model_endpoint_type}/{llm_config.model}, {agent.id[-8:]})"
+
+
+agents_by_id = {agent.id: agent for agent in sorted(agents, key=lambda agent: agent.name)}
+selected_ids = st.multiselect("Agents:", options=list(agents_by_id),
+                              format_func=lambda agent_id: agent_label(agents_by_id[agent_id]))
+selected = [agents_by_id[agent_id] for agent_id in selected_ids]
+
+if prompt := st.chat_input("Type a prompt to broadcast..."):
+    if not selected:
+        st.warning("Please select at least one agent")
+    else:
+        st.session_state.broadcast_prompt = prompt
+        with st.chat_message("user"):
+            st.write(prompt)
+
+        # One column per agent, wrapping into rows
+        panels = {}
+        for row_start in range(0, len(selected), COLUMNS_PER_ROW):
+            row = selected[row_start:row_start + COLUMNS_PER_ROW]
+            for agent, column in zip(row, st.columns(COLUMNS_PER_ROW)):
+                with column:
+                    st.subheader(agent.name)
+                    st.caption(agent_label(agent))
+                    panels[agent.id] = (st.empty(), st.empty())
+
+        pipelines = broadcast(client, [agent.id for agent in selected], prompt)
+        try:
+            for agent_id, update in merged_updates(pipelines):
+                text_placeholder, stats_placeholder = panels[agent_id]
+                pipeline = pipelines[agent_id]
+                if ASSISTANT in update.text:
+                    text_placeholder.write(pipeline.text[ASSISTANT])
+                if update.done:
+                    if pipeline.error:
+                        text_placeholder.error(f"Error getting response: {pipeline.error}")
+                    summary = pipeline.summary()
+                    stats_placeholder.caption(
+                        f"TTFT {summary['ttft_sec']}s · total {summary['latency_sec']}s · {summary['chars']} chars"
+                    )
+        finally:
+            # Also runs when Streamlit interrupts the script for a rerun
+            recorder = get_recorder()
+            for agent_id, pipeline in pipelines.items():
+                pipeline.cancel()
+                pipeline.record(recorder, agent_id)
+
+        names = {agent.id: agent_label(agent) for agent in selected}
+        st.session_state.broadcast_results = sorted(
+            ({"agent": names[agent_id], **pipeline.summary()} for agent_id, pipeline in pipelines.items()),
+            key=lambda row: (row["error"] is not None, row["ttft_sec"] is None, row["ttft_sec"] or 0),
+        )
+
+if st.session_state.get("broadcast_results"):
+    st.subheader("Comparison")
+    st.caption(f"Prompt: {st.session_state.broadcast_prompt}")
+    st.dataframe(st.session_state.broadcast_results, use_container_width=True)
+
+render_debug_sidebar(rerun_id)
@@ -1,21 +1,32 @@
 import streamlit as st
-from agents import list_agents
+from agent_service import list_agents
+from agent_registry import get_agent_registry
+from agent_search import agent_picker
 import dotenv
-from letta_client import CreateBlock, Letta, MessageCreate
+from letta_clients import get_client
+from chat_transcript import ChatTranscript, TokenCoalescer, stream_reply
+from message_cache import get_message_cache
+from instrumentation import begin_rerun, get_recorder, render_debug_sidebar
 
 # Load environment variables
 dotenv.load_dotenv()
 
 
-# Initialize Letta client
-client = Letta(base_url="http://localhost:8283")
+# Shared pooled Letta client
+client = get_client()
+registry = get_agent_registry(client)
+
+# Number of messages rendered at once; older ones load on demand
+CHAT_WINDOW = 30
 
 # Page configuration
 st.title("Chat with Agents")
+rerun_id = begin_rerun("chat_agents")
 
 # Initialize chat history in session state if not exists
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+if "transcript" not in st.session_state:
+    st.session_state.transcript = None
+    st.session_state.chat_window = CHAT_WINDOW
 
 # Initialize selected agent in session state if not exists
 if "selected_agent_id" not in st.session_state:
@@ -27,17 +38,28 @@ col1, gap, col2 = st.columns([3, 0.2, 7])
 # Left column - Agent selection
 with col1:
     st.header("Select Agent")
-    agents = list_agents()
+    try:
+        agents = list_agents()
+    except Exception as e:
+        st.error(f"Error: {str(e)}")
+        agents = []
     
     if agents:
-        agent_names = [agent.name for agent in agents]
-        selected_name = st.selectbox("Choose an agent:", options=agent_names)
-        selected_agent = next(agent for agent in agents if agent.name == selected_name)
-        
+        selected_agent = agent_picker(registry, "Find an agent:", key="chat_agent")
+    else:
+        selected_agent = None
+
+    if selected_agent:
         # Update selected agent ID if changed
         if st.session_state.selected_agent_id != selected_agent.id:
             st.session_state.selected_agent_id = selected_agent.id
-            st.session_state.messages = []  # Clear chat history when switching agents
+            # Fresh transcript per agent, seeded from the local cache plus one delta request
+            st.session_state.transcript = ChatTranscript(selected_agent.id, cache=get_message_cache())
+            st.session_state.chat_window = CHAT_WINDOW
+            try:
+                st.session_state.transcript.sync(client)
+            except Exception as e:
+                st.error(f"Error loading chat history: {str(e)}")
             
         # Display agent info
         st.subheader("Agent Info")
@@ -45,7 +67,7 @@ with col1:
         
         # Retrieve and display agent details
         try:
-            agent_config = client.agents.retrieve(selected_agent.id)
+            agent_config = registry.retrieve(selected_agent.id)
             if not agent_config.llm_config or not agent_config.llm_config.model:
                 st.error("Agent is not properly configured with an LLM backend")
                 
@@ -59,7 +81,8 @@ with col1:
         except Exception as e:
             st.error(f"Error fetching agent details: {str(e)}")
     else:
-        st.info("No agents available")
+        if not agents:
+            st.info("No agents available")
         st.stop()
 
 # Add empty gap column for spacing
@@ -72,9 +95,19 @@ with col2:
     
     # Create a container for messages with fixed height
     messages_container = st.container(height=600)
+    transcript = st.session_state.transcript
     with messages_container:
-        # Display chat messages
-        for message in st.session_state.messages:
+        # Only render the visible window of the conversation
+        if transcript.has_older or len(transcript) > st.session_state.chat_window:
+            if st.button("Load older messages"):
+                st.session_state.chat_window += CHAT_WINDOW
+                if st.session_state.chat_window > len(transcript):
+                    try:
+                        transcript.load_older(client)
+                    except Exception as e:
+                        st.error(f"Error loading older messages: {str(e)}")
+
+        for message in transcript.window(st.session_state.chat_window):
             with st.chat_message(message["role"]):
                 st.write(message["content"])
 
@@ -82,7 +115,7 @@ with col2:
 if prompt := st.chat_input("Type your message here..."):
     if st.session_state.selected_agent_id:
         # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        transcript.append("user", prompt)
         
         # Display user message
         with messages_container:
@@ -91,31 +124,33 @@ if prompt := st.chat_input("Type your message here..."):
 
         # Get agent response with streaming
         try:
-            stream = client.agents.messages.create_stream(
-                agent_id=st.session_state.selected_agent_id,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
             # Create assistant message
             with messages_container:
                 with st.chat_message("assistant"):
+                    # One expander, filled in place as reasoning and tool calls arrive
+                    with st.expander("Agent's thoughts"):
+                        reasoning_placeholder = st.empty()
+                        tools_placeholder = st.empty()
                     message_placeholder = st.empty()
-                    reasoning_placeholder = st.empty()
-                    final_content = ""
-                    
-                    for chunk in stream:
-                        if hasattr(chunk, 'message_type'):
-                            if chunk.message_type == "reasoning_message":
-                                with st.expander("Agent's thoughts"):
-                                    reasoning_placeholder.write(chunk.reasoning)
-                            elif chunk.message_type == "assistant_message":
-                                final_content += chunk.content
-                                message_placeholder.write(final_content)
+                    # Batch token writes instead of redrawing on every chunk
+                    coalescer = TokenCoalescer(message_placeholder)
+
+                    def show_tool_calls(tool_calls):
+                        tools_placeholder.markdown("\n".join(
+                            f"- `{call['name']}({call['arguments']})`" for call in tool_calls.values()))
+
+                    final_content = stream_reply(
+                        client, st.session_state.selected_agent_id, prompt, coalescer,
+                        on_reasoning=reasoning_placeholder.write, on_tool_call=show_tool_calls,
+                        recorder=get_recorder()
+                    )
             
             # Add final response to history
-            st.session_state.messages.append({"role": "assistant", "content": final_content})
+            transcript.append("assistant", final_content)
             
         except Exception as e:
             st.error(f"Error getting response from agent: {str(e)}")
     else:
         st.warning("Please select an agent first")
+
+render_debug_sidebar(rerun_id)
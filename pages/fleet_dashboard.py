@@ -0,0 +1,101 @@
+import os
+import time
+
+import streamlit as st
+import dotenv
+import agent_jobs
+from letta_clients import get_client, server_url
+from agent_registry import get_agent_registry
+from fleet_stats import NEARLY_FULL, get_fleet_frame
+from instrumentation import DEFAULT_TELEMETRY_DIR, begin_rerun, render_debug_sidebar
+from provider_health import get_provider_health, get_routing_policy
+
+# Load environment variables
+dotenv.load_dotenv()
+
+# Shared pooled Letta client
+client = get_client()
+registry = get_agent_registry(client)
+fleet = get_fleet_frame(server_url())
+
+st.set_page_config(layout="wide")
+st.title("Fleet Dashboard")
+rerun_id = begin_rerun("fleet_dashboard")
+
+if st.button("Refresh"):
+    registry.invalidate()
+
+start = time.perf_counter()
+# The listing already carries every agent's configs, blocks and tags, so no per-agent retrieves
+frame = fleet.sync(registry.list_agents(), registry.etag)
+if frame.empty:
+    st.info("No agents available")
+    st.stop()
+stats = fleet.aggregates()
+
+col_agents, col_providers, col_fill, col_orphans = st.columns(4)
+col_agents.metric("Agents", stats["agents"])
+col_providers.metric("Providers", stats["providers"])
+col_fill.metric("Median block fill", f"{stats['fill_ratio']['50%']:.0%}")
+col_orphans.metric("Missing supervisors", len(stats["orphaned"]))
+
+col_left, col_right = st.columns(2)
+with col_left:
+    st.subheader("Agents per provider and model")
+    st.dataframe(stats["by_model"], hide_index=True, use_container_width=True)
+    st.subheader("Temperature by provider")
+    st.dataframe(stats["temperature"], hide_index=True, use_container_width=True)
+with col_right:
+    st.subheader("Agents per level")
+    st.bar_chart(stats["by_level"])
+    st.subheader("Context windows")
+    st.bar_chart(stats["context_windows"])
+
+st.subheader("Memory")
+st.caption(f"Block fill is characters used over the block limit; agents listed have a block over {NEARLY_FULL:.0%}.")
+st.dataframe(stats["fill_ratio"].rename("fill ratio").to_frame().T, use_container_width=True)
+if not stats["nearly_full"].empty:
+    st.dataframe(stats["nearly_full"], hide_index=True, use_container_width=True)
+
+st.subheader("Missing supervisors")
+st.caption("Supervisor names that no agent carries; expected only at the top of the org chart.")
+st.dataframe(stats["orphaned"], hide_index=True, use_container_width=True)
+
+st.caption(f"Computed in {(time.perf_counter() - start) * 1000:.0f} ms "
+           f"({fleet.flattened} agent rows built since start)")
+
+st.subheader("Provider health")
+health = get_provider_health()
+measured = [stats.as_row() for stats in health.all_stats() if stats.samples]
+if measured:
+    st.caption(f"Message calls of the last {health.window:.0f} s, from every page and job in this process.")
+    st.dataframe(measured, hide_index=True, use_container_width=True)
+else:
+    st.caption("No message calls measured yet; chat with some agents first.")
+
+# Agents routed per level to the fastest healthy model their context windows allow
+for level, route in get_routing_policy().plan(frame.to_dict("records")).items():
+    if route.best is None:
+        continue
+    label = f"{route.best.provider}/{route.best.model}"
+    st.write(f"Level {level}: fastest healthy model is **{label}** (p50 {route.best.p50:.2f} s)")
+    if route.moves:
+        st.dataframe([
+            {"agent": move.name, "from": f"{move.from_provider}/{move.from_model}", "reason": move.reason}
+            for move in route.moves
+        ], hide_index=True, use_container_width=True)
+        if st.button(f"Reassign {len(route.moves)} level {level} agents to {label}", key=f"reassign_{level}"):
+            job_id = agent_jobs.submit("reassign_agents", {
+                "label": label,
+                "moves": [[move.agent_id, move.to_provider, move.to_model] for move in route.moves],
+            }, max_attempts=1)
+            agent_jobs.track(job_id)
+
+if st.button("Export latency trace"):
+    path = os.path.join(os.getenv("LETTA_TELEMETRY_DIR", DEFAULT_TELEMETRY_DIR), "latency_trace.jsonl")
+    st.success(f"Wrote {health.export_trace(path)} samples to {path}; replay with "
+               f"`python provider_health.py simulate {path}`")
+
+agent_jobs.render_job_panel()
+
+render_debug_sidebar(rerun_id)
@@ -0,0 +1,302 @@
+import argparse
+import io
+import json
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import psycopg2
+from psycopg2 import sql
+
+from agent_config import EMBEDDING_PROVIDERS
+from check_extensions import get_connection, load_db_config
+from embedding_cache import EmbeddingCache, embedder_for_config
+
+# pgvector cannot build HNSW or IVFFlat indexes on wider vector columns
+MAX_INDEX_DIM = 2000
+
+OPCLASSES = {
+    "cosine": ("vector_cosine_ops", "<=>"),
+    "l2": ("vector_l2_ops", "<->"),
+    "ip": ("vector_ip_ops", "<#>"),
+}
+
+
+def find_vector_columns(conn) -> List[Dict]:
+    """Vector columns in user schemas with their declared dimension and existing ANN indexes."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT n.nspname, c.relname, a.attname, a.atttypmod,
+                   COALESCE((
+                       SELECT json_agg(json_build_object('name', i.indexname, 'definition', i.indexdef))
+                       FROM pg_indexes i
+                       WHERE i.schemaname = n.nspname AND i.tablename = c.relname
+                         AND i.indexdef ILIKE '%' || quote_ident(a.attname) || '%'
+                         AND (i.indexdef ILIKE '%using hnsw%' OR i.indexdef ILIKE '%using ivfflat%')
+                   ), '[]'::json)
+            FROM pg_attribute a
+            JOIN pg_class c ON c.oid = a.attrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            JOIN pg_type t ON t.oid = a.atttypid
+            WHERE t.typname = 'vector' AND c.relkind = 'r' AND a.attnum > 0 AND NOT a.attisdropped
+              AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+            ORDER BY 1, 2, 3;
+        """)
+        return [
+            {"schema": schema, "table": table, "column": column,
+             "dim": typmod if typmod > 0 else None, "indexes": indexes}
+            for schema, table, column, typmod, indexes in cur.fetchall()
+        ]
+
+
+def index_name(table: str, column: str, method: str, m: int = 16, ef_construction: int = 64,
+               lists: int = 100) -> str:
+    """Index name encoding its build parameters, so retuning creates a new index."""
+    suffix = f"hnsw_m{m}_ef{ef_construction}" if method == "hnsw" else f"ivfflat_l{lists}"
+    return f"{table}_{column}_{suffix}"[:63]
+
+
+def index_statement(schema: str, table: str, column: str, method: str, metric: str = "cosine",
+                    m: int = 16, ef_construction: int = 64, lists: int = 100, concurrently: bool = True,
+                    name: Optional[str] = None):
+    """CREATE INDEX statement for one column and parameter set."""
+    opclass, _ = OPCLASSES[metric]
+    if method == "hnsw":
+        params = sql.SQL("m = {}, ef_construction = {}").format(sql.Literal(m), sql.Literal(ef_construction))
+    elif method == "ivfflat":
+        params = sql.SQL("lists = {}").format(sql.Literal(lists))
+    else:
+        raise ValueError(f"Unknown index method: {method}")
+    return sql.SQL("CREATE INDEX {concurrently} IF NOT EXISTS {name} ON {table} USING {method} ({column} {opclass}) "
+                   "WITH ({params})").format(
+        concurrently=sql.SQL("CONCURRENTLY" if concurrently else ""),
+        name=sql.Identifier(name or index_name(table, column, method, m, ef_construction, lists)),
+        table=sql.Identifier(schema, table),
+        method=sql.SQL(method),
+        column=sql.Identifier(column),
+        opclass=sql.SQL(opclass),
+        params=params,
+    )
+
+
+def provision_indexes(conn, method: str, metric: str, m: int, ef_construction: int, lists: int,
+                      dims: Optional[List[int]] = None, dry_run: bool = False,
+                      replace: bool = False) -> List[Dict]:
+    """Create one ANN index per vector column; with replace, drop its older ANN indexes afterwards."""
+    results = []
+    conn.autocommit = True  # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    for col in find_vector_columns(conn):
+        entry = {**col, "action": None}
+        if dims and col["dim"] not in dims:
+            entry["action"] = "skipped: dimension not requested"
+        elif col["dim"] is None or col["dim"] > MAX_INDEX_DIM:
+            entry["action"] = f"skipped: dimension {col['dim']} cannot be indexed (max {MAX_INDEX_DIM})"
+        else:
+            statement = index_statement(col["schema"], col["table"], col["column"], method, metric,
+                                        m, ef_construction, lists)
+            entry["statement"] = statement.as_string(conn)
+            if dry_run:
+                entry["action"] = "planned"
+            else:
+                start = time.perf_counter()
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(statement)
+                    entry["action"] = "created"
+                    entry["build_sec"] = round(time.perf_counter() - start, 3)
+                    if replace:
+                        new_name = index_name(col["table"], col["column"], method, m, ef_construction, lists)
+                        entry["dropped"] = []
+                        for index in col["indexes"]:
+                            if index["name"] != new_name:
+                                with conn.cursor() as cur:
+                                    cur.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(
+                                        sql.Identifier(col["schema"], index["name"])))
+                                entry["dropped"].append(index["name"])
+                except psycopg2.Error as e:
+                    entry["action"] = f"failed: {e}"
+        results.append(entry)
+    return results
+
+
+def _vector_literal(vector) -> str:
+    return "[" + ",".join(f"{x:.6f}" for x in vector) + "]"
+
+
+def _normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def embed_corpus(path: str, embedding: str, rows: int, queries: int, offline: bool = False,
+                 cache: Optional[EmbeddingCache] = None):
+    """Embed the lines of a text file as (data, probes), holding out the last queries lines as probes.
+
+    Vectors go through the embedding cache, so rerunning the benchmark with other
+    index parameters embeds nothing twice.
+    """
+    with open(path) as f:
+        texts = [line.strip() for line in f if line.strip()]
+    if len(texts) <= queries:
+        raise ValueError(f"{path} needs more than {queries} non-empty lines")
+    provider = EMBEDDING_PROVIDERS[embedding]
+    embedder = embedder_for_config({
+        "embedding_model": provider["model"],
+        "embedding_endpoint_type": provider["endpoint_type"],
+        "embedding_endpoint": provider["endpoint"],
+        "embedding_dim": provider["dim"],
+    }, cache=cache, offline=offline)
+    data = _normalize(embedder.embed(texts[:-queries][:rows]))
+    probes = _normalize(embedder.embed(texts[-queries:]))
+    return data, probes, embedder.cache.stats()
+
+
+def benchmark_dimension(conn, dim: int, rows: int, queries: int, k: int, method: str, metric: str,
+                        param_grid: List[Dict], seed: int = 0, vectors=None) -> Dict:
+    """Build indexes on synthetic or given (data, probes) vectors and measure recall@k, latency and build time."""
+    if vectors is None:
+        rng = np.random.default_rng(seed)
+        data = _normalize(rng.standard_normal((rows, dim)).astype(np.float32))
+        probes = _normalize(rng.standard_normal((queries, dim)).astype(np.float32))
+    else:
+        data, probes = vectors
+        rows, queries = len(data), len(probes)
+
+    # Exact neighbours computed locally as ground truth; on unit vectors
+    # cosine, l2 and inner product all rank by the dot product
+    truth = np.argsort(-(probes @ data.T), axis=1)[:, :k]
+
+    table = f"pgvector_bench_{dim}"
+    conn.autocommit = True
+    _, operator = OPCLASSES[metric]
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(table)))
+        cur.execute(sql.SQL("CREATE TABLE {} (id integer PRIMARY KEY, embedding vector({}))").format(
+            sql.Identifier(table), sql.Literal(dim)))
+        buffer = io.StringIO("".join(f"{i}\t{_vector_literal(v)}\n" for i, v in enumerate(data)))
+        cur.copy_expert(sql.SQL("COPY {} (id, embedding) FROM STDIN").format(sql.Identifier(table)), buffer)
+        cur.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(table)))
+
+    query = sql.SQL("SELECT id FROM {} ORDER BY embedding {} %s::vector LIMIT %s").format(
+        sql.Identifier(table), sql.SQL(operator))
+    literals = [_vector_literal(p) for p in probes]
+
+    results = []
+    try:
+        for params in param_grid:
+            build = params["build"]
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("DROP INDEX IF EXISTS {}").format(sql.Identifier(f"{table}_ann")))
+                start = time.perf_counter()
+                cur.execute(index_statement("public", table, "embedding", method, metric,
+                                            concurrently=False, name=f"{table}_ann", **build))
+                build_sec = time.perf_counter() - start
+
+            for search in params["search"]:
+                with conn.cursor() as cur:
+                    if method == "hnsw":
+                        cur.execute("SET hnsw.ef_search = %s", (search,))
+                    else:
+                        cur.execute("SET ivfflat.probes = %s", (search,))
+                    latencies, hits = [], 0
+                    for n, literal in enumerate(literals):
+                        start = time.perf_counter()
+                        cur.execute(query, (literal, k))
+                        found = [row[0] for row in cur.fetchall()]
+                        latencies.append(time.perf_counter() - start)
+                        hits += len(set(found) & set(truth[n].tolist()))
+                latencies.sort()
+                results.append({
+                    **build,
+                    "search": search,
+                    "build_sec": round(build_sec, 3),
+                    f"recall@{k}": round(hits / (queries * k), 4),
+                    "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+                    "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+                })
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(table)))
+    return {"dim": dim, "rows": rows, "queries": queries, "k": k, "method": method, "metric": metric,
+            "results": results}
+
+
+def build_param_grid(args) -> List[Dict]:
+    if args.method == "hnsw":
+        return [{"build": {"m": m, "ef_construction": ef}, "search": args.ef_search}
+                for m in args.m for ef in args.ef_construction]
+    return [{"build": {"lists": lists}, "search": args.probes} for lists in args.lists]
+
+
+def main():
+    default_dims = sorted({provider["dim"] for provider in EMBEDDING_PROVIDERS.values()})
+    parser = argparse.ArgumentParser(description="Provision and benchmark pgvector indexes for archival memory")
+    parser.add_argument("command", choices=["inspect", "provision", "benchmark"])
+    parser.add_argument("--method", choices=["hnsw", "ivfflat"], default="hnsw")
+    parser.add_argument("--metric", choices=sorted(OPCLASSES), default="cosine")
+    parser.add_argument("--dim", type=int, action="append", help=f"Dimensions to handle (default {default_dims})")
+    parser.add_argument("--m", type=int, nargs="+", default=[16])
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[40, 100])
+    parser.add_argument("--lists", type=int, nargs="+", default=[100])
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--rows", type=int, default=10000, help="Synthetic vectors per benchmark")
+    parser.add_argument("--corpus", help="Benchmark on embeddings of this file's lines instead of synthetic vectors")
+    parser.add_argument("--embedding", choices=sorted(EMBEDDING_PROVIDERS), default="openai",
+                        help="Embedding model for --corpus")
+    parser.add_argument("--offline", action="store_true",
+                        help="Embed --corpus with deterministic stub vectors instead of calling the provider")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--replace", action="store_true", help="Drop older ANN indexes after building the new one")
+    parser.add_argument("--report", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    conn = get_connection(load_db_config())
+    try:
+        if args.command == "inspect":
+            output = find_vector_columns(conn)
+            for col in output:
+                names = ", ".join(index["name"] for index in col["indexes"]) or "no ANN index"
+                print(f"- {col['schema']}.{col['table']}.{col['column']} vector({col['dim']}): {names}")
+        elif args.command == "provision":
+            if len(args.m) > 1 or len(args.ef_construction) > 1 or len(args.lists) > 1:
+                print("Error: provision takes a single parameter set")
+                sys.exit(1)
+            output = provision_indexes(conn, args.method, args.metric, args.m[0], args.ef_construction[0],
+                                       args.lists[0], dims=args.dim, dry_run=args.dry_run, replace=args.replace)
+            for entry in output:
+                print(f"- {entry['schema']}.{entry['table']}.{entry['column']}: {entry['action']}")
+        elif args.corpus:
+            data, probes, cache_stats = embed_corpus(args.corpus, args.embedding, args.rows, args.queries,
+                                                     offline=args.offline)
+            print(f"Embedded {args.corpus} with {args.embedding}: {cache_stats['hits']} cached, "
+                  f"{cache_stats['misses']} computed")
+            dim = data.shape[1]
+            print(f"\nBenchmarking {args.method} on {len(data)} x {dim}-dim embeddings...")
+            report = benchmark_dimension(conn, dim, args.rows, args.queries, args.k, args.method,
+                                         args.metric, build_param_grid(args), vectors=(data, probes))
+            for row in report["results"]:
+                print("  " + ", ".join(f"{key}={value}" for key, value in row.items()))
+            output = [{**report, "corpus": args.corpus, "embedding_cache": cache_stats}]
+        else:
+            output = []
+            for dim in args.dim or default_dims:
+                print(f"\nBenchmarking {args.method} on {args.rows} x {dim}-dim vectors...")
+                report = benchmark_dimension(conn, dim, args.rows, args.queries, args.k, args.method,
+                                             args.metric, build_param_grid(args))
+                for row in report["results"]:
+                    print("  " + ", ".join(f"{key}={value}" for key, value in row.items()))
+                output.append(report)
+    finally:
+        conn.close()
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"\nReport written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
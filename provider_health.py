@@ -0,0 +1,342 @@
+"""Provider health from our own message calls, and routing agents away from slow or failing models.
+
+    python provider_health.py simulate telemetry/latency_trace.jsonl --interval 30
+
+replays a recorded latency trace through the routing policy offline and
+compares it with staying on one model.
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import streamlit as st
+
+from agent_config import MODEL_CONTEXT_LIMITS, MODEL_OPTIONS, PROVIDERS
+
+HEALTHY, DOWN, UNKNOWN = "healthy", "down", "unknown"
+
+# Calls whose latency is the provider generating a reply
+MESSAGE_ENDPOINTS = ("/v1/agents/{agent_id}/messages", "/v1/agents/{agent_id}/messages/stream")
+
+
+@dataclass
+class ProviderStats:
+    provider: str
+    model: str
+    samples: int = 0
+    errors: int = 0
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+    status: str = UNKNOWN
+
+    @property
+    def error_rate(self):
+        return self.errors / self.samples if self.samples else 0.0
+
+    def as_row(self):
+        return {"provider": self.provider, "model": self.model, "status": self.status, "calls": self.samples,
+                "error rate": round(self.error_rate, 3),
+                "p50 s": round(self.p50, 3) if self.p50 is not None else None,
+                "p95 s": round(self.p95, 3) if self.p95 is not None else None}
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class ProviderHealth:
+    """Rolling latency and error rate per (provider, model) over the last window seconds"""
+
+    def __init__(self, window=300.0, max_samples=500, min_samples=3, max_error_rate=0.3, clock=time.time):
+        self.window = window
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=max_samples))
+
+    def record(self, provider, model, latency, ok=True, at=None):
+        with self._lock:
+            self._samples[(provider, model)].append((self.clock() if at is None else at, latency, ok))
+
+    def observe(self, record, resolve_agent):
+        """Recorder listener: a message call's latency counts for the model of the agent it went to"""
+        if record.replayed or record.method != "POST" or record.endpoint not in MESSAGE_ENDPOINTS:
+            return
+        # Client errors say nothing about the provider; 429 and 5xx (599: no response) do
+        if 400 <= record.status < 500 and record.status != 429:
+            return
+        agent = resolve_agent(record.agent_id) if record.agent_id else None
+        llm_config = getattr(agent, "llm_config", None)
+        if llm_config is None:
+            return
+        self.record(llm_config.model_endpoint_type, llm_config.model, record.duration, ok=record.status < 400,
+                    at=record.start + record.duration)
+
+    def attach(self, recorder, resolve_agent):
+        """Feed this tracker from every call the recorder logs"""
+        listener = getattr(self, "_listener", None)
+        if listener is None:
+            self._listener = listener = lambda record: self.observe(record, resolve_agent)
+        recorder.add_listener(listener)
+        return self
+
+    def stats(self, provider, model) -> ProviderStats:
+        cutoff = self.clock() - self.window
+        with self._lock:
+            samples = [sample for sample in self._samples.get((provider, model), ()) if sample[0] >= cutoff]
+        stats = ProviderStats(provider, model, samples=len(samples), errors=sum(not ok for _, _, ok in samples))
+        latencies = sorted(latency for _, latency, ok in samples if ok)
+        if latencies:
+            stats.p50 = _percentile(latencies, 0.5)
+            stats.p95 = _percentile(latencies, 0.95)
+        if stats.samples < self.min_samples:
+            stats.status = UNKNOWN
+        elif stats.error_rate >= self.max_error_rate or not latencies:
+            stats.status = DOWN
+        else:
+            stats.status = HEALTHY
+        return stats
+
+    def all_stats(self) -> List[ProviderStats]:
+        """Stats for every registered model, measured or not"""
+        return [self.stats(provider, model) for provider in PROVIDERS for model in MODEL_OPTIONS[provider]]
+
+    def trace(self) -> List[Dict]:
+        """Every sample still held, oldest first, in the format simulate() replays"""
+        with self._lock:
+            rows = [{"at": at, "provider": provider, "model": model, "latency": latency, "ok": ok}
+                    for (provider, model), samples in self._samples.items() for at, latency, ok in samples]
+        return sorted(rows, key=lambda row: row["at"])
+
+    def export_trace(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        rows = self.trace()
+        with open(path, "w") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+        return len(rows)
+
+
+@dataclass
+class Reassignment:
+    agent_id: str
+    name: str
+    level: int
+    from_provider: str
+    from_model: str
+    to_provider: str
+    to_model: str
+    reason: str
+
+
+@dataclass
+class LevelRoute:
+    """Fastest healthy model for one level, and the agents that should move to it"""
+    level: int
+    best: Optional[ProviderStats]
+    min_context: Optional[int]
+    moves: List[Reassignment] = field(default_factory=list)
+
+
+class RoutingPolicy:
+    """Ranks registered models by health, then median latency
+
+    An agent is moved when its model is down, or healthy but slower than the
+    best candidate by more than min_speedup; a model without enough samples is
+    never moved away from on suspicion alone.
+    """
+
+    def __init__(self, health: ProviderHealth, min_speedup=1.5):
+        self.health = health
+        self.min_speedup = min_speedup
+
+    def candidates(self, min_context=None) -> List[Tuple[str, str]]:
+        """Registered models whose context limit holds min_context tokens"""
+        return [(provider, model) for provider in PROVIDERS for model in MODEL_OPTIONS[provider]
+                if min_context is None or MODEL_CONTEXT_LIMITS[(provider, model)] >= min_context]
+
+    def rank(self, min_context=None) -> List[ProviderStats]:
+        order = {HEALTHY: 0, UNKNOWN: 1, DOWN: 2}
+        stats = [self.health.stats(provider, model) for provider, model in self.candidates(min_context)]
+        return sorted(stats, key=lambda s: (order[s.status], s.p50 if s.p50 is not None else float("inf")))
+
+    def best(self, min_context=None) -> Optional[ProviderStats]:
+        """Fastest healthy candidate, or None while nothing has been measured"""
+        ranked = self.rank(min_context)
+        return ranked[0] if ranked and ranked[0].status == HEALTHY else None
+
+    def move_reason(self, current: ProviderStats, best: Optional[ProviderStats]) -> Optional[str]:
+        if best is None or (current.provider, current.model) == (best.provider, best.model):
+            return None
+        if current.status == DOWN:
+            return f"{current.provider}/{current.model} is failing ({current.error_rate:.0%} errors)"
+        if current.status == HEALTHY and current.p50 > best.p50 * self.min_speedup:
+            return f"{current.provider}/{current.model} is {current.p50 / best.p50:.1f}x slower"
+        return None
+
+    def route(self, provider, model, context_window=None) -> Tuple[str, str, Optional[str]]:
+        """Provider and model a new agent should use, and why it differs from the requested one"""
+        best = self.best(context_window)
+        reason = self.move_reason(self.health.stats(provider, model), best)
+        return (best.provider, best.model, reason) if reason else (provider, model, None)
+
+    def plan(self, agents: Iterable[Dict]) -> Dict[int, LevelRoute]:
+        """Per level, the best model and the moves for agents given as dicts with id, name,
+        level, provider, model and context_window (e.g. fleet_stats rows)"""
+        by_level = defaultdict(list)
+        for agent in agents:
+            by_level[agent["level"]].append(agent)
+        routes = {}
+        for level, level_agents in sorted(by_level.items()):
+            # Moving must not shrink any agent's window
+            windows = [agent["context_window"] for agent in level_agents if agent.get("context_window")]
+            min_context = int(max(windows)) if windows else None
+            route = routes[level] = LevelRoute(level, self.best(min_context), min_context)
+            current = {}
+            for agent in level_agents:
+                key = (agent["provider"], agent["model"])
+                if key not in current:
+                    current[key] = self.health.stats(*key)
+                reason = self.move_reason(current[key], route.best)
+                if reason:
+                    route.moves.append(Reassignment(agent["id"], agent["name"], level, *key,
+                                                    route.best.provider, route.best.model, reason))
+        return routes
+
+
+def auto_failover_enabled():
+    return os.getenv("LETTA_AUTO_FAILOVER", "").lower() in ("1", "true", "yes")
+
+
+@st.cache_resource
+def get_provider_health():
+    """Process-wide tracker fed by the shared call recorder"""
+    return ProviderHealth(window=float(os.getenv("LETTA_HEALTH_WINDOW", "300")))
+
+
+def get_routing_policy():
+    return RoutingPolicy(get_provider_health())
+
+
+def route_new_agent(provider, model, context_window) -> Tuple[str, str, Optional[str]]:
+    """The requested provider and model, or a healthy replacement when LETTA_AUTO_FAILOVER is on"""
+    if not auto_failover_enabled():
+        return provider, model, None
+    return get_routing_policy().route(provider, model, context_window)
+
+
+@dataclass
+class SimulationReport:
+    decisions: List[Dict] = field(default_factory=list)
+    routed_calls: int = 0
+    routed_errors: int = 0
+    routed_latency: List[float] = field(default_factory=list)
+    baseline: Optional[Tuple[str, str]] = None
+    baseline_calls: int = 0
+    baseline_errors: int = 0
+    baseline_latency: List[float] = field(default_factory=list)
+
+    def summary(self) -> Dict:
+        def side(calls, errors, latencies):
+            return {"calls": calls, "error_rate": round(errors / calls, 4) if calls else None,
+                    "mean_latency_s": round(statistics.fmean(latencies), 4) if latencies else None}
+
+        return {
+            "decisions": len(self.decisions),
+            "switches": sum(1 for decision in self.decisions if decision["reason"]),
+            "routed": side(self.routed_calls, self.routed_errors, self.routed_latency),
+            "baseline": {"model": "/".join(self.baseline) if self.baseline else None,
+                         **side(self.baseline_calls, self.baseline_errors, self.baseline_latency)},
+        }
+
+
+def load_trace(path) -> List[Dict]:
+    with open(path) as f:
+        return sorted((json.loads(line) for line in f if line.strip()), key=lambda row: row["at"])
+
+
+def simulate(trace: List[Dict], interval=30.0, min_context=None, baseline=None, min_speedup=1.5,
+             **health_options) -> SimulationReport:
+    """Replay a latency trace through the routing policy on a simulated clock
+
+    Every interval seconds of trace time the policy picks a model from what it
+    has seen so far; until the next decision the routed side is charged the
+    calls that model actually had in the trace, and the baseline side those of
+    one fixed model (by default the busiest in the trace).
+    """
+    report = SimulationReport()
+    if not trace:
+        return report
+    now = [trace[0]["at"]]
+    health = ProviderHealth(clock=lambda: now[0], **health_options)
+    policy = RoutingPolicy(health, min_speedup=min_speedup)
+    if baseline is None:
+        counts = defaultdict(int)
+        for row in trace:
+            counts[(row["provider"], row["model"])] += 1
+        baseline = max(counts, key=counts.get)
+    report.baseline = tuple(baseline)
+    routed = report.baseline
+    next_decision = now[0] + interval
+
+    for row in trace:
+        while row["at"] >= next_decision:
+            now[0] = next_decision
+            provider, model, reason = policy.route(*routed, context_window=min_context)
+            routed = (provider, model)
+            report.decisions.append({"at": next_decision, "provider": provider, "model": model, "reason": reason})
+            next_decision += interval
+        now[0] = row["at"]
+        health.record(row["provider"], row["model"], row["latency"], ok=row["ok"], at=row["at"])
+        key = (row["provider"], row["model"])
+        if key == routed:
+            report.routed_calls += 1
+            report.routed_errors += not row["ok"]
+            if row["ok"]:
+                report.routed_latency.append(row["latency"])
+        if key == report.baseline:
+            report.baseline_calls += 1
+            report.baseline_errors += not row["ok"]
+            if row["ok"]:
+                report.baseline_latency.append(row["latency"])
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded latency trace through the routing policy")
+    parser.add_argument("command", choices=["simulate"])
+    parser.add_argument("trace", help="JSON lines of at, provider, model, latency, ok (Export latency trace)")
+    parser.add_argument("--interval", type=float, default=30.0, help="Seconds of trace time between decisions")
+    parser.add_argument("--min-context", type=int, help="Only route to models with at least this context limit")
+    parser.add_argument("--baseline", metavar="PROVIDER/MODEL", help="Fixed model to compare against")
+    parser.add_argument("--min-speedup", type=float, default=1.5)
+    parser.add_argument("--window", type=float, default=300.0, help="Health window in seconds")
+    parser.add_argument("--report", help="Write the JSON summary and decisions to this file")
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace)
+    baseline = tuple(args.baseline.split("/", 1)) if args.baseline else None
+    report = simulate(trace, interval=args.interval, min_context=args.min_context, baseline=baseline,
+                      min_speedup=args.min_speedup, window=args.window)
+    for decision in report.decisions:
+        if decision["reason"]:
+            print(f"- t+{decision['at'] - trace[0]['at']:.0f}s: {decision['provider']}/{decision['model']} "
+                  f"({decision['reason']})")
+    summary = report.summary()
+    print(f"\n{summary['decisions']} decisions, {summary['switches']} switches")
+    print(f"Routed:   {summary['routed']}")
+    print(f"Baseline: {summary['baseline']}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({**summary, "decisions": report.decisions}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
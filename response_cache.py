@@ -0,0 +1,494 @@
+"""Record/replay cache for agent replies, for test and evaluation runs.
+
+Set LETTA_RESPONSE_CACHE=replay to answer messages.create and create_stream
+from disk when the same prompt was sent before to an agent with the same
+configuration, falling through to the server (and recording) on a miss;
+record always asks the server and overwrites. Replayed streams arrive
+instantly, or with their recorded chunk timing when
+LETTA_RESPONSE_CACHE_TIMING=original.
+
+Keys do not use agent ids, so a freshly created test agent hits the entries
+recorded for its predecessor: the first message to an agent is keyed by a
+fingerprint of its configuration, and every later call folds into that, so
+turn N of a conversation only replays after the same N-1 turns.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import httpx
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "letta-agents", "responses.sqlite")
+
+OFF, RECORD, REPLAY = "off", "record", "replay"
+MODES = (OFF, RECORD, REPLAY)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    content_type TEXT,
+    content_encoding TEXT,
+    chunks TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_by_age ON responses (last_used);
+"""
+
+# Columns added after the first release, for cache files created before them
+MIGRATIONS = {"content_encoding": "ALTER TABLE responses ADD COLUMN content_encoding TEXT"}
+
+AGENTS_PATH = re.compile(r"^/v1/agents/?$")
+AGENT_PATH = re.compile(r"^/v1/agents/(agent-[0-9a-fA-F-]+)(/.*)?$")
+MESSAGE_SUFFIXES = ("/messages", "/messages/stream")
+
+# Configuration that shapes a reply; ids, names and timestamps do not
+FINGERPRINT_FIELDS = ("system", "agent_type", "llm_config", "embedding_config", "tool_rules")
+
+
+def _digest(*parts):
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _canonical_body(content):
+    if not content:
+        return ""
+    try:
+        return json.dumps(json.loads(content), sort_keys=True)
+    except ValueError:
+        return content.decode("utf-8", "replace")
+
+
+def agent_fingerprint(agent):
+    """Digest of an AgentState JSON dict over the fields that affect its replies"""
+    config = {name: agent.get(name) for name in FINGERPRINT_FIELDS}
+    config["blocks"] = sorted((block["label"], block["value"]) for block in agent.get("memory", {}).get("blocks", []))
+    config["tools"] = sorted(tool["name"] for tool in agent.get("tools") or [])
+    config["tags"] = sorted(agent.get("tags") or [])
+    return _digest("agent", json.dumps(config, sort_keys=True, default=str))
+
+
+class ResponseCache:
+    """Recorded responses in SQLite, evicted least recently used past max_bytes"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=256 * 1024 * 1024):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        with self._lock, self._conn:
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in existing:
+                    self._conn.execute(statement)
+
+    def get(self, key):
+        """(status, content_type, content_encoding, [(offset, bytes), ...]) or None
+
+        Chunks are the body as sent on the wire, still in content_encoding.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, content_type, content_encoding, chunks FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._conn:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        status, content_type, content_encoding, chunks = row
+        return status, content_type, content_encoding, [
+            (offset, base64.b64decode(data)) for offset, data in json.loads(chunks)
+        ]
+
+    def put(self, key, status, content_type, chunks, content_encoding=None):
+        """Store a response as (seconds since the request, raw bytes) chunks"""
+        encoded = json.dumps([(round(offset, 4), base64.b64encode(data).decode()) for offset, data in chunks])
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, status, content_type, content_encoding, chunks, size, "
+                "created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, status, content_type, content_encoding, encoded, len(encoded), now, now),
+            )
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            while total > self.max_bytes:
+                victim = self._conn.execute(
+                    "SELECT key, size FROM responses WHERE key != ? ORDER BY last_used LIMIT 1", (key,)
+                ).fetchone()
+                if victim is None:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (victim[0],))
+                self.evictions += 1
+                total -= victim[1]
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+            self.hits = self.misses = self.evictions = 0
+
+
+class _Conversations:
+    """Per-agent chain of keys: the agent's fingerprint, then every call sent to it"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chains = {}
+
+    def get(self, agent_id):
+        with self._lock:
+            return self._chains.get(agent_id)
+
+    def set(self, agent_id, chain):
+        with self._lock:
+            self._chains[agent_id] = chain
+
+    def advance(self, agent_id, *parts):
+        """Fold a call into the agent's chain if its conversation has started"""
+        with self._lock:
+            if agent_id in self._chains:
+                self._chains[agent_id] = _digest(self._chains[agent_id], *parts)
+
+    def forget(self, agent_id):
+        with self._lock:
+            self._chains.pop(agent_id, None)
+
+
+def _classify(request):
+    """("create", None), or ("message" | "delete" | "agent", agent_id), or (None, None) for calls left alone"""
+    path = request.url.path
+    if request.method == "POST" and AGENTS_PATH.match(path):
+        return "create", None
+    match = AGENT_PATH.match(path)
+    if match is None:
+        return None, None
+    agent_id, rest = match.group(1), match.group(2) or ""
+    if request.method == "POST" and rest in MESSAGE_SUFFIXES:
+        return "message", agent_id
+    if request.method == "DELETE" and not rest:
+        return "delete", agent_id
+    return ("agent", agent_id) if request.method != "GET" else (None, None)
+
+
+def _retrieve_request(request, agent_id):
+    """GET of the agent itself, with the auth headers of the message call"""
+    headers = [(name, value) for name, value in request.headers.raw
+               if name.lower() not in (b"content-length", b"content-type")]
+    return httpx.Request("GET", request.url.copy_with(path=f"/v1/agents/{agent_id}", query=None), headers=headers)
+
+
+def _replayed(status, content_type, content_encoding, stream):
+    # The chunks are the recorded wire bytes, so they carry the recorded encoding
+    headers = {"content-type": content_type} if content_type else {}
+    if content_encoding:
+        headers["content-encoding"] = content_encoding
+    return httpx.Response(status, headers=headers, stream=stream, extensions={"letta_replayed": True})
+
+
+def _rewrapped(response, raw):
+    """A response over raw (still encoded) body bytes, keeping the server's headers valid for them"""
+    return httpx.Response(response.status_code, headers=response.headers, stream=httpx.ByteStream(raw),
+                          extensions=response.extensions)
+
+
+def _decoded(response, raw):
+    """The body of raw wire bytes, decoded per the response's content-encoding"""
+    return httpx.Response(response.status_code, headers=response.headers, content=raw).content
+
+
+class _ReplayStream(httpx.SyncByteStream):
+    def __init__(self, chunks, speed):
+        self._chunks = chunks
+        self._speed = speed
+
+    def __iter__(self):
+        start = time.monotonic()
+        for offset, data in self._chunks:
+            if self._speed:
+                delay = offset / self._speed - (time.monotonic() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            yield data
+
+
+class _AsyncReplayStream(httpx.AsyncByteStream):
+    def __init__(self, chunks, speed):
+        self._chunks = chunks
+        self._speed = speed
+
+    async def __aiter__(self):
+        start = time.monotonic()
+        for offset, data in self._chunks:
+            if self._speed:
+                delay = offset / self._speed - (time.monotonic() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield data
+
+
+class _RecordingStream(httpx.SyncByteStream):
+    """Passes the server's chunks through and stores them once the body is complete"""
+
+    def __init__(self, stream, start, on_complete):
+        self._stream = stream
+        self._start = start
+        self._on_complete = on_complete
+        self._chunks = []
+        self._complete = False
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._chunks.append((time.monotonic() - self._start, chunk))
+            yield chunk
+        self._complete = True
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            # A reply abandoned halfway is not worth replaying
+            if self._complete:
+                self._on_complete(self._chunks)
+
+
+class _AsyncRecordingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, start, on_complete):
+        self._stream = stream
+        self._start = start
+        self._on_complete = on_complete
+        self._chunks = []
+        self._complete = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._chunks.append((time.monotonic() - self._start, chunk))
+            yield chunk
+        self._complete = True
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._complete:
+                self._on_complete(self._chunks)
+
+
+class _ReplayPolicy:
+    """Keying and bookkeeping shared by the sync and async transports"""
+
+    def __init__(self, cache, mode=REPLAY, speed=0.0, conversations=None):
+        if mode not in MODES:
+            raise ValueError(f"Response cache mode must be one of {', '.join(MODES)}")
+        self.cache = cache
+        self.mode = mode
+        # 0 replays instantly, 1 with the recorded timing, 2 twice as fast
+        self.speed = speed
+        self.conversations = conversations or _Conversations()
+
+    def message_key(self, request, agent_id):
+        """Cache key for a message call, or None when the agent's configuration is unknown"""
+        chain = self.conversations.get(agent_id)
+        if chain is None:
+            return None
+        kind = "stream" if request.url.path.endswith("/stream") else "create"
+        return _digest(chain, kind, _canonical_body(request.content))
+
+    def lookup(self, key):
+        return self.cache.get(key) if self.mode == REPLAY else None
+
+    def learn_created(self, response_body):
+        try:
+            agent = json.loads(response_body)
+            self.conversations.set(agent["id"], agent_fingerprint(agent))
+        except (ValueError, KeyError, TypeError):
+            pass
+
+    def learn_retrieved(self, agent_id, response_body):
+        self.conversations.set(agent_id, agent_fingerprint(json.loads(response_body)))
+
+    def after_call(self, request, kind, agent_id):
+        if kind == "delete":
+            self.conversations.forget(agent_id)
+        elif kind == "agent":
+            # Block edits, tool attaches and the like change what later replies depend on
+            self.conversations.advance(agent_id, request.method, request.url.path, _canonical_body(request.content))
+
+    def store(self, key, response):
+        status = response.status_code
+        content_type = response.headers.get("content-type")
+        content_encoding = response.headers.get("content-encoding")
+
+        def on_complete(chunks):
+            if 200 <= status < 300:
+                self.cache.put(key, status, content_type, chunks, content_encoding)
+        return on_complete
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """Answers agent message calls from a ResponseCache, recording the ones it has to send"""
+
+    def __init__(self, transport, cache, mode=REPLAY, speed=0.0, conversations=None):
+        self._transport = transport
+        self.policy = _ReplayPolicy(cache, mode, speed, conversations)
+
+    def _ensure_chain(self, request, agent_id):
+        # An agent this client did not create: fingerprint its current configuration
+        if self.policy.conversations.get(agent_id) is None:
+            lookup = _retrieve_request(request, agent_id)
+            response = self._transport.handle_request(lookup)
+            body = response.read()
+            response.close()
+            if response.status_code == 200:
+                self.policy.learn_retrieved(agent_id, body)
+
+    def handle_request(self, request):
+        kind, agent_id = _classify(request)
+        if kind is None:
+            return self._transport.handle_request(request)
+        if kind == "create":
+            response = self._transport.handle_request(request)
+            # Raw wire bytes, so content-encoding and content-length still describe the body returned
+            raw = b"".join(response.stream)
+            response.close()
+            if response.status_code == 200:
+                self.policy.learn_created(_decoded(response, raw))
+            return _rewrapped(response, raw)
+        if kind != "message":
+            response = self._transport.handle_request(request)
+            self.policy.after_call(request, kind, agent_id)
+            return response
+
+        self._ensure_chain(request, agent_id)
+        key = self.policy.message_key(request, agent_id)
+        if key is None:
+            # The agent could not be retrieved; let the server answer (and report its error)
+            return self._transport.handle_request(request)
+        self.policy.conversations.set(agent_id, key)
+        cached = self.policy.lookup(key)
+        if cached is not None:
+            status, content_type, content_encoding, chunks = cached
+            return _replayed(status, content_type, content_encoding, _ReplayStream(chunks, self.policy.speed))
+
+        start = time.monotonic()
+        response = self._transport.handle_request(request)
+        stream = _RecordingStream(response.stream, start, self.policy.store(key, response))
+        return httpx.Response(response.status_code, headers=response.headers, stream=stream,
+                              extensions=response.extensions)
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of ReplayTransport"""
+
+    def __init__(self, transport, cache, mode=REPLAY, speed=0.0, conversations=None):
+        self._transport = transport
+        self.policy = _ReplayPolicy(cache, mode, speed, conversations)
+
+    async def _ensure_chain(self, request, agent_id):
+        if self.policy.conversations.get(agent_id) is None:
+            lookup = _retrieve_request(request, agent_id)
+            response = await self._transport.handle_async_request(lookup)
+            body = await response.aread()
+            await response.aclose()
+            if response.status_code == 200:
+                self.policy.learn_retrieved(agent_id, body)
+
+    async def handle_async_request(self, request):
+        kind, agent_id = _classify(request)
+        if kind is None:
+            return await self._transport.handle_async_request(request)
+        if kind == "create":
+            response = await self._transport.handle_async_request(request)
+            raw = b"".join([chunk async for chunk in response.stream])
+            await response.aclose()
+            if response.status_code == 200:
+                self.policy.learn_created(_decoded(response, raw))
+            return _rewrapped(response, raw)
+        if kind != "message":
+            response = await self._transport.handle_async_request(request)
+            self.policy.after_call(request, kind, agent_id)
+            return response
+
+        await self._ensure_chain(request, agent_id)
+        key = self.policy.message_key(request, agent_id)
+        if key is None:
+            # The agent could not be retrieved; let the server answer (and report its error)
+            return await self._transport.handle_async_request(request)
+        self.policy.conversations.set(agent_id, key)
+        cached = self.policy.lookup(key)
+        if cached is not None:
+            status, content_type, content_encoding, chunks = cached
+            return _replayed(status, content_type, content_encoding, _AsyncReplayStream(chunks, self.policy.speed))
+
+        start = time.monotonic()
+        response = await self._transport.handle_async_request(request)
+        stream = _AsyncRecordingStream(response.stream, start, self.policy.store(key, response))
+        return httpx.Response(response.status_code, headers=response.headers, stream=stream,
+                              extensions=response.extensions)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def _settings():
+    return {
+        "mode": os.getenv("LETTA_RESPONSE_CACHE", OFF),
+        "path": os.getenv("LETTA_RESPONSE_CACHE_PATH", DEFAULT_CACHE_PATH),
+        "max_bytes": int(float(os.getenv("LETTA_RESPONSE_CACHE_MAX_MB", "256")) * 1024 * 1024),
+        "speed": 1.0 if os.getenv("LETTA_RESPONSE_CACHE_TIMING", "instant") == "original" else 0.0,
+    }
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def _shared_state(settings):
+    # The sync and async clients share one cache connection and one view of each
+    # conversation, so a chat started on one continues on the other
+    with _shared_lock:
+        if not _shared:
+            _shared["cache"] = ResponseCache(settings["path"], settings["max_bytes"])
+            _shared["conversations"] = _Conversations()
+        return _shared["cache"], _shared["conversations"]
+
+
+def wrap_transport(transport):
+    """transport wrapped in a ReplayTransport when LETTA_RESPONSE_CACHE opts in"""
+    settings = _settings()
+    if settings["mode"] == OFF:
+        return transport
+    cache, conversations = _shared_state(settings)
+    return ReplayTransport(transport, cache, settings["mode"], settings["speed"], conversations)
+
+
+def wrap_async_transport(transport):
+    """Async counterpart of wrap_transport"""
+    settings = _settings()
+    if settings["mode"] == OFF:
+        return transport
+    cache, conversations = _shared_state(settings)
+    return AsyncReplayTransport(transport, cache, settings["mode"], settings["speed"], conversations)
@@ -0,0 +1,272 @@
+import contextvars
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+REASONING = "reasoning"
+ASSISTANT = "assistant"
+TOOL_CALL = "tool_call"
+TOOL_RETURN = "tool_return"
+USAGE = "usage"
+CHANNELS = (REASONING, ASSISTANT, TOOL_CALL, TOOL_RETURN, USAGE)
+
+# Sentinel the consumer puts on the queue once the stream is exhausted
+_DONE = object()
+
+
+def demux(chunk):
+    """Channel and payload for one create_stream chunk, or None to skip it"""
+    message_type = getattr(chunk, "message_type", None)
+    if message_type == "reasoning_message":
+        return REASONING, chunk.reasoning or ""
+    if message_type == "assistant_message":
+        content = chunk.content
+        if isinstance(content, list):
+            content = "".join(getattr(part, "text", "") or "" for part in content)
+        return ASSISTANT, content or ""
+    if message_type == "tool_call_message":
+        tool_call = chunk.tool_call
+        return TOOL_CALL, {"id": getattr(tool_call, "tool_call_id", None),
+                           "name": getattr(tool_call, "name", None),
+                           "arguments": getattr(tool_call, "arguments", None) or ""}
+    if message_type == "tool_return_message":
+        return TOOL_RETURN, {"id": chunk.tool_call_id, "status": chunk.status, "return": chunk.tool_return}
+    if message_type == "usage_statistics" or (message_type is None and hasattr(chunk, "total_tokens")):
+        return USAGE, {"prompt_tokens": chunk.prompt_tokens, "completion_tokens": chunk.completion_tokens,
+                       "total_tokens": chunk.total_tokens, "step_count": chunk.step_count}
+    return None
+
+
+@dataclass
+class ChannelStats:
+    """Arrival metrics for one channel, relative to the pipeline start"""
+    chunks: int = 0
+    chars: int = 0
+    first_at: Optional[float] = None
+    last_at: Optional[float] = None
+
+    def add(self, payload, at):
+        self.chunks += 1
+        self.chars += len(payload) if isinstance(payload, str) else 0
+        if self.first_at is None:
+            self.first_at = at
+        self.last_at = at
+
+    def as_dict(self, start):
+        span = (self.last_at - self.first_at) if self.chunks > 1 else 0.0
+        return {
+            "chunks": self.chunks,
+            "chars": self.chars,
+            "first_chunk_sec": round(self.first_at - start, 4) if self.first_at else None,
+            "chunks_per_sec": round((self.chunks - 1) / span, 2) if span else None,
+        }
+
+
+@dataclass
+class StreamUpdate:
+    """Everything that arrived since the previous poll, merged per channel"""
+    text: Dict[str, str] = field(default_factory=dict)
+    tool_calls: List[Dict] = field(default_factory=list)
+    tool_returns: List[Dict] = field(default_factory=list)
+    usage: Optional[Dict] = None
+    done: bool = False
+
+    def __bool__(self):
+        return bool(self.text or self.tool_calls or self.tool_returns or self.usage or self.done)
+
+
+class StreamPipeline:
+    """Consumes a Letta stream on a background thread into a bounded queue the UI thread polls
+
+    The queue bound is the backpressure: a slow UI stalls the consumer, which
+    stops reading the HTTP response instead of buffering without limit.
+    """
+
+    def __init__(self, stream, max_queue=256):
+        self._stream = stream
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._cancelled = threading.Event()
+        self._thread = None
+        self.error = None
+        self.start_time = None
+        self.end_time = None
+        self.stats = {channel: ChannelStats() for channel in CHANNELS}
+        self.text = {REASONING: "", ASSISTANT: ""}
+        self.tool_calls = {}
+        self.tool_returns = []
+        self.usage = None
+
+    @classmethod
+    def for_message(cls, client, agent_id, prompt, max_queue=256):
+        """Start streaming an agent's reply to one user message"""
+        stream = client.agents.messages.create_stream(
+            agent_id=agent_id,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return cls(stream, max_queue=max_queue).start()
+
+    def start(self):
+        self.start_time = time.monotonic()
+        # Copy the caller's context so the HTTP calls stay attributed to its rerun
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(self._consume,),
+                                        name="letta-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def _put(self, item):
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _consume(self):
+        try:
+            for chunk in self._stream:
+                # After a cancel, read the rest without queueing it: the client's SSE
+                # generator cannot be closed early, the server finishes the step anyway,
+                # and a fully read response returns its connection to the pool
+                if self._cancelled.is_set():
+                    continue
+                routed = demux(chunk)
+                if routed is not None:
+                    self._put((*routed, time.monotonic()))
+        except Exception as e:
+            self.error = e
+        finally:
+            self._put(_DONE)
+
+    def cancel(self):
+        """Stop delivering updates; the UI thread is released at once"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def _apply(self, update, item):
+        if item is _DONE:
+            self.end_time = time.monotonic()
+            update.done = True
+            return
+        channel, payload, at = item
+        self.stats[channel].add(payload, at)
+        if channel in self.text:
+            update.text[channel] = update.text.get(channel, "") + payload
+            self.text[channel] += payload
+        elif channel == TOOL_CALL:
+            # Deltas for one call share an id; merge them into a single entry
+            call = self.tool_calls.setdefault(payload["id"] or len(self.tool_calls),
+                                              {"name": None, "arguments": ""})
+            call["name"] = call["name"] or payload["name"]
+            call["arguments"] += payload["arguments"]
+            update.tool_calls.append(payload)
+        elif channel == TOOL_RETURN:
+            self.tool_returns.append(payload)
+            update.tool_returns.append(payload)
+        else:
+            self.usage = update.usage = payload
+
+    def poll(self, timeout=0.1, max_items=1000):
+        """Drain what is queued, waiting up to timeout for the first item"""
+        update = StreamUpdate()
+        if self.cancelled and self.end_time is None:
+            # Do not wait on a consumer that may still be blocked reading the response
+            self.end_time = time.monotonic()
+        if self.end_time is not None:
+            update.done = True
+            return update
+        try:
+            self._apply(update, self._queue.get(timeout=timeout))
+        except queue.Empty:
+            return update
+        while not update.done and max_items > 1:
+            try:
+                self._apply(update, self._queue.get_nowait())
+            except queue.Empty:
+                break
+            max_items -= 1
+        return update
+
+    def updates(self, interval=0.1):
+        """Batched updates at most every interval seconds until the stream ends"""
+        while True:
+            started = time.monotonic()
+            update = self.poll(timeout=interval)
+            if update:
+                yield update
+            if update.done:
+                if self.error is not None and not self.cancelled:
+                    raise self.error
+                return
+            remaining = interval - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def metrics(self):
+        """Per-channel first-chunk latency, chunk counts and rates"""
+        end = self.end_time or time.monotonic()
+        return {
+            "duration_sec": round(end - self.start_time, 4),
+            "cancelled": self.cancelled,
+            "channels": {channel: stats.as_dict(self.start_time)
+                         for channel, stats in self.stats.items() if stats.chunks},
+        }
+
+    def record(self, recorder, agent_id):
+        """Report the assistant channel to the CallRecorder as one stream
+
+        The count is the server's completion_tokens; a stream that ended
+        without a usage report is recorded as assistant chunks instead.
+        """
+        # The recorder works in wall-clock time
+        offset = time.time() - time.monotonic()
+        first = self.stats[ASSISTANT].first_at
+        completion_tokens = (self.usage or {}).get("completion_tokens")
+        if completion_tokens is None:
+            count, unit = self.stats[ASSISTANT].chunks, "chunks"
+        else:
+            count, unit = completion_tokens, "tokens"
+        recorder.record_stream(agent_id, self.start_time + offset, first + offset if first else None,
+                               (self.end_time or time.monotonic()) + offset, count, unit=unit)
+
+    def summary(self):
+        """Headline numbers for comparing agents: TTFT, total latency and output size"""
+        first = self.stats[ASSISTANT].first_at
+        end = self.end_time or time.monotonic()
+        return {
+            "ttft_sec": round(first - self.start_time, 3) if first else None,
+            "latency_sec": round(end - self.start_time, 3),
+            "chars": len(self.text[ASSISTANT]),
+            "completion_tokens": (self.usage or {}).get("completion_tokens"),
+            "error": str(self.error) if self.error else None,
+        }
+
+
+def broadcast(client, agent_ids, prompt, max_queue=256):
+    """One pipeline per agent, all streaming the same prompt concurrently"""
+    return {agent_id: StreamPipeline.for_message(client, agent_id, prompt, max_queue=max_queue)
+            for agent_id in agent_ids}
+
+
+def merged_updates(pipelines, interval=0.1):
+    """(key, update) batches from several pipelines until every one has finished
+
+    Stream errors are not raised here; each pipeline keeps its own in .error.
+    """
+    active = dict(pipelines)
+    while active:
+        started = time.monotonic()
+        for key, pipeline in list(active.items()):
+            update = pipeline.poll(timeout=0)
+            if update:
+                yield key, update
+            if update.done:
+                del active[key]
+        remaining = interval - (time.monotonic() - started)
+        if active and remaining > 0:
+            time.sleep(remaining)
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Iterable
+
+import streamlit as st
+
+
+class ToolRegistry:
+    """Tool name to id map for one Letta server, listed once and refreshed on a miss"""
+
+    def __init__(self, ttl=600.0, page_size=100):
+        self.ttl = ttl
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._schemas = {}
+        self._listed_at = None
+
+    def _is_fresh(self):
+        return self._listed_at is not None and time.monotonic() - self._listed_at < self.ttl
+
+    def _store(self, tools):
+        self._ids = {tool.name: tool.id for tool in tools}
+        self._schemas = {tool.name: getattr(tool, "json_schema", None) for tool in tools}
+        self._listed_at = time.monotonic()
+
+    def _lookup(self, names):
+        missing = [name for name in names if name not in self._ids]
+        if missing:
+            raise ValueError(f"Tools not found on the Letta server: {', '.join(missing)}")
+        return {name: self._ids[name] for name in names}
+
+    def _needs_listing(self, names):
+        # A name we have never seen may be a tool created since the last listing
+        return not self._is_fresh() or any(name not in self._ids for name in names)
+
+    def _list_all(self, client):
+        tools, after = [], None
+        while True:
+            page = client.tools.list(after=after, limit=self.page_size)
+            tools.extend(page)
+            if len(page) < self.page_size:
+                return tools
+            after = page[-1].id
+
+    def resolve(self, client, names: Iterable[str]) -> Dict[str, str]:
+        """Ids for the given tool names, listing the server's tools only when needed"""
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+        with self._lock:
+            if self._needs_listing(names):
+                self._store(self._list_all(client))
+            return self._lookup(names)
+
+    async def resolve_async(self, client, names: Iterable[str]) -> Dict[str, str]:
+        """resolve for async callers; client is the sync Letta client
+
+        AsyncLetta.tools is the sync tools client wired to the async transport
+        (letta-client 0.1.30), so the listing runs on the sync client in a thread.
+        """
+        return await asyncio.to_thread(self.resolve, client, names)
+
+    def schemas(self, client, names: Iterable[str]) -> Dict[str, Dict]:
+        """JSON schemas the model is shown for the given tools, from the same listing"""
+        names = list(dict.fromkeys(names))
+        self.resolve(client, names)
+        with self._lock:
+            return {name: self._schemas.get(name) or {} for name in names}
+
+    def invalidate(self):
+        """Forget every id, e.g. after an attach failed on a stale one"""
+        with self._lock:
+            self._ids = {}
+            self._schemas = {}
+            self._listed_at = None
+
+
+@st.cache_resource
+def get_tool_registry(base_url):
+    """One tool registry per Letta server, shared across pages and sessions"""
+    return ToolRegistry()